@@ -0,0 +1,100 @@
+"""
+插件冷启动导入基准
+
+每次在新的子进程中加载插件，统计加载耗时、加载前后的进程常驻内存 (RSS) 峰值，以及加载后已被导入的重型依赖，
+多次运行取中位数。可以同时传入其他版本的源码目录（如 `git worktree add /tmp/old <commit>`）进行对比。
+需要在已安装插件依赖的 NoneBot 项目环境中运行:
+
+    python benchmarks/import_time.py [运行次数] [源码目录 ...]
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+
+HEAVY_DEPENDENCIES = ("matplotlib", "playwright", "maimai_py", "numpy", "PIL")
+"""与 `nonebot_plugin_rikka.startup.HEAVY_DEPENDENCIES` 一致，旧版本的源码中可能没有该常量"""
+
+_CHILD_FLAG = "--child"
+
+
+def _child(root: str) -> None:
+    import os
+    import resource
+    import tempfile
+    import time
+
+    sys.path.insert(0, root)
+    # 插件会在工作目录下写入日志，在临时目录中运行以免污染源码目录
+    os.chdir(tempfile.mkdtemp())
+
+    import nonebot
+
+    # 插件导入时会在缺少 music_chart.json 时从水鱼下载，使用空的拟合定数数据以免计入网络耗时
+    static_dir = Path(tempfile.mkdtemp())
+    (static_dir / "music_chart.json").write_text(json.dumps({"charts": {}, "diff_data": {}}), encoding="utf-8")
+    nonebot.init(static_resource_path=str(static_dir), log_level="WARNING")
+
+    # Linux 下 ru_maxrss 的单位为 KiB，macOS 下为字节
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit
+    start = time.perf_counter()
+    plugin = nonebot.load_plugin("nonebot_plugin_rikka")
+    elapsed = time.perf_counter() - start
+    if plugin is None:
+        sys.exit("插件加载失败，请检查依赖版本")
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit
+
+    print(
+        json.dumps(
+            {
+                "elapsed": elapsed,
+                "rss_before": rss_before,
+                "rss_after": rss_after,
+                "loaded": [name for name in HEAVY_DEPENDENCIES if name in sys.modules],
+            }
+        )
+    )
+
+
+def _measure(root: Path, runs: int) -> dict:
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, _CHILD_FLAG, str(root)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "elapsed": median(result["elapsed"] for result in results),
+        "rss_before": median(result["rss_before"] for result in results),
+        "rss_after": median(result["rss_after"] for result in results),
+        "loaded": results[-1]["loaded"],
+    }
+
+
+def main() -> None:
+    if sys.argv[1:2] == [_CHILD_FLAG]:
+        _child(sys.argv[2])
+        return
+
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    roots = [Path(path).resolve() for path in sys.argv[2:]] or [Path(__file__).resolve().parent.parent]
+
+    print(f"{'源码目录':<32} {'加载耗时':>10} {'RSS 增量':>10} {'RSS 峰值':>10}  已加载的重型依赖")
+    for root in roots:
+        result = _measure(root, runs)
+        rss_delta = (result["rss_after"] - result["rss_before"]) / 2**20
+        print(
+            f"{str(root):<32} {result['elapsed']:>9.2f}s {rss_delta:>8.1f}MB {result['rss_after'] / 2**20:>8.1f}MB"
+            f"  {', '.join(result['loaded']) or '无'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
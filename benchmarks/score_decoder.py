@@ -0,0 +1,153 @@
+"""
+成绩解码器微基准
+
+对比逐条构造（旧实现）与预编译解码器的单条成绩耗时，以及 json / orjson 的解析耗时。
+需要在已安装插件依赖的 NoneBot 项目环境中运行:
+
+    python benchmarks/score_decoder.py [成绩数量]
+"""
+
+import json
+import random
+import sys
+from dataclasses import fields
+from timeit import repeat
+
+import nonebot
+
+nonebot.init()
+
+from nonebot_plugin_rikka.score.chunithm.providers.lxns import (  # noqa: E402
+    LXNSChuScoreProvider,
+)
+from nonebot_plugin_rikka.score.decoder import json_loads  # noqa: E402
+from nonebot_plugin_rikka.score.maimai._schema import (  # noqa: E402
+    PlayerMaiScore,
+    ScoreFCType,
+    ScoreFSType,
+    ScoreRateType,
+    SongDifficulty,
+    SongType,
+)
+from nonebot_plugin_rikka.score.maimai.providers.diving_fish import (  # noqa: E402
+    DivingFishScoreProvider,
+)
+from nonebot_plugin_rikka.score.maimai.providers.lxns import (  # noqa: E402
+    LXNSScoreProvider,
+)
+
+
+def _legacy_lxns_unpack(raw_score: dict) -> PlayerMaiScore:
+    """旧版 LXNSScoreProvider._score_unpack，作为对照组"""
+    raw_score = raw_score.copy()
+    raw_score["song_difficulty"] = SongDifficulty(raw_score["level_index"])
+    raw_score["fc"] = ScoreFCType(raw_score["fc"]) if raw_score.get("fc") else None
+    raw_score["fs"] = ScoreFSType(raw_score["fs"]) if raw_score.get("fs") else None
+    raw_score["rate"] = ScoreRateType(raw_score["rate"])
+    raw_score["type"] = SongType(raw_score["type"])
+
+    valid_keys = {f.name for f in fields(PlayerMaiScore)}
+    filtered = {k: v for k, v in raw_score.items() if k in valid_keys}
+    filtered["song_id"] = raw_score["id"]
+    filtered["song_type"] = raw_score["type"]
+    filtered["song_level"] = raw_score["level"]
+
+    return PlayerMaiScore(**filtered)
+
+
+def _lxns_payload(count: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        {
+            "id": rng.randint(1, 1800),
+            "song_name": f"song {i}",
+            "level": "13+",
+            "level_index": rng.randint(0, 4),
+            "achievements": rng.uniform(90, 101),
+            "fc": rng.choice([None, "fc", "fcp", "ap", "app"]),
+            "fs": rng.choice([None, "fs", "fsp", "fsd", "fsdp", "sync"]),
+            "dx_score": rng.randint(0, 3000),
+            "dx_star": rng.randint(0, 5),
+            "dx_rating": rng.uniform(0, 337),
+            "rate": rng.choice(["sssp", "sss", "ssp", "ss", "sp", "s"]),
+            "type": rng.choice(["standard", "dx"]),
+            "upload_time": "2026-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+def _divingfish_payload(count: int) -> list[dict]:
+    rng = random.Random(1)
+    return [
+        {
+            "song_id": rng.randint(1, 11800),
+            "title": f"song {i}",
+            "level": "13+",
+            "level_index": rng.randint(0, 4),
+            "achievements": rng.uniform(90, 101),
+            "fc": rng.choice(["", "fc", "fcp", "ap", "app"]),
+            "fs": rng.choice(["", "fs", "fsp", "fsd", "fsdp", "sync"]),
+            "dxScore": rng.randint(0, 3000),
+            "ra": rng.randint(0, 337),
+            "rate": rng.choice(["sssp", "sss", "ssp", "ss", "sp", "s"]),
+            "type": rng.choice(["SD", "DX"]),
+            "ds": 13.7,
+            "level_label": "Master",
+        }
+        for i in range(count)
+    ]
+
+
+def _chunithm_payload(count: int) -> list[dict]:
+    rng = random.Random(2)
+    return [
+        {
+            "id": rng.randint(1, 3000),
+            "song_name": f"song {i}",
+            "level": "14+",
+            "level_index": rng.randint(0, 4),
+            "score": rng.randint(900000, 1010000),
+            "rating": rng.uniform(0, 17.5),
+            "over_power": rng.uniform(0, 80),
+            "clear": rng.choice([None, "clear", "hard", "absolute"]),
+            "full_combo": rng.choice([None, "fullcombo", "alljustice"]),
+            "full_chain": None,
+            "rank": rng.choice(["sssp", "sss", "ssp", "ss"]),
+            "play_time": "2026-01-01T00:00:00Z",
+        }
+        for i in range(count)
+    ]
+
+
+def _per_item_us(func, count: int, number: int = 5) -> float:
+    return min(repeat(func, number=number, repeat=3)) / number / count * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    lxns = _lxns_payload(count)
+    divingfish = _divingfish_payload(count)
+    chunithm = _chunithm_payload(count)
+
+    print(f"成绩数量: {count}")
+    cases = [
+        ("LXNS 旧实现", lambda: [_legacy_lxns_unpack(s) for s in lxns]),
+        ("LXNS decode", lambda: [LXNSScoreProvider._score_unpack(s) for s in lxns]),
+        ("LXNS decode_many", lambda: LXNSScoreProvider._scores_unpack(lxns)),
+        ("水鱼 decode_many", lambda: DivingFishScoreProvider._scores_unpack(divingfish)),
+        ("中二 decode_many", lambda: LXNSChuScoreProvider._scores_unpack(chunithm)),
+    ]
+    print("单条成绩解码耗时 (µs):")
+    for name, func in cases:
+        print(f"  {name:<20} {_per_item_us(func, count):8.3f}")
+
+    text = json.dumps({"data": lxns})
+    print("单条成绩 JSON 解析耗时 (µs):")
+    print(f"  json.loads           {_per_item_us(lambda: json.loads(text), count):8.3f}")
+    print(f"  json_loads           {_per_item_us(lambda: json_loads(text), count):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
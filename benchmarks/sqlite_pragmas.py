@@ -0,0 +1,158 @@
+"""
+SQLite 并发读写基准
+
+在临时数据库中模拟多个用户同时查询游玩次数（读）与导入游玩次数（写）的指令组合，
+对比 SQLite 默认参数与 `SQLITE_PRAGMAS` 下的吞吐量、延迟与锁冲突次数。
+需要在已安装插件依赖的 NoneBot 项目环境中运行:
+
+    python benchmarks/sqlite_pragmas.py [读线程数] [写线程数] [每组运行秒数]
+"""
+
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from statistics import quantiles
+from typing import Optional
+
+import nonebot
+
+nonebot.init()
+
+from nonebot_plugin_rikka.database.pragmas import SQLITE_PRAGMAS  # noqa: E402
+
+_USERS = 20
+_SONGS = 1500
+_DIFFICULTIES = 2
+_LOOKUP_SIZE = 50
+"""单次查询的曲目数量，与成绩列表等指令一次查询的曲目数量相当"""
+_UPSERT_BATCH_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE nonebot_plugin_rikka_playcount (
+    user_id VARCHAR NOT NULL,
+    song_id INTEGER NOT NULL,
+    difficulty INTEGER NOT NULL,
+    play_count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, song_id, difficulty)
+);
+CREATE INDEX ix_nonebot_plugin_rikka_playcount_lookup
+    ON nonebot_plugin_rikka_playcount (user_id, song_id, difficulty, play_count);
+"""
+
+_LOOKUP_SQL = (
+    "SELECT song_id, difficulty, play_count FROM nonebot_plugin_rikka_playcount "
+    f"WHERE user_id = ? AND song_id IN ({', '.join('?' * _LOOKUP_SIZE)})"
+)
+
+_UPSERT_SQL = (
+    "INSERT INTO nonebot_plugin_rikka_playcount (user_id, song_id, difficulty, play_count) "
+    f"VALUES {', '.join(['(?, ?, ?, ?)'] * _UPSERT_BATCH_SIZE)} "
+    "ON CONFLICT (user_id, song_id, difficulty) DO UPDATE SET play_count = excluded.play_count "
+    "WHERE nonebot_plugin_rikka_playcount.play_count <> excluded.play_count"
+)
+
+
+def _connect(path: Path, pragmas: Optional[dict]) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    for name, value in (pragmas or {}).items():
+        connection.execute(f"PRAGMA {name}={value}")
+    return connection
+
+
+def _prepare(path: Path, pragmas: Optional[dict]) -> None:
+    connection = _connect(path, pragmas)
+    connection.executescript(_SCHEMA)
+    rng = random.Random(0)
+    connection.executemany(
+        "INSERT INTO nonebot_plugin_rikka_playcount VALUES (?, ?, ?, ?)",
+        (
+            (f"user{user}", song, difficulty, rng.randint(1, 50))
+            for user in range(_USERS)
+            for song in range(_SONGS)
+            for difficulty in range(_DIFFICULTIES)
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+def _reader(path: Path, pragmas: Optional[dict], deadline: float, seed: int, stats: dict) -> None:
+    connection = _connect(path, pragmas)
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        params = [f"user{rng.randrange(_USERS)}", *rng.sample(range(_SONGS), _LOOKUP_SIZE)]
+        start = time.perf_counter()
+        try:
+            connection.execute(_LOOKUP_SQL, params).fetchall()
+        except sqlite3.OperationalError:
+            stats["read_errors"] += 1
+            continue
+        stats["read"].append(time.perf_counter() - start)
+    connection.close()
+
+
+def _writer(path: Path, pragmas: Optional[dict], deadline: float, seed: int, stats: dict) -> None:
+    connection = _connect(path, pragmas)
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        user_id = f"user{rng.randrange(_USERS)}"
+        params = []
+        for song in rng.sample(range(_SONGS), _UPSERT_BATCH_SIZE):
+            params += [user_id, song, rng.randrange(_DIFFICULTIES), rng.randint(1, 50)]
+        start = time.perf_counter()
+        try:
+            connection.execute(_UPSERT_SQL, params)
+            connection.commit()
+        except sqlite3.OperationalError:
+            connection.rollback()
+            stats["write_errors"] += 1
+            continue
+        stats["write"].append(time.perf_counter() - start)
+    connection.close()
+
+
+def _run(name: str, pragmas: Optional[dict], readers: int, writers: int, seconds: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        _prepare(path, pragmas)
+
+        stats: dict = {"read": [], "write": [], "read_errors": 0, "write_errors": 0}
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=_reader, args=(path, pragmas, deadline, i, stats)) for i in range(readers)
+        ] + [threading.Thread(target=_writer, args=(path, pragmas, deadline, 1000 + i, stats)) for i in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    print(f"{name}:")
+    for kind in ("read", "write"):
+        latencies = stats[kind]
+        if len(latencies) < 2:
+            print(f"  {kind:<5} 完成 {len(latencies)} 次, 失败 {stats[f'{kind}_errors']} 次")
+            continue
+        cuts = quantiles(latencies, n=100)
+        print(
+            f"  {kind:<5} {len(latencies) / seconds:9.1f} ops/s"
+            f"  p50 {cuts[49] * 1e3:7.2f} ms  p95 {cuts[94] * 1e3:7.2f} ms"
+            f"  失败 {stats[f'{kind}_errors']} 次"
+        )
+
+
+def main() -> None:
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+    print(f"读线程: {readers}, 写线程: {writers}, 每组运行 {seconds:.0f} 秒")
+    _run("默认参数", None, readers, writers, seconds)
+    _run("SQLITE_PRAGMAS", SQLITE_PRAGMAS, readers, writers, seconds)
+
+
+if __name__ == "__main__":
+    main()
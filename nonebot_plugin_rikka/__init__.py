@@ -8,22 +8,29 @@ require("nonebot_plugin_orm")
 require("nonebot_plugin_session")
 require("nonebot_plugin_apscheduler")
 
+from nonebot import get_driver  # noqa: E402
 from nonebot.plugin import PluginMetadata, inherit_supported_adapters  # noqa: E402
+from nonebot_plugin_orm import get_scoped_session  # noqa: E402
 
-from .config import Config, config  # noqa: E402
-from .utils import init_logger  # noqa: E402
+from .startup import (  # noqa: E402
+    backfill_chu_friend_codes,
+    record_import_times,
+    run_in_background,
+    run_startup_steps,
+)
 
-init_logger()
+# matplotlib、Playwright 等重型依赖在首次使用相关指令时才导入，加载完成后输出各子模块的导入耗时
+with record_import_times(__name__):
+    from .config import Config, config
+    from .utils import init_logger
 
-from nonebot import get_driver  # noqa: E402
-from nonebot_plugin_orm import get_scoped_session  # noqa: E402
+    init_logger()
 
-from . import alconna  # noqa: E402, F401
-from . import database  # noqa: E402, F401
-from .database import ChuSongORM, MaiSongORM  # noqa: E402
+    from . import alconna  # noqa: F401
+    from . import database  # noqa: F401
+    from .database import ChuSongORM, MaiSongORM
 
 
-@get_driver().on_startup
 async def check_static_resource():
     """检查静态资源文件夹是否存在"""
     from .painters.maimai._config import FONT_DIR, PLATE_DIR
@@ -41,7 +48,17 @@ async def check_static_resource():
         raise FileExistsError("无法找到有效的字体文件，请检查静态资源目录和相关配置")
 
 
-@get_driver().on_startup
+async def tune_sqlite_database():
+    """数据库为 SQLite 时启用 WAL 等性能参数"""
+    if not config.enable_sqlite_tuning:
+        return
+
+    from .database.pragmas import apply_sqlite_pragmas
+
+    if await apply_sqlite_pragmas(get_scoped_session()):
+        logger.info("已为 SQLite 数据库启用 WAL 等性能参数")
+
+
 async def initialize_song_cache():
     session = get_scoped_session()
     logger.debug("更新乐曲缓存中...")
@@ -50,44 +67,13 @@ async def initialize_song_cache():
 
 
 @get_driver().on_startup
-async def migrate_chu_friend_codes():
-    """数据迁移：为已有舞萌绑定但缺少中二好友码的用户自动补全 chu_friend_code。"""
-    from sqlalchemy import select
-
-    from .database import UserBindInfoORM
-    from .database.orm_models import UserBindInfo
-    from .score.chunithm import get_lxns_chu_provider
-
-    session = get_scoped_session()
-    provider = get_lxns_chu_provider()
-
-    result = await session.execute(
-        select(UserBindInfo).where(
-            (UserBindInfo.lxns_api_key.isnot(None) | UserBindInfo.lxns_api_key != ""),
-            (UserBindInfo.chu_friend_code.is_(None) | (UserBindInfo.chu_friend_code == "")),
-        )
+async def initialize_plugin():
+    """按阶段执行插件初始化，中二好友码补全在后台执行"""
+    await run_startup_steps(
+        [("SQLite 参数调优", tune_sqlite_database)],
+        [("静态资源检查", check_static_resource), ("乐曲缓存加载", initialize_song_cache)],
     )
-    users = result.scalars().all()
-
-    if not users:
-        return
-
-    logger.info(f"[数据迁移] 发现 {len(users)} 个用户需要补全中二好友码")
-
-    migrated = 0
-    for user in users:
-        uid = user.user_id  # 提前提取，避免 commit 后 ORM 属性过期
-        try:
-            assert user.lxns_api_key
-            info = await provider.fetch_player_info_by_user_token(user.lxns_api_key)
-            await UserBindInfoORM.set_user_chu_friend_code(session, uid, str(info.friend_code))
-            migrated += 1
-            logger.debug(f"[数据迁移] 用户 {uid} 中二好友码已补全: {info.friend_code}")
-        except Exception as e:
-            logger.debug(f"[数据迁移] 用户 {uid} 中二好友码补全失败: {e}")
-
-    if migrated:
-        logger.info(f"[数据迁移] 成功补全 {migrated} 个用户的中二好友码")
+    run_in_background("中二好友码补全", backfill_chu_friend_codes)
 
 
 __plugin_meta__ = PluginMetadata(
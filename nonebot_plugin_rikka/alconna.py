@@ -1,6 +1,6 @@
-import random
 import re
 from asyncio import TimeoutError
+from copy import copy
 from datetime import datetime, timedelta
 from functools import wraps
 from pathlib import Path
@@ -8,10 +8,10 @@ from time import perf_counter
 from traceback import format_exc
 from typing import Literal, Optional
 
+import numpy as np
 from aiohttp.client_exceptions import ClientResponseError
 from arclet.alconna import Alconna, AllParam, Args
-from maimai_py import InvalidPlateError, LevelIndex, LXNSProvider
-from maimai_py import SongType as MaimaiPySongType
+from maimai_py import InvalidPlateError, LXNSProvider, PlayerIdentifier
 from nonebot import get_driver, logger
 from nonebot.adapters import Event
 from nonebot.exception import FinishedException
@@ -37,7 +37,10 @@ from nonebot_plugin_session import (
 from .config import config
 from .constants import CHU_VERSION_MAP, MAI_VERSION_MAP
 from .database import (
+    BackgroundJobORM,
     LocationSubscriptionORM,
+    MaiChart,
+    MaiChartORM,
     MaiPlayCountORM,
     MaiSongAliasORM,
     MaiSongORM,
@@ -52,42 +55,48 @@ from .extra_proxy import (
     run_unlock_workflow,
 )
 from .functions.analysis import get_player_strength
-from .functions.diving_fish import convert_to_diving_fish_format, upload_to_diving_fish
 from .functions.fortunate import generate_today_fortune
+from .functions.jobs import (
+    JOB_KIND_NAMES,
+    JobContext,
+    JobNotifyTarget,
+    JobRunner,
+    format_job,
+    submit_job,
+)
 from .functions.location import (
+    get_chu_location_index,
     get_chu_locations,
+    get_mai_location_index,
     get_mai_locations,
     list_locations,
     location_sync,
     search_locations,
 )
-from .functions.lxns import (
-    convert_to_lxns_maimai_format,
-    get_updated_score,
-    upload_to_lxns_maimai,
-)
 from .functions.maistatus import capture_maimai_status_png
 from .functions.n50 import get_players_n50
+from .functions.pipeline import gather_stages, then_prefetch
 from .functions.process import (
     ProcessDataError,
-    get_level_process_data,
+    UnknownPlateError,
+    build_plate_process_data,
+    get_plate_process_data,
+    get_player_progress,
 )
+from .functions.random_song import get_chu_song_buckets, get_mai_song_buckets
 from .functions.recommend_songs import get_player_raise_score_songs
+from .functions.score_import import extract_play_count_records, import_scores
 from .functions.song_tags import SONG_TAGS_DATA_AVAILABLE, get_songs_tags
 from .models.chu_song import ChuSong
 from .models.song import MaiSong
-from .painters import (
-    DrawScores,
-    draw_player_rating_trend,
-    draw_player_strength_analysis,
-    image_to_bytes,
-)
+from .painters import DrawScores, image_to_bytes
 from .renderer import ChuPicRenderer, MaiPicRenderer
 from .score.chunithm import (
     LXNSChuScoreProvider,
     PlayerChuScore,
     get_lxns_chu_provider,
 )
+from .score.chunithm._schema import ChuFullComboType
 from .score.chunithm.providers.lxns import LXNSChuParams
 from .score.maimai import (
     DivingFishScoreProvider,
@@ -98,7 +107,9 @@ from .score.maimai import (
     get_maimaipy_provider,
 )
 from .score.maimai.providers.lxns import LXNSRatingTrend
-from .score.maimai.providers.maimai import MaimaiPyParams, maimai_client
+from .score.maimai.providers.maimai import MaimaiPyParams
+from .score.score_set import ChuScoreSet
+from .tracing import format_latency_report, span, traced
 from .updater.songs import (
     update_chu_song_database,
     update_local_chart_file,
@@ -243,6 +254,37 @@ def catch_exception(reply_prefix: str = "发生了未知错误", reply_error: bo
     return decorator
 
 
+async def submit_job_and_reply(
+    event_session: EventSession,
+    user_id: str,
+    kind: str,
+    runner: JobRunner,
+    dedupe_key: Optional[str] = None,
+) -> None:
+    """
+    提交后台任务并回复任务 ID，任务结束后向当前会话推送结果
+
+    官Bot环境下不支持主动发送消息，用户需通过 `.job` 命令查询结果
+    """
+    notify: Optional[JobNotifyTarget] = None
+    if event_session.bot_type != "QQ":
+        if event_session.level == SessionLevel.LEVEL1:
+            notify = JobNotifyTarget(user_id, True, event_session.bot_id)
+        elif event_session.level == SessionLevel.LEVEL2 and event_session.id2:
+            notify = JobNotifyTarget(event_session.id2, False, event_session.bot_id)
+
+    job_id, created = await submit_job(kind, user_id, runner, notify=notify, dedupe_key=dedupe_key)
+
+    if not created:
+        reply = f"你已有未完成的任务 #{job_id}，请等待其完成，可使用 .job {job_id} 查看进度"
+    elif notify:
+        reply = f"已提交{JOB_KIND_NAMES.get(kind, kind)}任务 #{job_id}，完成后会通知你，可使用 .job {job_id} 查看进度"
+    else:
+        reply = f"已提交{JOB_KIND_NAMES.get(kind, kind)}任务 #{job_id}，请稍后使用 .job {job_id} 查看结果"
+
+    await UniMessage([At(flag="user", target=user_id), reply]).finish()
+
+
 def _parse_trend_time_window(raw_time_range: str) -> tuple[int | None, str | None]:
     """将时间入参解析为天数窗口。"""
 
@@ -380,6 +422,30 @@ alconna_unlock = on_alconna(
     permission=lambda: config.enable_arcade_write,
 )
 
+alconna_job = on_alconna(
+    Alconna(
+        COMMAND_PREFIXES,
+        "job",
+        Args["job_id?", int],
+        meta=CommandMeta("[通用]查询后台任务的进度与结果", usage=".job [任务ID]"),
+    ),
+    priority=10,
+    block=True,
+    rule=to_me(),
+)
+
+alconna_latency = on_alconna(
+    Alconna(
+        COMMAND_PREFIXES,
+        "latency",
+        Args["command?", AllParam(str)],
+        meta=CommandMeta("[通用]查看各指令及其阶段的耗时统计", usage=".latency [指令名称]"),
+    ),
+    priority=10,
+    block=True,
+    rule=to_me(),
+)
+
 alconna_unbind = on_alconna(
     Alconna(
         COMMAND_PREFIXES,
@@ -811,7 +877,9 @@ async def handle_help(event: Event):
         f".import [divingfish] <qr_code> 导入游玩次数或同步到水鱼 {'当前不可用' if not config.enable_arcade_provider else ''}\n"
         f"{'.ticket <qr_code> 发送六倍票' if not config.enable_arcade_write else ''}\n"
         f"{'.logout <qr_code> 尝试强制登出' if not config.enable_arcade_write else ''}\n"
-        f"{'.unlock <qr_code> 解锁新框紫铺\n' if not config.enable_arcade_write else '\n'}\n"
+        f"{'.unlock <qr_code> 解锁新框紫铺\n' if not config.enable_arcade_write else '\n'}"
+        ".job [任务ID] 查询导入、更新等后台任务的进度与结果\n"
+        ".latency [指令名称] 查看各指令及其阶段的耗时统计\n\n"
         "--- 中二节奏 ---\n"
         ".chu help 获取中二相关指令列表\n"
         ".chu b30 获取玩家 Best 30\n"
@@ -1003,7 +1071,7 @@ async def handle_bind_main(event: Event, db_session: async_scoped_session):
 @catch_exception("导入游玩次数失败")
 async def handle_import_play_count(
     event: Event,
-    db_session: async_scoped_session,
+    event_session: EventSession,
     qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
@@ -1020,39 +1088,28 @@ async def handle_import_play_count(
             ]
         ).finish()
         return
+    qr = qr_code.result
 
-    workflow_result = await run_extend_score_workflow(qr_code.result)
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在获取机台成绩")
+        records = extract_play_count_records(await run_extend_score_workflow(qr))
+        if not records:
+            raise ValueError("未获取到可用的游玩次数数据")
 
-    records: list[tuple[int, int, int]] = []
-    for item in workflow_result:
-        if not isinstance(item, dict):
-            continue
-        try:
-            song_id = int(item["musicId"])
-            difficulty = int(item["level"])
-            play_count = int(item["playCount"])
-        except (KeyError, TypeError, ValueError):
-            continue
-        records.append((song_id, difficulty, play_count))
+        await job.report_progress("正在写入游玩次数")
+        imported = await MaiPlayCountORM.upsert_user_play_counts(job.session, user_id, records)
+        return f"已导入 {imported} 条游玩次数记录"
 
-    if not records:
-        await UniMessage([At(flag="user", target=user_id), "未获取到可用的游玩次数数据"]).finish()
-        return
-
-    imported = await MaiPlayCountORM.upsert_user_play_counts(db_session, user_id, records)
-
-    await UniMessage(
-        [
-            At(flag="user", target=user_id),
-            f"已导入 {imported} 条游玩次数记录",
-        ]
-    ).finish()
+    await submit_job_and_reply(event_session, user_id, "import", run, dedupe_key="import")
 
 
 @alconna_import.assign("divingfish")
 @catch_exception("更新水鱼查分器失败")
 async def handle_import_divingfish(
-    event: Event, db_session: async_scoped_session, qr_code: Match[str] = AlconnaMatch("qr_code")
+    event: Event,
+    db_session: async_scoped_session,
+    event_session: EventSession,
+    qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
 
@@ -1081,36 +1138,31 @@ async def handle_import_divingfish(
         return  # 防止 mypy 报错 bind_info 可能为 None 的情况
 
     import_token = bind_info.diving_fish_import_token
+    qr = qr_code.result
 
-    workflow_result = await run_extend_score_workflow(qr_code.result)
-    if not workflow_result:
-        await UniMessage([At(flag="user", target=user_id), "未获取到可用的游玩次数数据"]).finish()
-        return
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在获取机台成绩")
+        workflow_result = await run_extend_score_workflow(qr)
+        if not workflow_result:
+            raise ValueError("未获取到可用的游玩次数数据")
 
-    divingfish_scores = await convert_to_diving_fish_format(workflow_result)
-    await upload_to_diving_fish(import_token, divingfish_scores)
+        # 上传水鱼的同时更新本地游玩次数数据库
+        await job.report_progress(f"正在上传 {len(workflow_result)} 条成绩")
+        report = await import_scores(job.session, user_id, workflow_result, divingfish_token=import_token)
+        if report.errors:
+            return f"成绩部分导入成功: {report.format_outcomes()}"
+        return f"水鱼查分器更新成功！共更新了 {report.play_count_imported} 条记录"
 
-    # 同时更新本地游玩次数数据库
-    records: list[tuple[int, int, int]] = []
-    for item in workflow_result:
-        if not isinstance(item, dict):
-            continue
-        try:
-            song_id = int(item["musicId"])
-            difficulty = int(item["level"])
-            play_count = int(item["playCount"])
-        except (KeyError, TypeError, ValueError):
-            continue
-        records.append((song_id, difficulty, play_count))
-    imported = await MaiPlayCountORM.upsert_user_play_counts(db_session, user_id, records)
-
-    await UniMessage([At(flag="user", target=user_id), f"水鱼查分器更新成功！共更新了 {imported} 条记录"]).finish()
+    await submit_job_and_reply(event_session, user_id, "import_divingfish", run, dedupe_key="import")
 
 
 @alconna_import.assign("lxns")
 @catch_exception()
 async def handle_import_lxns(
-    event: Event, db_session: async_scoped_session, qr_code: Match[str] = AlconnaMatch("qr_code")
+    event: Event,
+    db_session: async_scoped_session,
+    event_session: EventSession,
+    qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
 
@@ -1138,46 +1190,30 @@ async def handle_import_lxns(
         ).finish()
         return
     user_token = bind_info.lxns_api_key
+    qr = qr_code.result
 
-    try:
-        all_scores = await run_extend_score_workflow(qr_code.result)
-    except RuntimeError as e:
-        logger.error(f"登录失败: {e}")
-        await UniMessage([At(flag="user", target=user_id), f"登录失败: {e}"]).finish()
-        return
-
-    if not all_scores:
-        await UniMessage([At(flag="user", target=user_id), "未获取到可用的游玩次数数据"]).finish()
-        return
-    logger.debug(f"获取到的成绩数量: {len(all_scores)}")
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在获取机台成绩")
+        try:
+            all_scores = await run_extend_score_workflow(qr)
+        except RuntimeError as e:
+            logger.error(f"登录失败: {e}")
+            raise RuntimeError(f"登录失败: {e}") from e
 
-    updated_scores = await get_updated_score(all_scores, user_token)  # type: ignore
-    logger.debug(f"需要更新的成绩数量: {len(updated_scores)}")
-    if not updated_scores:
-        await UniMessage([At(flag="user", target=user_id), "没有需要更新的成绩"]).finish()
-        return
+        if not all_scores:
+            raise ValueError("未获取到可用的游玩次数数据")
+        logger.debug(f"获取到的成绩数量: {len(all_scores)}")
 
-    logger.debug("尝试上传至落雪服务器...")
-    upload_scores = convert_to_lxns_maimai_format(updated_scores)
-    await upload_to_lxns_maimai(user_token, upload_scores)
+        # 上传落雪的同时更新本地游玩次数数据库
+        await job.report_progress(f"正在上传 {len(all_scores)} 条成绩")
+        report = await import_scores(job.session, user_id, all_scores, lxns_token=user_token)
+        if report.errors:
+            return f"成绩部分导入成功: {report.format_outcomes()}"
+        if not report.lxns_uploaded:
+            return "没有需要更新的成绩"
+        return f"落雪查分器更新成功！共更新了 {report.lxns_uploaded} 条记录"
 
-    # 同时更新本地游玩次数数据库
-    records: list[tuple[int, int, int]] = []
-    for item in all_scores:
-        if not isinstance(item, dict):
-            continue
-        try:
-            song_id = int(item["musicId"])
-            difficulty = int(item["level"])
-            play_count = int(item["playCount"])
-        except (KeyError, TypeError, ValueError):
-            continue
-        records.append((song_id, difficulty, play_count))
-    await MaiPlayCountORM.upsert_user_play_counts(db_session, user_id, records)
-
-    await UniMessage(
-        [At(flag="user", target=user_id), f"落雪查分器更新成功！共更新了 {len(updated_scores)} 条记录"]
-    ).finish()
+    await submit_job_and_reply(event_session, user_id, "import_lxns", run, dedupe_key="import")
 
 
 @alconna_import.assign("all")
@@ -1185,6 +1221,7 @@ async def handle_import_lxns(
 async def handle_import_all(
     event: Event,
     db_session: async_scoped_session,
+    event_session: EventSession,
     qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
@@ -1214,46 +1251,36 @@ async def handle_import_all(
         return
     divingfish_import_token = bind_info.diving_fish_import_token
     lxns_user_token = bind_info.lxns_api_key
-
-    all_scores = await run_extend_score_workflow(qr_code.result)
-    if not all_scores:
-        await UniMessage([At(flag="user", target=user_id), "未获取到可用的游玩次数数据"]).finish()
-        return
-    logger.debug(f"获取到的成绩数量: {len(all_scores)}")
-
-    # divingfish
-    logger.debug("更新水鱼查分器...")
-    divingfish_scores = await convert_to_diving_fish_format(all_scores)
-    await upload_to_diving_fish(divingfish_import_token, divingfish_scores)
-
-    # lxns
-    logger.debug("更新落雪查分器...")
-    updated_scores = await get_updated_score(all_scores, lxns_user_token)  # type: ignore
-    logger.debug(f"更新的成绩数量: {len(all_scores) - len(updated_scores)}")
-    lxns_scores = convert_to_lxns_maimai_format(updated_scores)
-    await upload_to_lxns_maimai(lxns_user_token, lxns_scores)
-
-    # 同时更新本地游玩次数数据库
-    records: list[tuple[int, int, int]] = []
-    for item in all_scores:
-        if not isinstance(item, dict):
-            continue
-        try:
-            song_id = int(item["musicId"])
-            difficulty = int(item["level"])
-            play_count = int(item["playCount"])
-        except (KeyError, TypeError, ValueError):
-            continue
-        records.append((song_id, difficulty, play_count))
-    imported = await MaiPlayCountORM.upsert_user_play_counts(db_session, user_id, records)
-
-    await UniMessage([At(flag="user", target=user_id), f"查分器更新成功！共更新了 {imported} 条记录"]).finish()
+    qr = qr_code.result
+
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在获取机台成绩")
+        all_scores = await run_extend_score_workflow(qr)
+        if not all_scores:
+            raise ValueError("未获取到可用的游玩次数数据")
+        logger.debug(f"获取到的成绩数量: {len(all_scores)}")
+
+        # 并发更新水鱼、落雪查分器与本地游玩次数数据库
+        await job.report_progress(f"正在上传 {len(all_scores)} 条成绩")
+        report = await import_scores(
+            job.session,
+            user_id,
+            all_scores,
+            divingfish_token=divingfish_import_token,
+            lxns_token=lxns_user_token,
+        )
+        if report.errors:
+            return f"成绩部分导入成功: {report.format_outcomes()}"
+        return f"查分器更新成功！共更新了 {report.play_count_imported} 条记录"
+
+    await submit_job_and_reply(event_session, user_id, "import_all", run, dedupe_key="import")
 
 
 @alconna_ticket.handle()
 @catch_exception("发送倍票失败")
 async def handle_ticket(
     event: Event,
+    event_session: EventSession,
     qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
@@ -1271,9 +1298,14 @@ async def handle_ticket(
         ).finish()
         return
 
-    await run_extend_ticket_workflow(qr_code.result)
+    qr = qr_code.result
 
-    await UniMessage([At(flag="user", target=user_id), "已成功发送了 6 倍票"]).finish()
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在发送倍票")
+        await run_extend_ticket_workflow(qr)
+        return "已成功发送了 6 倍票"
+
+    await submit_job_and_reply(event_session, user_id, "ticket", run)
 
 
 @alconna_logout.handle()
@@ -1305,6 +1337,7 @@ async def handle_logout(
 @catch_exception()
 async def handle_rikka_unlock(
     event: Event,
+    event_session: EventSession,
     qr_code: Match[str] = AlconnaMatch("qr_code"),
 ):
     user_id = event.get_user_id()
@@ -1322,8 +1355,49 @@ async def handle_rikka_unlock(
         ).finish()
         return
 
-    await run_unlock_workflow(qr_code.result)
-    await UniMessage([At(flag="user", target=user_id), "解锁成功！"]).finish()
+    qr = qr_code.result
+
+    async def run(job: JobContext) -> str:
+        await job.report_progress("正在解锁")
+        await run_unlock_workflow(qr)
+        return "解锁成功！"
+
+    await submit_job_and_reply(event_session, user_id, "unlock", run)
+
+
+@alconna_job.handle()
+async def handle_job_status(
+    event: Event,
+    db_session: async_scoped_session,
+    job_id: Match[int] = AlconnaMatch("job_id"),
+):
+    user_id = event.get_user_id()
+
+    if job_id.available:
+        job = await BackgroundJobORM.get_job(db_session, job_id.result)
+        if not job or job.user_id != user_id:
+            await UniMessage([At(flag="user", target=user_id), f"未找到任务 #{job_id.result}"]).finish()
+            return
+        jobs = [job]
+    else:
+        jobs = await BackgroundJobORM.get_user_jobs(db_session, user_id)
+        if not jobs:
+            await UniMessage([At(flag="user", target=user_id), "你还没有提交过后台任务"]).finish()
+            return
+
+    await UniMessage([At(flag="user", target=user_id), "\n\n".join(format_job(job) for job in jobs)]).finish()
+
+
+@alconna_latency.handle()
+async def handle_latency(event: Event, command: Match[UniMessage] = AlconnaMatch("command")):
+    user_id = event.get_user_id()
+    nb_config = get_driver().config
+
+    if user_id not in nb_config.superusers:
+        await UniMessage("查看耗时统计需要管理员权限哦").finish()
+
+    name = command.result.extract_plain_text().strip() if command.available else ""
+    await UniMessage(format_latency_report(name or None)).finish()
 
 
 @alconna_unbind.handle()
@@ -1400,9 +1474,37 @@ async def handle_source(
     ).finish()
 
 
+async def _get_lxns_personal_params(
+    db_session: async_scoped_session,
+    user_id: str,
+    score_provider: MaimaiPyScoreProvider,
+    params: MaimaiPyParams,
+) -> MaimaiPyParams:
+    """
+    获取用于查询完整成绩的参数
+
+    落雪查分器的开发者 API 无法获取完整成绩，此时需要改用玩家绑定的个人 API 密钥；
+    其他查分器直接返回原参数
+
+    :param params: 用于查询玩家信息的参数
+    """
+    if not isinstance(params.score_provider, LXNSProvider):
+        return params
+
+    user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
+    if user_bind_info is None or user_bind_info.lxns_api_key is None:
+        await UniMessage("你还没有绑定任何查分器喵，请先用 /bind 绑定一个查分器谢谢喵").finish()
+
+    assert user_bind_info is not None  # shut up mypy
+    identifier: PlayerIdentifier = copy(params.identifier)
+    identifier.credentials = user_bind_info.lxns_api_key
+    return score_provider.ParamsType(params.score_provider, identifier)
+
+
 @alconna_b50.handle()
 @alconna_mai.assign("b50")
 @catch_exception()
+@traced("mai b50")
 async def handle_mai_b50(
     event: Event,
     db_session: async_scoped_session,
@@ -1412,19 +1514,22 @@ async def handle_mai_b50(
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
 
     logger.info(f"[{user_id}] 获取玩家 Best50, 查分器类型: {type(provider)}")
-    logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
-
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
+    logger.debug(f"[{user_id}] 1/3 获得用户鉴权凭证...")
 
-    logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
+        params = score_provider.ParamsType(provider, identifier)
 
-    logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家 Best50...")
-    player_b50 = await score_provider.fetch_player_b50(params)
+    logger.debug(f"[{user_id}] 2/3 并发请求玩家信息与 Best50...")
+    with span("fetch"):
+        player_info, player_b50 = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), renderer.prefetch_mai_profile),
+            then_prefetch(score_provider.fetch_player_b50(params), renderer.prefetch_mai_best50),
+        )
 
-    logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await renderer.render_mai_player_best50(player_b50, player_info)
+    logger.debug(f"[{user_id}] 3/3 渲染玩家数据...")
+    with span("render"):
+        pic = await renderer.render_mai_player_best50(player_b50, player_info)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1432,6 +1537,7 @@ async def handle_mai_b50(
 @alconna_ap50.handle()
 @alconna_mai.assign("ap50")
 @catch_exception()
+@traced("mai ap50")
 async def handle_mai_ap50(
     event: Event,
     db_session: async_scoped_session,
@@ -1441,28 +1547,23 @@ async def handle_mai_ap50(
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
 
     logger.info(f"[{user_id}] 获取玩家 AP50, 查分器类型: {type(score_provider)}")
-    logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
-
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
-
-    logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
-
-    logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家 AP 50...")
-    if isinstance(provider, LXNSProvider):
-        user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
-        if user_bind_info is None or user_bind_info.lxns_api_key is None:
-            await UniMessage("你还没有绑定任何查分器喵，请先用 /bind 绑定一个查分器谢谢喵").finish()
-            return  # Avoid TypeError.
+    logger.debug(f"[{user_id}] 1/3 获得用户鉴权凭证...")
 
-        identifier.credentials = user_bind_info.lxns_api_key
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
         params = score_provider.ParamsType(provider, identifier)
+        scores_params = await _get_lxns_personal_params(db_session, user_id, score_provider, params)
 
-    player_ap50 = await score_provider.fetch_player_ap50(params)
+    logger.debug(f"[{user_id}] 2/3 并发请求玩家信息与 AP 50...")
+    with span("fetch"):
+        player_info, player_ap50 = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), renderer.prefetch_mai_profile),
+            then_prefetch(score_provider.fetch_player_ap50(scores_params), renderer.prefetch_mai_best50),
+        )
 
-    logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await renderer.render_mai_player_best50(player_ap50, player_info)
+    logger.debug(f"[{user_id}] 3/3 渲染玩家数据...")
+    with span("render"):
+        pic = await renderer.render_mai_player_best50(player_ap50, player_info)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1470,22 +1571,25 @@ async def handle_mai_ap50(
 @alconna_r50.handle()
 @alconna_mai.assign("r50")
 @catch_exception()
+@traced("mai r50")
 async def handle_mai_r50(
     event: Event, db_session: async_scoped_session, score_provider: LXNSScoreProvider = Depends(get_lxns_provider)
 ):
     user_id = event.get_user_id()
 
     logger.info(f"[{user_id}] 获取玩家 Recent 50, 查分器名称: {score_provider.provider}")
-    logger.debug(f"[{user_id}] 1/4 尝试从数据库中获取玩家绑定信息...")
+    logger.debug(f"[{user_id}] 1/3 尝试从数据库中获取玩家绑定信息...")
 
-    user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
+    with span("auth"):
+        user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
 
     new_player_friend_code = None
     if user_bind_info is None and user_id.isdigit():
         logger.warning(f"[{user_id}] 未能获取玩家码，数据库中不存在绑定的玩家数据")
-        logger.debug(f"[{user_id}] 1/4 尝试通过 QQ 请求玩家数据")
+        logger.debug(f"[{user_id}] 1/3 尝试通过 QQ 请求玩家数据")
         try:
-            player_info = await score_provider.fetch_player_info_by_qq(user_id)
+            with span("fetch"):
+                player_info = await score_provider.fetch_player_info_by_qq(user_id)
             new_player_friend_code = player_info.friend_code
         except ClientResponseError as e:
             logger.warning(f"[{user_id}] 无法通过 QQ 号请求玩家数据: {e.code}: {e.message}")
@@ -1509,15 +1613,17 @@ async def handle_mai_r50(
             ]
         ).finish()
         return
-    logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
+    logger.debug(f"[{user_id}] 2/3 并发请求玩家信息与 Recent 50...")
     params = score_provider.ParamsType(friend_code=friend_code)
-    player_info = await score_provider.fetch_player_info(params)
+    with span("fetch"):
+        player_info, player_r50 = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), renderer.prefetch_mai_profile),
+            then_prefetch(score_provider.fetch_player_r50(friend_code), renderer.prefetch_mai_scores),
+        )
 
-    logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家 Recent 50...")
-    player_r50 = await score_provider.fetch_player_r50(friend_code)
-
-    logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await renderer.render_mai_player_scores(player_r50, player_info, title="Recent 50")
+    logger.debug(f"[{user_id}] 3/3 渲染玩家数据...")
+    with span("render"):
+        pic = await renderer.render_mai_player_scores(player_r50, player_info, title="Recent 50")
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1525,6 +1631,7 @@ async def handle_mai_r50(
 @alconna_pc50.handle()
 @alconna_mai.assign("pc50")
 @catch_exception()
+@traced("mai pc50")
 async def handle_pc50(
     event: Event,
     db_session: async_scoped_session,
@@ -1543,28 +1650,23 @@ async def handle_pc50(
 
     logger.info(f"[{user_id}] 获取玩家 PC50, 查分器类型: {type(provider)}")
 
-    logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
-
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
-
-    logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
-
-    logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家所有成绩...")
-    if isinstance(provider, LXNSProvider):
-        user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
-        if user_bind_info is None or user_bind_info.lxns_api_key is None:
-            await UniMessage("你还没有绑定任何查分器喵，请先用 /bind 绑定一个查分器谢谢喵").finish()
-            return  # Avoid TypeError.
+    logger.debug(f"[{user_id}] 1/3 获得用户鉴权凭证...")
 
-        identifier.credentials = user_bind_info.lxns_api_key
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
         params = score_provider.ParamsType(provider, identifier)
+        scores_params = await _get_lxns_personal_params(db_session, user_id, score_provider, params)
 
-    player_scores = await score_provider.fetch_player_pc50(params)
+    logger.debug(f"[{user_id}] 2/3 并发请求玩家信息与所有成绩...")
+    with span("fetch"):
+        player_info, player_scores = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), renderer.prefetch_mai_profile),
+            then_prefetch(score_provider.fetch_player_pc50(scores_params), renderer.prefetch_mai_best50),
+        )
 
-    logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await renderer.render_mai_player_best50(player_scores, player_info)
+    logger.debug(f"[{user_id}] 3/3 渲染玩家数据...")
+    with span("render"):
+        pic = await renderer.render_mai_player_best50(player_scores, player_info)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1572,6 +1674,7 @@ async def handle_pc50(
 @alconna_n50.handle()
 @alconna_mai.assign("n50")
 @catch_exception()
+@traced("mai n50")
 async def handle_n50(
     event: Event,
     db_session: async_scoped_session,
@@ -1581,31 +1684,28 @@ async def handle_n50(
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
 
     logger.info(f"[{user_id}] 获取玩家 N50, 查分器类型: {type(provider)}")
-    logger.debug(f"[{user_id}] 1/5 获得用户鉴权凭证...")
-
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
-
-    logger.debug(f"[{user_id}] 2/5 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
-
-    logger.debug(f"[{user_id}] 3/5 发起 API 请求玩家所有成绩")
-    if isinstance(provider, LXNSProvider):
-        user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
-        if user_bind_info is None or user_bind_info.lxns_api_key is None:
-            await UniMessage("你还没有绑定任何查分器喵，请先用 /bind 绑定一个查分器谢谢喵").finish()
-            return  # Avoid TypeError.
+    logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
 
-        identifier.credentials = user_bind_info.lxns_api_key
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
         params = score_provider.ParamsType(provider, identifier)
-    player_scores = await score_provider.fetch_player_scoreslist(params)
-
-    logger.debug(f"[{user_id}] 4/5 计算 N50...")
-    player_n50 = get_players_n50(player_scores)
+        scores_params = await _get_lxns_personal_params(db_session, user_id, score_provider, params)
+
+    logger.debug(f"[{user_id}] 2/4 并发请求玩家信息与所有成绩...")
+    with span("fetch"):
+        player_info, player_scores = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), renderer.prefetch_mai_profile),
+            score_provider.fetch_player_scoreslist(scores_params),
+        )
+
+    logger.debug(f"[{user_id}] 3/4 计算 N50...")
+    with span("compute", scores=len(player_scores)):
+        player_n50 = get_players_n50(player_scores)
     player_info.rating = player_n50.rating
 
-    logger.debug(f"[{user_id}] 5/5 渲染玩家数据...")
-    pic = await renderer.render_mai_player_best50(player_n50, player_info, calc_song_level_value=False)
+    logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
+    with span("render"):
+        pic = await renderer.render_mai_player_best50(player_n50, player_info, calc_song_level_value=False)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1703,24 +1803,12 @@ async def handle_random(
 
     logger.info(f"[{user_id}] 随机抽取乐曲, 条件 diff={diff_name}, level={level_value}, const={level_const}")
 
-    song_ids = await MaiSongORM.get_all_song_ids(db_session)
-    songs = await MaiSongORM.get_songs_info_by_ids(db_session, list(song_ids))
-
-    def match_song(song: MaiSong) -> bool:
-        candidates = list(song.difficulties.standard) + list(song.difficulties.dx)
-        for d in candidates:
-            if diff_value is not None and d.difficulty != diff_value:
-                continue
-            if level_value and d.level != level_value:
-                continue
-            if level_const is not None and abs(d.level_value - level_const) > 1e-6:
-                continue
-            return True
-        return False
+    if not MaiSongORM._cache:
+        await MaiSongORM.refresh_cache(db_session)
 
-    filtered_songs = [s for s in songs if match_song(s)]
+    song = get_mai_song_buckets().choice(diff_value, level_value, level_const)
 
-    if not filtered_songs:
+    if song is None:
         await UniMessage(
             [
                 At(flag="user", target=user_id),
@@ -1729,7 +1817,6 @@ async def handle_random(
         ).finish()
         return
 
-    song = random.choice(filtered_songs)
     response = _build_maisong_info_message(user_id, song)
 
     await response.finish()
@@ -1738,7 +1825,7 @@ async def handle_random(
 @alconna_alias.assign("update")
 async def handle_alias_update(
     event: Event,
-    db_session: async_scoped_session,
+    event_session: EventSession,
 ):
     user_id = event.get_user_id()
     nb_config = get_driver().config
@@ -1746,18 +1833,13 @@ async def handle_alias_update(
     if user_id not in nb_config.superusers:
         await UniMessage("更新乐曲别名需要管理员权限哦").finish()
 
-    logger.info(f"[{user_id}] 更新乐曲别名列表")
+    async def run(job: JobContext) -> str:
+        logger.info(f"[{user_id}] 更新乐曲别名列表")
+        await update_song_alias_list(job.session)
+        logger.info(f"[{user_id}] 乐曲别名列表更新完成")
+        return "乐曲别名列表已更新完成 ⭐"
 
-    await update_song_alias_list(db_session)
-
-    logger.info(f"[{user_id}] 乐曲别名列表更新完成")
-
-    await UniMessage(
-        [
-            At(flag="user", target=user_id),
-            "乐曲别名列表已更新完成 ⭐",
-        ]
-    ).finish()
+    await submit_job_and_reply(event_session, user_id, "update_alias", run, dedupe_key="update")
 
 
 @alconna_alias.assign("add")
@@ -1859,6 +1941,7 @@ async def handle_alias_main(event: Event):
 @alconna_score.handle()
 @alconna_mai.assign("score")
 @catch_exception()
+@traced("mai score")
 async def handle_score(
     event: Event,
     db_session: async_scoped_session,
@@ -1892,11 +1975,13 @@ async def handle_score(
 
     logger.debug(f"[{user_id}] 3/5 获得用户鉴权凭证...")
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
+        params = score_provider.ParamsType(provider, identifier)
 
     logger.debug(f"[{user_id}] 4/5 发起 API 请求玩家信息...")
-    scores = await score_provider.fetch_player_minfo(params, song.id, "dx" if is_dx else "standard")
+    with span("fetch"):
+        scores = await score_provider.fetch_player_minfo(params, song.id, "dx" if is_dx else "standard")
 
     if not scores:
         await UniMessage(
@@ -1908,7 +1993,8 @@ async def handle_score(
         return
 
     logger.debug(f"[{user_id}] 5/5 渲染玩家数据...")
-    pic = await renderer.render_mai_player_song_info(song, scores)
+    with span("render"):
+        pic = await renderer.render_mai_player_song_info(song, scores)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -1916,6 +2002,7 @@ async def handle_score(
 @alconna_scorelist.handle()
 @alconna_mai.assign("scorelist")
 @catch_exception()
+@traced("mai scorelist")
 async def handle_scorelist(
     event: Event,
     db_session: async_scoped_session,
@@ -1988,17 +2075,20 @@ async def handle_scorelist(
 
     logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
-        db_session, user_id, provider, use_personal_api=True
-    )
-    params = score_provider.ParamsType(provider, identifier)
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
+            db_session, user_id, provider, use_personal_api=True
+        )
+        params = score_provider.ParamsType(provider, identifier)
     logger.debug(f"[{user_id}] 1/4 鉴权参数: {params}")
 
     logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
+    with span("fetch"):
+        player_info = await score_provider.fetch_player_info(params)
 
     logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家全部成绩...")
-    scores = await score_provider.fetch_player_scoreslist(params, level, level_value, ach, diff)  # type: ignore
+    with span("fetch"):
+        scores = await score_provider.fetch_player_scoreslist(params, level, level_value, ach, diff)  # type: ignore
 
     if not scores:
         await UniMessage(
@@ -2027,7 +2117,8 @@ async def handle_scorelist(
     title = f"{title} - 第 {page}/{total_pages} 页"
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await renderer.render_mai_player_scores(page_scores, player_info, title)
+    with span("render"):
+        pic = await renderer.render_mai_player_scores(page_scores, player_info, title)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -2060,6 +2151,7 @@ async def handle_unified_mai_main(event: Event):
 
 @alconna_plate_process.handle()
 @catch_exception()
+@traced("mai plate")
 async def handle_plate_process(
     event: Event,
     db_session: async_scoped_session,
@@ -2082,52 +2174,53 @@ async def handle_plate_process(
     extra_text = m.group(2) or ""
     use_difficult = "难" in extra_text
 
-    if plate_name == "真将":
-        await UniMessage([At(flag="user", target=user_id), "真系没有真将哦"]).finish()
-        return
-
     logger.info(f"[{user_id}] 查询牌子进度: {plate_name} {'难' if use_difficult else ''}")
 
     logger.debug(f"[{user_id}] 1/2 获得用户鉴权凭证...")
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
-        db_session, user_id, provider, use_personal_api=True
-    )
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
+            db_session, user_id, provider, use_personal_api=True
+        )
+
+    if not MaiSongORM._cache:
+        await MaiSongORM.refresh_cache(db_session)
 
     logger.debug(f"[{user_id}] 2/2 查询牌子进度...")
+    with span("fetch"):
+        scores = await score_provider.fetch_player_scoreslist(
+            MaimaiPyParams(score_provider=provider, identifier=identifier)
+        )
     try:
-        plate = await maimai_client.plates(identifier, plate_name, provider)
-    except InvalidPlateError:
-        await UniMessage([At(flag="user", target=user_id), f"无效的牌子: {plate_name}"]).finish()
-        return
-    except Exception as e:
-        await UniMessage([At(flag="user", target=user_id), f"查询牌子进度失败: {e}"]).finish()
+        data = get_plate_process_data(plate_name, scores)
+    except UnknownPlateError:
+        logger.debug(f"[{user_id}] 本地牌子表未收录 {plate_name}，使用 maimai.py 计算...")
+        try:
+            with span("fallback"):
+                total, cleared, remained = await score_provider.fetch_player_plate(
+                    MaimaiPyParams(score_provider=provider, identifier=identifier), plate_name
+                )
+        except InvalidPlateError:
+            await UniMessage([At(flag="user", target=user_id), f"无效的牌子: {plate_name}"]).finish()
+            return
+        data = build_plate_process_data(plate_name, total, cleared, remained)
+    except ProcessDataError as e:
+        await UniMessage([At(flag="user", target=user_id), str(e)]).finish()
         return
 
-    remained = await plate.get_remained()
-    cleared_count = await plate.count_cleared()
-    total_count = await plate.count_all()
+    cleared_count = data.cleared
+    total_count = data.total
 
     diff_names = ["Basic", "Advanced", "Expert", "Master", "Re:MASTER"]
-    level_index_to_diff = {
-        LevelIndex.BASIC: 0,
-        LevelIndex.ADVANCED: 1,
-        LevelIndex.EXPERT: 2,
-        LevelIndex.MASTER: 3,
-        LevelIndex.ReMASTER: 4,
-    }
 
     counts_by_diff = [0, 0, 0, 0, 0]
     unfinished_items = []
 
-    for obj in remained:
-        for level_idx in obj.levels:
-            diff_idx = level_index_to_diff.get(level_idx, 0)
-            counts_by_diff[diff_idx] += 1
-            diff = obj.song.get_difficulty(plate._major_type, level_idx)
-            level_value = diff.level_value if diff else 0.0
-            song_type = "DX" if plate._major_type == MaimaiPySongType.DX else "SD"
-            unfinished_items.append((obj.song.title, diff_idx, level_value, song_type))
+    for chart, _ in data.remained:
+        diff_idx = chart.difficulty.difficulty
+        counts_by_diff[diff_idx] += 1
+        song_type = "DX" if chart.is_dx else "SD"
+        unfinished_items.append((chart.song.title, diff_idx, chart.difficulty.level_value, song_type))
 
     if use_difficult:
         unfinished_items = [item for item in unfinished_items if item[2] > 13.6]
@@ -2154,6 +2247,7 @@ async def handle_plate_process(
 
 @alconna_level_process.handle()
 @catch_exception()
+@traced("mai level")
 async def handle_level_process(
     event: Event,
     db_session: async_scoped_session,
@@ -2185,21 +2279,21 @@ async def handle_level_process(
 
     logger.debug(f"[{user_id}] 1/3 获得用户鉴权凭证...")
     provider = await MaimaiPyScoreProvider.auto_get_score_provider(db_session, user_id)
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
-        db_session, user_id, provider, use_personal_api=True
-    )
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(
+            db_session, user_id, provider, use_personal_api=True
+        )
 
-    songs = list(MaiSongORM._cache.values())
-    if not songs:
+    if not MaiSongORM._cache:
         await MaiSongORM.refresh_cache(db_session)
-        songs = list(MaiSongORM._cache.values())
 
     logger.debug(f"[{user_id}] 2/3 发起 API 请求玩家所有成绩")
-    scores = await score_provider.fetch_player_scoreslist(
-        MaimaiPyParams(score_provider=provider, identifier=identifier)
-    )
+    params = MaimaiPyParams(score_provider=provider, identifier=identifier)
+    with span("fetch"):
+        snapshot = await score_provider.fetch_player_scores_snapshot(params)
+        scores = await score_provider.fetch_player_scoreslist(params)
     try:
-        data = get_level_process_data(songs, scores, raw_level, raw_plan)
+        data = get_player_progress(user_id, scores, snapshot).get(raw_level, raw_plan)
     except ProcessDataError as e:
         await UniMessage([At(flag="user", target=user_id), str(e)]).finish()
         return
@@ -2210,33 +2304,20 @@ async def handle_level_process(
     total_count = data.counts["total"]
     percentage = f"{data.counts['completed'] / total_count * 100:.2f}%" if total_left > 0 else "已完成"
 
+    # 从谱面表一次取出该等级全部谱面的定数，同一难度同时存在标准与 DX 谱面时以 DX 谱面为准
+    level_charts: dict[tuple[int, int], MaiChart] = {}
+    for chart in await MaiChartORM.get_charts_by_level(db_session, raw_level):
+        if chart.type == "dx" or (chart.song_id, chart.difficulty) not in level_charts:
+            level_charts[(chart.song_id, chart.difficulty)] = chart
+
     unfinished_items = []
     counts_by_diff = [0, 0, 0, 0, 0]
 
-    for song, _, diff_idx in data.unfinished:
-        counts_by_diff[diff_idx] += 1
-        level_val = 0.0
-        is_dx = False
-        for d in song.difficulties.standard:
-            if d.difficulty == diff_idx and d.level == raw_level:
-                level_val = d.level_value
-        for d in song.difficulties.dx:
-            if d.difficulty == diff_idx and d.level == raw_level:
-                level_val = d.level_value
-                is_dx = True
-        unfinished_items.append((song, diff_idx, level_val, is_dx))
-
-    for song, diff_idx in data.not_played:
+    for song, diff_idx in [(song, diff_idx) for song, _, diff_idx in data.unfinished] + data.not_played:
         counts_by_diff[diff_idx] += 1
-        level_val = 0.0
-        is_dx = False
-        for d in song.difficulties.standard:
-            if d.difficulty == diff_idx and d.level == raw_level:
-                level_val = d.level_value
-        for d in song.difficulties.dx:
-            if d.difficulty == diff_idx and d.level == raw_level:
-                level_val = d.level_value
-                is_dx = True
+        level_chart = level_charts.get((song.id, diff_idx))
+        level_val = level_chart.level_value if level_chart else 0.0
+        is_dx = level_chart is not None and level_chart.type == "dx"
         unfinished_items.append((song, diff_idx, level_val, is_dx))
 
     unfinished_items.sort(key=lambda x: x[2], reverse=True)
@@ -2261,7 +2342,7 @@ async def handle_level_process(
 @catch_exception()
 async def handle_update_songs(
     event: Event,
-    db_session: async_scoped_session,
+    event_session: EventSession,
 ):
     user_id = event.get_user_id()
     nb_config = get_driver().config
@@ -2269,71 +2350,67 @@ async def handle_update_songs(
     if user_id not in nb_config.superusers:
         await UniMessage("更新乐曲信息需要管理员权限哦").finish()
 
-    logger.info(f"[{user_id}] 更新乐曲信息数据库")
+    async def run(job: JobContext) -> str:
+        logger.info(f"[{user_id}] 更新乐曲信息数据库")
 
-    mai_updated_count = await update_maimai_song_database(db_session)
-    chu_updated_count = await update_chu_song_database(db_session)
-    updated_count = mai_updated_count + chu_updated_count
+        await job.report_progress("正在更新舞萌乐曲信息")
+        mai_updated_count = await update_maimai_song_database(job.session)
+        await job.report_progress("正在更新中二乐曲信息")
+        chu_updated_count = await update_chu_song_database(job.session)
+        updated_count = mai_updated_count + chu_updated_count
 
-    msg = f"乐曲信息数据库已更新完成，共更新 {updated_count}(Maimai: {mai_updated_count}, Chunithm: {chu_updated_count}) 首乐曲 ⭐"
+        msg = f"乐曲信息数据库已更新完成，共更新 {updated_count}(Maimai: {mai_updated_count}, Chunithm: {chu_updated_count}) 首乐曲 ⭐"
 
-    logger.info(f"[{user_id}] {msg}")
+        logger.info(f"[{user_id}] {msg}")
+        return msg
 
-    await UniMessage(
-        [
-            At(flag="user", target=user_id),
-            msg,
-        ]
-    ).finish()
+    await submit_job_and_reply(event_session, user_id, "update_songs", run, dedupe_key="update")
 
 
 @alconna_update.assign("alias")
 async def handle_update_aliases(
     event: Event,
-    db_session: async_scoped_session,
+    event_session: EventSession,
 ):
-    await handle_alias_update(event, db_session)
+    await handle_alias_update(event, event_session)
 
 
 @alconna_update.assign("chart")
-async def handle_update_chart(event: Event):
-    await update_local_chart_file()
+async def handle_update_chart(event: Event, event_session: EventSession):
+    async def run(job: JobContext) -> str:
+        await update_local_chart_file()
+        return "music_chart.json 文件已更新完成⭐"
 
-    await UniMessage(
-        [
-            At(flag="user", target=event.get_user_id()),
-            "music_chart.json 文件已更新完成⭐",
-        ]
-    ).finish()
+    await submit_job_and_reply(event_session, event.get_user_id(), "update_chart", run, dedupe_key="update")
 
 
 @alconna_update.assign("$main")
-async def handle_update_main(event: Event, db_session: async_scoped_session):
+async def handle_update_main(event: Event, event_session: EventSession):
     user_id = event.get_user_id()
     nb_config = get_driver().config
 
     if user_id not in nb_config.superusers:
         await UniMessage("更新乐曲信息需要管理员权限哦").finish()
 
-    logger.info(f"[{event.get_user_id()}] 未提供 update 参数，默认执行全量更新")
+    logger.info(f"[{user_id}] 未提供 update 参数，默认执行全量更新")
 
-    logger.debug(f"[{event.get_user_id()}] 1/3 更新 music_chart.json 文件")
-    await update_local_chart_file()
-    logger.debug(f"[{event.get_user_id()}] 2/3 更新乐曲数据库")
-    mai_updated_count = await update_maimai_song_database(db_session)
-    chu_updated_count = await update_chu_song_database(db_session)
-    updated_count = mai_updated_count + chu_updated_count
-    logger.debug(f"[{event.get_user_id()}] 3/3 更新数据库中的乐曲别名列表")
-    await update_song_alias_list(db_session)
+    async def run(job: JobContext) -> str:
+        logger.debug(f"[{user_id}] 1/3 更新 music_chart.json 文件")
+        await job.report_progress("1/3 更新 music_chart.json 文件")
+        await update_local_chart_file()
+        logger.debug(f"[{user_id}] 2/3 更新乐曲数据库")
+        await job.report_progress("2/3 更新乐曲数据库")
+        mai_updated_count = await update_maimai_song_database(job.session)
+        chu_updated_count = await update_chu_song_database(job.session)
+        updated_count = mai_updated_count + chu_updated_count
+        logger.debug(f"[{user_id}] 3/3 更新数据库中的乐曲别名列表")
+        await job.report_progress("3/3 更新数据库中的乐曲别名列表")
+        await update_song_alias_list(job.session)
 
-    logger.info(f"[{event.get_user_id()}] 全量更新完成，共更新 {updated_count} 首乐曲")
+        logger.info(f"[{user_id}] 全量更新完成，共更新 {updated_count} 首乐曲")
+        return f"全量更新已完成，共更新 {updated_count} 首乐曲 ⭐"
 
-    await UniMessage(
-        [
-            At(flag="user", target=event.get_user_id()),
-            f"全量更新已完成，共更新 {updated_count} 首乐曲 ⭐",
-        ]
-    ).finish()
+    await submit_job_and_reply(event_session, user_id, "update", run, dedupe_key="update")
 
 
 @alconna_fortune.handle()
@@ -2351,6 +2428,7 @@ async def handle_fortune(
 
 @alconna_analysis.handle()
 @catch_exception()
+@traced("mai analysis")
 async def handle_analysis(
     db_session: async_scoped_session,
     event: Event,
@@ -2372,8 +2450,9 @@ async def handle_analysis(
     logger.info(f"[{user_id}] 获取玩家底力表, 查分器类型: {type(provider)}")
     logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
 
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
+        params = score_provider.ParamsType(provider, identifier)
 
     logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家所有成绩")
     if isinstance(provider, LXNSProvider):
@@ -2384,15 +2463,20 @@ async def handle_analysis(
 
         identifier.credentials = user_bind_info.lxns_api_key
         params = score_provider.ParamsType(provider, identifier)
-    player_scores = await score_provider.fetch_player_scoreslist(params)
+    with span("fetch"):
+        player_scores = await score_provider.fetch_player_scoreslist(params)
 
     logger.debug(f"[{user_id}] 3/4 计算玩家成分")
     player_scores.sort(key=lambda x: x.dx_rating, reverse=True)
     player_scores = player_scores[:100]
-    player_strength = get_player_strength(player_scores)
+    with span("compute", scores=len(player_scores)):
+        player_strength = get_player_strength(player_scores)
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = draw_player_strength_analysis(player_strength)
+    from .painters import draw_player_strength_analysis
+
+    with span("render"):
+        pic = draw_player_strength_analysis(player_strength)
     byte = image_to_bytes(pic)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=byte)]).finish()
@@ -2400,6 +2484,7 @@ async def handle_analysis(
 
 @alconna_trend.handle()
 @catch_exception()
+@traced("mai trend")
 async def handle_trend(
     db_session: async_scoped_session,
     event: Event,
@@ -2442,14 +2527,16 @@ async def handle_trend(
     )
     logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
 
-    user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
+    with span("auth"):
+        user_bind_info = await UserBindInfoORM.get_user_bind_info(db_session, user_id)
 
     new_player_friend_code = None
     if user_bind_info is None and user_id.isdigit():
         logger.warning(f"[{user_id}] 未能获取玩家码，数据库中不存在绑定的玩家数据")
         logger.debug(f"[{user_id}] 1/4 尝试通过 QQ 请求玩家数据")
         try:
-            player_info = await score_provider.fetch_player_info_by_qq(user_id)
+            with span("fetch"):
+                player_info = await score_provider.fetch_player_info_by_qq(user_id)
             new_player_friend_code = player_info.friend_code
         except ClientResponseError as e:
             logger.warning(f"[{user_id}] 无法通过 QQ 号请求玩家数据: {e.code}: {e.message}")
@@ -2476,7 +2563,8 @@ async def handle_trend(
 
     logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家 Trend 趋势")
 
-    trends = await score_provider.fetch_player_trend(friend_code)
+    with span("fetch"):
+        trends = await score_provider.fetch_player_trend(friend_code)
 
     if range_days is not None:
         logger.debug(f"[{user_id}] 3/4 按时间窗口过滤 Trend 数据: {range_desc}")
@@ -2511,7 +2599,10 @@ async def handle_trend(
         return
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = draw_player_rating_trend(trends, show_standard_dx=(render_mode == "detailed"))
+    from .painters import draw_player_rating_trend
+
+    with span("render"):
+        pic = draw_player_rating_trend(trends, show_standard_dx=(render_mode == "detailed"))
     byte = image_to_bytes(pic)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=byte)]).finish()
@@ -2519,6 +2610,7 @@ async def handle_trend(
 
 @alconna_recommend.handle()
 @catch_exception()
+@traced("mai recommend")
 async def handle_recommend(
     db_session: async_scoped_session,
     event: Event,
@@ -2530,8 +2622,9 @@ async def handle_recommend(
     logger.info(f"[{user_id}] 获取玩家推分推荐, 查分器类型: {type(provider)}")
     logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
 
-    identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
-    params = score_provider.ParamsType(provider, identifier)
+    with span("auth", provider=type(provider).__name__):
+        identifier = await MaimaiPyScoreProvider.auto_get_player_identifier(db_session, user_id, provider)
+        params = score_provider.ParamsType(provider, identifier)
 
     logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家所有成绩")
     if isinstance(provider, LXNSProvider):
@@ -2542,18 +2635,18 @@ async def handle_recommend(
 
         identifier.credentials = user_bind_info.lxns_api_key
         params = score_provider.ParamsType(provider, identifier)
-    player_scores = await score_provider.fetch_player_scoreslist(params)
+    with span("fetch"):
+        player_scores = await score_provider.fetch_player_scoreslist(params)
 
     logger.debug(f"[{user_id}] 3/4 计算推分推荐...")
-    st = perf_counter()
-    player_scores.sort(key=lambda x: x.dx_rating, reverse=True)
-    min_dx_score = player_scores[:50][-1].dx_rating
-    recommend_songs = get_player_raise_score_songs(player_scores, round(min_dx_score))
-    et = perf_counter()
-    logger.debug(f"[{user_id}] 3/4 计算推分推荐用时 {(et - st):.3f}s")
+    with span("compute", scores=len(player_scores)):
+        player_scores.sort(key=lambda x: x.dx_rating, reverse=True)
+        min_dx_score = player_scores[:50][-1].dx_rating
+        recommend_songs = get_player_raise_score_songs(player_scores, round(min_dx_score))
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = DrawScores().draw_rise(recommend_songs, round(min_dx_score))
+    with span("render"):
+        pic = DrawScores().draw_rise(recommend_songs, round(min_dx_score))
     byte = image_to_bytes(pic)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=byte)]).finish()
@@ -2561,12 +2654,14 @@ async def handle_recommend(
 
 @alconna_maistatus.handle()
 @catch_exception(reply_prefix="获取舞萌状态失败")
+@traced("maistatus")
 async def handle_maistatus(event: Event):
     user_id = event.get_user_id()
 
     logger.debug("正在获取舞萌服务器状态...")
     try:
-        status_text = await get_maistatus()
+        with span("fetch"):
+            status_text = await get_maistatus()
     except Exception as e:
         status_text = f"服务器状态检测失败：{e}"
 
@@ -2578,7 +2673,8 @@ async def handle_maistatus(event: Event):
     logger.debug("正在尝试获取舞萌状态截图...")
     try:
         st = perf_counter()
-        png = await capture_maimai_status_png(config.maistatus_url)
+        with span("render"):
+            png = await capture_maimai_status_png(config.maistatus_url)
         et = perf_counter()
         render_time_message = f"渲染用时 {et - st:.2f} 秒"
     except Exception as e:
@@ -2651,6 +2747,7 @@ async def _get_chu_params(
 
 @alconna_chu.assign("b30")
 @catch_exception("获取中二节奏 Best 30 失败")
+@traced("chu b30")
 async def handle_chu_b30(
     event: Event,
     db_session: async_scoped_session,
@@ -2660,20 +2757,26 @@ async def handle_chu_b30(
 
     logger.info(f"[{user_id}] [中二节奏] 获取玩家 Best 30")
     logger.debug(f"[{user_id}] 1/3 获得用户鉴权凭证...")
-    params = await _get_chu_params(db_session, user_id)
+    with span("auth"):
+        params = await _get_chu_params(db_session, user_id)
 
-    logger.debug(f"[{user_id}] 2/3 发起 API 请求玩家 Best 30...")
-    player_info = await score_provider.fetch_player_info(params)
-    bests = await score_provider.fetch_player_bests(params)
+    logger.debug(f"[{user_id}] 2/3 并发请求玩家信息与 Best 30...")
+    with span("fetch"):
+        player_info, bests = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), chu_renderer.prefetch_chu_profile),
+            then_prefetch(score_provider.fetch_player_bests(params), chu_renderer.prefetch_chu_bests),
+        )
 
     logger.debug(f"[{user_id}] 3/3 渲染玩家数据...")
-    pic = await chu_renderer.render_chu_bests(player_info, bests)
+    with span("render"):
+        pic = await chu_renderer.render_chu_bests(player_info, bests)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
 
 @alconna_chu.assign("r50")
 @catch_exception("获取中二节奏 Recent 50 失败")
+@traced("chu r50")
 async def handle_chu_r50(
     event: Event,
     db_session: async_scoped_session,
@@ -2682,23 +2785,29 @@ async def handle_chu_r50(
     user_id = event.get_user_id()
 
     logger.info(f"[{user_id}] [中二节奏] 获取玩家 Recent 50")
-    params = await _get_chu_params(db_session, user_id)
+    with span("auth"):
+        params = await _get_chu_params(db_session, user_id)
 
-    player_info = await score_provider.fetch_player_info(params)
-    recents = await score_provider.fetch_player_recents(params)
+    with span("fetch"):
+        player_info, recents = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), chu_renderer.prefetch_chu_profile),
+            then_prefetch(score_provider.fetch_player_recents(params), chu_renderer.prefetch_chu_scores),
+        )
 
     if not recents:
         await UniMessage([At(flag="user", target=user_id), "暂无最近游玩记录"]).finish()
         return
 
     logger.debug(f"[{user_id}] 渲染玩家数据...")
-    pic = await chu_renderer.render_chu_player_scores(recents, player_info, title="Recent 50 列表")
+    with span("render"):
+        pic = await chu_renderer.render_chu_player_scores(recents, player_info, title="Recent 50 列表")
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
 
 @alconna_chu.assign("ap50")
 @catch_exception("获取中二节奏 AP 50 失败")
+@traced("chu ap50")
 async def handle_chu_ap30(
     event: Event,
     db_session: async_scoped_session,
@@ -2707,22 +2816,22 @@ async def handle_chu_ap30(
     user_id = event.get_user_id()
 
     logger.info(f"[{user_id}] [中二节奏] 获取玩家 AP 50")
-    params = await _get_chu_params(db_session, user_id)
+    with span("auth"):
+        params = await _get_chu_params(db_session, user_id)
 
-    player_info = await score_provider.fetch_player_info(params)
-    bests = await score_provider.fetch_player_bests(params)
+    with span("fetch"):
+        player_info, bests = await gather_stages(
+            then_prefetch(score_provider.fetch_player_info(params), chu_renderer.prefetch_chu_profile),
+            score_provider.fetch_player_bests(params),
+        )
 
-    from .score.chunithm._schema import ChuFullComboType
-
-    ap_scores: list[PlayerChuScore] = []
-    for s in bests.bests + bests.selections + bests.new_bests:
-        if s.full_combo in (ChuFullComboType.AJ, ChuFullComboType.AJC):
-            ap_scores.append(s)
-
-    ap_scores.sort(key=lambda x: x.rating, reverse=True)
+    score_set = ChuScoreSet.from_scores(bests.bests + bests.selections + bests.new_bests)
+    aj_codes = [ChuScoreSet.FULL_COMBO_CODES[t] for t in (ChuFullComboType.AJ, ChuFullComboType.AJC)]
+    ap_scores = score_set.filter(np.isin(score_set["full_combo"], aj_codes)).sort("rating").to_scores()
 
     logger.debug(f"[{user_id}] 渲染玩家数据...")
-    pic = await chu_renderer.render_chu_player_scores(ap_scores, player_info, title="AP 50 列表")
+    with span("render"):
+        pic = await chu_renderer.render_chu_player_scores(ap_scores, player_info, title="AP 50 列表")
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -2762,17 +2871,14 @@ async def handle_chu_random(
 
     logger.info(f"[{user_id}] [中二节奏] 随机抽取乐曲")
 
-    song_ids = await ChuSongORM.get_all_song_ids(db_session)
-    if not song_ids:
-        await UniMessage([At(flag="user", target=user_id), "乐曲数据库为空，请先执行 .update songs"]).finish()
-        return
+    if not ChuSongORM._cache:
+        await ChuSongORM.refresh_cache(db_session)
 
-    songs = await ChuSongORM.get_songs_info_by_ids(db_session, list(song_ids))
-    if not songs:
-        await UniMessage([At(flag="user", target=user_id), "获取乐曲列表失败"]).finish()
+    song = get_chu_song_buckets().choice()
+    if song is None:
+        await UniMessage([At(flag="user", target=user_id), "乐曲数据库为空，请先执行 .update songs"]).finish()
         return
 
-    song = random.choice(songs)
     await chu_renderer._ensure_cover(song.id)
     response = _build_chusong_info_message(user_id, song)
     await response.finish()
@@ -2780,6 +2886,7 @@ async def handle_chu_random(
 
 @alconna_chu.assign("score")
 @catch_exception()
+@traced("chu score")
 async def handle_chu_score(
     event: Event,
     db_session: async_scoped_session,
@@ -2802,11 +2909,13 @@ async def handle_chu_score(
         return
 
     logger.debug(f"[{user_id}] 2/4 获得用户鉴权凭证...")
-    params = await _get_chu_params(db_session, user_id, lxns_bind_required=True)
+    with span("auth"):
+        params = await _get_chu_params(db_session, user_id, lxns_bind_required=True)
     logger.debug(f"[{user_id}] 1/4 鉴权参数: {params}")
 
     logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家信息...")
-    scores = await score_provider.fetch_player_scores(params)
+    with span("fetch"):
+        scores = await score_provider.fetch_player_scores(params)
     scores = [s for s in scores if s.song_id == song.id]
 
     if not scores:
@@ -2819,13 +2928,15 @@ async def handle_chu_score(
         return
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await chu_renderer.render_chu_player_song_info(song, scores)
+    with span("render"):
+        pic = await chu_renderer.render_chu_player_song_info(song, scores)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
 
 @alconna_chu.assign("scorelist")
 @catch_exception()
+@traced("chu scorelist")
 async def handle_chu_scorelist(
     event: Event,
     db_session: async_scoped_session,
@@ -2902,14 +3013,17 @@ async def handle_chu_scorelist(
         return
 
     logger.debug(f"[{user_id}] 1/4 获得用户鉴权凭证...")
-    params = await _get_chu_params(db_session, user_id, lxns_bind_required=True)
+    with span("auth"):
+        params = await _get_chu_params(db_session, user_id, lxns_bind_required=True)
     logger.debug(f"[{user_id}] 1/4 鉴权参数: {params}")
 
     logger.debug(f"[{user_id}] 2/4 发起 API 请求玩家信息...")
-    player_info = await score_provider.fetch_player_info(params)
+    with span("fetch"):
+        player_info = await score_provider.fetch_player_info(params)
 
     logger.debug(f"[{user_id}] 3/4 发起 API 请求玩家全部成绩...")
-    scores = await score_provider.fetch_player_scores(params, use_user_api=True)
+    with span("fetch"):
+        scores = await score_provider.fetch_player_scores(params, use_user_api=True)
 
     filtered_scores: list[PlayerChuScore] = []
 
@@ -2955,7 +3069,8 @@ async def handle_chu_scorelist(
     title = f"{title} - 第 {page}/{total_pages} 页"
 
     logger.debug(f"[{user_id}] 4/4 渲染玩家数据...")
-    pic = await chu_renderer.render_chu_player_scores(page_scores, player_info, title)
+    with span("render"):
+        pic = await chu_renderer.render_chu_player_scores(page_scores, player_info, title)
 
     await UniMessage([At(flag="user", target=user_id), UniImage(raw=pic)]).finish()
 
@@ -2994,8 +3109,8 @@ async def handle_location_mai_search(
     keyword = name.result.extract_plain_text().strip()
     logger.info(f"[{user_id}] 搜索舞萌店铺, 关键词: {keyword}")
 
-    locations = await get_mai_locations()
-    result = search_locations(locations, keyword=keyword)
+    location_index = await get_mai_location_index()
+    result = search_locations(location_index, keyword=keyword)
 
     await UniMessage([At(flag="user", target=user_id), result]).finish()
 
@@ -3059,7 +3174,7 @@ async def handle_location_mai_subscribe(
 
     logger.info(f"[{user_id}] 订阅舞萌店铺变动, 关键词: {kw}, 群组: {group_id}")
 
-    await LocationSubscriptionORM.add_subscription(db_session, user_id, "mai", kw, group_id)
+    await LocationSubscriptionORM.add_subscription(db_session, user_id, "mai", kw, group_id, event_session.bot_id)
     await UniMessage(
         [At(flag="user", target=user_id), f"✅ 已订阅舞萌店铺变动提醒，关键词: {kw}（每次数据更新时检测新增/移除店铺）"]
     ).finish()
@@ -3134,8 +3249,8 @@ async def handle_location_chu_search(
     keyword = name.result.extract_plain_text().strip()
     logger.info(f"[{user_id}] 搜索中二店铺, 关键词: {keyword}")
 
-    locations = await get_chu_locations()
-    result = search_locations(locations, keyword=keyword)
+    location_index = await get_chu_location_index()
+    result = search_locations(location_index, keyword=keyword)
 
     await UniMessage([At(flag="user", target=user_id), result]).finish()
 
@@ -3165,7 +3280,7 @@ async def handle_location_chu_subscribe(
 
     logger.info(f"[{user_id}] 订阅中二店铺变动, 关键词: {kw}, 群组: {group_id}")
 
-    await LocationSubscriptionORM.add_subscription(db_session, user_id, "chu", kw, group_id)
+    await LocationSubscriptionORM.add_subscription(db_session, user_id, "chu", kw, group_id, event_session.bot_id)
     await UniMessage([At(flag="user", target=user_id), "已订阅中二店铺变动提醒"]).finish()
 
 
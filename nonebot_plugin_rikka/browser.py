@@ -3,7 +3,6 @@ from __future__ import annotations
 import asyncio
 
 from nonebot import get_driver, logger
-from playwright.async_api import async_playwright
 
 _driver = get_driver()
 
@@ -36,6 +35,9 @@ async def get_browser():
         logger.debug("启动 Chromium 浏览器以供 Playwright 使用...")
 
         if _playwright is None:
+            # Playwright 导入较慢，首次使用时才导入
+            from playwright.async_api import async_playwright
+
             _playwright = await async_playwright().start()
 
         _browser = await _playwright.chromium.launch(
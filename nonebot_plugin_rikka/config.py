@@ -39,8 +39,24 @@ class Config(BaseModel):
     scorelist_element_opacity: float = Field(1.0, le=1.0, ge=0.0)
     """成绩图元素不透明度"""
 
+    enable_sqlite_tuning: bool = True
+    """数据库为 SQLite 时启用 WAL、synchronous=NORMAL 等性能参数"""
     enable_subscribe_function: bool = False
     """启用机厅列表更新订阅功能（需要平台支持，建议在测试后使用）"""
+    outbound_global_interval: float = Field(0.5, ge=0.0)
+    """主动消息的全局最小发送间隔（秒），避免风控"""
+    outbound_target_interval: float = Field(1.0, ge=0.0)
+    """向同一目标发送主动消息的最小间隔（秒）"""
+    job_workers: int = Field(2, ge=1)
+    """同时执行的后台任务数量（导入成绩、发票、解锁与数据更新等）"""
+    job_max_active: int = Field(50, ge=1)
+    """排队中与执行中的后台任务总数上限，超出时拒绝提交新任务"""
+    enable_tracing: bool = True
+    """记录各指令及其阶段（鉴权、上游请求、资源预取、渲染、编码）的耗时"""
+    trace_window_size: int = Field(500, ge=10)
+    """每个指令及阶段保留的最近耗时样本数量，用于计算 p50/p95/p99"""
+    trace_slow_threshold: float = Field(5.0, gt=0)
+    """指令端到端耗时超过该值（秒）时输出包含各阶段耗时的慢请求日志"""
 
     @validator("static_resource_path")
     def validate_static_resource_path(cls, v: str) -> str:
@@ -1,31 +1,49 @@
 from .crud import (
+    BackgroundJobORM,
+    ChuChartORM,
     ChuSongAliasORM,
     ChuSongORM,
+    DBSession,
     LocationSubscriptionORM,
+    MaiChartORM,
     MaiPlayCountORM,
     MaiSongAliasORM,
     MaiSongORM,
+    OutboundMessageORM,
     UserBindInfoORM,
 )
 from .orm_models import (
+    BackgroundJob,
+    ChuChart,
     ChuSongAlias,
     LocationSubscription,
+    MaiChart,
     MaiPlayCount,
     MaiSongAlias,
+    OutboundMessage,
     UserBindInfo,
 )
 
 __all__ = [
+    "DBSession",
     "UserBindInfoORM",
     "UserBindInfo",
     "MaiSongORM",
     "MaiSongAliasORM",
     "MaiSongAlias",
+    "MaiChartORM",
+    "MaiChart",
     "MaiPlayCountORM",
     "MaiPlayCount",
     "ChuSongORM",
     "ChuSongAliasORM",
     "ChuSongAlias",
+    "ChuChartORM",
+    "ChuChart",
     "LocationSubscriptionORM",
     "LocationSubscription",
+    "OutboundMessageORM",
+    "OutboundMessage",
+    "BackgroundJobORM",
+    "BackgroundJob",
 ]
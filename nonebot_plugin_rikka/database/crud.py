@@ -1,11 +1,18 @@
 import json
-from dataclasses import asdict
-from typing import TYPE_CHECKING, Literal, Optional, Sequence
+import time
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from typing import TYPE_CHECKING, Any, Callable, Literal, Optional, Sequence, Union
 
 from nonebot import logger
 from nonebot_plugin_orm import async_scoped_session
-from sqlalchemy import select, update
+from sqlalchemy import and_, delete, exists, func, insert, not_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
+from ..models.bind_info import UserBindRecord
 from ..models.chu_song import (
     ChuSong,
     ChuSongDifficulties,
@@ -19,105 +26,130 @@ from ..models.song import (
     SongDifficultyUtage,
     SongNotes,
 )
+from .orm_models import BackgroundJob, ChuChart
 from .orm_models import ChuSong as ChuSongORMModel
-from .orm_models import ChuSongAlias, LocationSubscription, MaiPlayCount
+from .orm_models import ChuSongAlias, LocationSubscription, MaiChart, MaiPlayCount
 from .orm_models import MaiSong as MaiSongORMModel
-from .orm_models import MaiSongAlias, UserBindInfo
+from .orm_models import MaiSongAlias, OutboundMessage, UserBindInfo
 
 if TYPE_CHECKING:
     from ..updater.songs import MusicAliasResponseItem
 
 
+DBSession = Union[AsyncSession, async_scoped_session]
+"""数据库会话：消息处理器中为 scoped session，后台任务中为通过 `get_session()` 独立创建的会话"""
+
+
 class UserBindInfoORM:
+    _cache: "OrderedDict[str, Optional[UserBindRecord]]" = OrderedDict()
+    """绑定信息 LRU 缓存，未绑定的用户同样以 None 缓存"""
+    _CACHE_MAXSIZE: int = 2048
+
+    @staticmethod
+    def _convert(row: UserBindInfo) -> UserBindRecord:
+        """将 ORM 对象转换为不可变的绑定信息快照"""
+        return UserBindRecord(
+            user_id=row.user_id,
+            default_provider=row.default_provider,
+            mai_friend_code=row.mai_friend_code,
+            chu_friend_code=row.chu_friend_code,
+            lxns_api_key=row.lxns_api_key,
+            diving_fish_import_token=row.diving_fish_import_token,
+            diving_fish_username=row.diving_fish_username,
+            maimaipy_identifier=row.maimaipy_identifier,
+        )
+
     @staticmethod
-    async def get_user_bind_info(session: async_scoped_session, user_id: str) -> Optional[UserBindInfo]:
+    def _cache_put(user_id: str, record: Optional[UserBindRecord]) -> None:
+        """写入缓存并淘汰最久未使用的条目"""
+        cache = UserBindInfoORM._cache
+        cache[user_id] = record
+        cache.move_to_end(user_id)
+        while len(cache) > UserBindInfoORM._CACHE_MAXSIZE:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """清空绑定信息缓存"""
+        UserBindInfoORM._cache.clear()
+
+    @staticmethod
+    async def get_user_bind_info(session: DBSession, user_id: str) -> Optional[UserBindRecord]:
         """获取用户绑定信息"""
+        cache = UserBindInfoORM._cache
+        if user_id in cache:
+            cache.move_to_end(user_id)
+            return cache[user_id]
+
         result = await session.execute(select(UserBindInfo).where(UserBindInfo.user_id == user_id))
-        return result.scalar_one_or_none()
+        row = result.scalar_one_or_none()
+        record = UserBindInfoORM._convert(row) if row else None
+        UserBindInfoORM._cache_put(user_id, record)
+        return record
 
     @staticmethod
-    async def set_user_mai_friend_code(session: async_scoped_session, user_id: str, friend_code: str) -> None:
+    async def _upsert_user_bind_info(session: DBSession, user_id: str, **values: Optional[str]) -> None:
         """
-        设置用户舞萌好友码
+        更新用户绑定信息的指定字段，不存在时新建记录，提交成功后同步写入缓存
+
+        :param values: 需要更新的字段
         """
         bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
-        if bind_info:
-            await session.execute(
-                update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(mai_friend_code=friend_code)
-            )
-        else:
-            new_bind_info = UserBindInfo(user_id=user_id, mai_friend_code=friend_code)
-            session.add(new_bind_info)
-        await session.commit()
+        try:
+            if bind_info:
+                await session.execute(update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(**values))
+            else:
+                session.add(UserBindInfo(user_id=user_id, **values))
+            await session.commit()
+        except Exception:
+            UserBindInfoORM._cache.pop(user_id, None)
+            raise
+
+        # values 的字段与取值由调用的 set_* 方法保证，mypy 无法据 **kwargs 推断字面量类型
+        new_record = (
+            replace(bind_info, **values)  # type: ignore[arg-type]
+            if bind_info
+            else UserBindRecord(user_id=user_id, **values)  # type: ignore[arg-type]
+        )
+        UserBindInfoORM._cache_put(user_id, new_record)
+
+    @staticmethod
+    async def set_user_mai_friend_code(session: DBSession, user_id: str, friend_code: str) -> None:
+        """
+        设置用户舞萌好友码
+        """
+        await UserBindInfoORM._upsert_user_bind_info(session, user_id, mai_friend_code=friend_code)
 
     @staticmethod
-    async def set_user_chu_friend_code(session: async_scoped_session, user_id: str, friend_code: str) -> None:
+    async def set_user_chu_friend_code(session: DBSession, user_id: str, friend_code: str) -> None:
         """
         设置用户中二节奏好友码
         """
-        bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
-        if bind_info:
-            await session.execute(
-                update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(chu_friend_code=friend_code)
-            )
-        else:
-            new_bind_info = UserBindInfo(user_id=user_id, chu_friend_code=friend_code)
-            session.add(new_bind_info)
-        await session.commit()
+        await UserBindInfoORM._upsert_user_bind_info(session, user_id, chu_friend_code=friend_code)
 
     @staticmethod
-    async def set_lxns_api_key(session: async_scoped_session, user_id: str, api_key: str) -> None:
+    async def set_lxns_api_key(session: DBSession, user_id: str, api_key: str) -> None:
         """设置用户的落雪咖啡屋 API 密钥"""
-        bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
-        if bind_info:
-            await session.execute(
-                update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(lxns_api_key=api_key)
-            )
-        else:
-            new_bind_info = UserBindInfo(user_id=user_id, lxns_api_key=api_key)
-            session.add(new_bind_info)
-        await session.commit()
+        await UserBindInfoORM._upsert_user_bind_info(session, user_id, lxns_api_key=api_key)
 
     @staticmethod
     async def set_diving_fish_import_token(
-        session: async_scoped_session, user_id: str, import_token: str, diving_fish_username: str
+        session: DBSession, user_id: str, import_token: str, diving_fish_username: str
     ) -> None:
         """设置用户的水鱼查分器导入密钥"""
-        bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
-        if bind_info:
-            await session.execute(
-                update(UserBindInfo)
-                .where(UserBindInfo.user_id == user_id)
-                .values(diving_fish_import_token=import_token, diving_fish_username=diving_fish_username)
-            )
-        else:
-            new_bind_info = UserBindInfo(
-                user_id=user_id, diving_fish_import_token=import_token, diving_fish_username=diving_fish_username
-            )
-            session.add(new_bind_info)
-        await session.commit()
+        await UserBindInfoORM._upsert_user_bind_info(
+            session, user_id, diving_fish_import_token=import_token, diving_fish_username=diving_fish_username
+        )
 
     @staticmethod
-    async def set_maimaipy_identifier(session: async_scoped_session, user_id: str, maimaipy_identifier: str):
+    async def set_maimaipy_identifier(session: DBSession, user_id: str, maimaipy_identifier: str):
         """
         设置用户的 Maimai.py 鉴权凭证
         """
-        bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
-        if bind_info:
-            await session.execute(
-                update(UserBindInfo)
-                .where(UserBindInfo.user_id == user_id)
-                .values(maimaipy_identifier=maimaipy_identifier)
-            )
-        else:
-            new_bind_info = UserBindInfo(user_id=user_id, maimaipy_identifier=maimaipy_identifier)
-            session.add(new_bind_info)
-        await session.commit()
+        await UserBindInfoORM._upsert_user_bind_info(session, user_id, maimaipy_identifier=maimaipy_identifier)
 
     @staticmethod
-    async def set_default_provider(
-        session: async_scoped_session, user_id: str, provider: Literal["lxns", "divingfish"]
-    ) -> None:
+    async def set_default_provider(session: DBSession, user_id: str, provider: Literal["lxns", "divingfish"]) -> None:
         """
         设置默认查分器
 
@@ -130,14 +162,11 @@ class UserBindInfoORM:
             raise ValueError("用户未设置落雪咖啡屋 API 密钥，无法设置为默认查分器")
         elif provider == "divingfish" and not bind_info.diving_fish_import_token:
             raise ValueError("用户未设置水鱼查分器导入密钥，无法设置为默认查分器")
-        await session.execute(
-            update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(default_provider=provider)
-        )
-        await session.commit()
+        await UserBindInfoORM._upsert_user_bind_info(session, user_id, default_provider=provider)
 
     @staticmethod
     async def unset_user_bind_info(
-        session: async_scoped_session, user_id: str, provider: Optional[Literal["lxns", "divingfish", "maimai"]] = None
+        session: DBSession, user_id: str, provider: Optional[Literal["lxns", "divingfish", "maimai"]] = None
     ) -> None:
         """
         解绑用户查分器账号
@@ -149,25 +178,27 @@ class UserBindInfoORM:
             return
 
         if provider is None:
-            await session.delete(bind_info)
+            try:
+                await session.execute(delete(UserBindInfo).where(UserBindInfo.user_id == user_id))
+                await session.commit()
+            except Exception:
+                UserBindInfoORM._cache.pop(user_id, None)
+                raise
+            UserBindInfoORM._cache_put(user_id, None)
         elif provider == "lxns":
-            await session.execute(update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(lxns_api_key=None))
+            await UserBindInfoORM._upsert_user_bind_info(session, user_id, lxns_api_key=None)
         elif provider == "divingfish":
-            await session.execute(
-                update(UserBindInfo)
-                .where(UserBindInfo.user_id == user_id)
-                .values(diving_fish_import_token=None, diving_fish_username=None)
+            await UserBindInfoORM._upsert_user_bind_info(
+                session, user_id, diving_fish_import_token=None, diving_fish_username=None
             )
         elif provider == "maimai":
-            await session.execute(
-                update(UserBindInfo).where(UserBindInfo.user_id == user_id).values(maimaipy_identifier=None)
-            )
-
-        await session.commit()
+            await UserBindInfoORM._upsert_user_bind_info(session, user_id, maimaipy_identifier=None)
 
 
 class MaiSongORM:
     _cache: dict[int, MaiSong] = {}
+    _generation: int = 0
+    """曲目缓存版本，缓存内容发生变化时递增，供依赖曲目缓存的派生索引判断是否需要重建"""
 
     @classmethod
     def get_song_sync(cls, song_id: int) -> Optional[MaiSong]:
@@ -179,9 +210,10 @@ class MaiSongORM:
     @classmethod
     def update_cache(cls, song: MaiSong) -> None:
         cls._cache[song.id] = song
+        cls._generation += 1
 
     @staticmethod
-    async def refresh_cache(session: async_scoped_session) -> None:
+    async def refresh_cache(session: DBSession) -> None:
         """
         刷新缓存，从数据库加载所有曲目信息
         """
@@ -226,7 +258,7 @@ class MaiSongORM:
         )
 
     @staticmethod
-    async def save_song_info(session: async_scoped_session, song: MaiSong) -> None:
+    async def save_song_info(session: DBSession, song: MaiSong) -> None:
         """
         保存曲目信息到数据库
         """
@@ -247,11 +279,13 @@ class MaiSongORM:
             difficulties=json.dumps(difficulties_dict, ensure_ascii=False),
         )
         session.add(song_obj)
+        await session.flush()
+        await MaiChartORM.replace_charts(session, [song])
         await session.commit()
         MaiSongORM.update_cache(song)
 
     @staticmethod
-    async def save_song_info_batch(session: async_scoped_session, songs: list[MaiSong]) -> None:
+    async def save_song_info_batch(session: DBSession, songs: list[MaiSong]) -> None:
         """
         批量保存曲目信息到数据库，如果存在则更新
         """
@@ -296,12 +330,14 @@ class MaiSongORM:
                 )
                 session.add(song_obj)
 
+        await session.flush()
+        await MaiChartORM.replace_charts(session, songs)
         await session.commit()
         for song in songs:
             MaiSongORM.update_cache(song)
 
     @staticmethod
-    async def get_song_info(session: async_scoped_session, song_id: int) -> MaiSong:
+    async def get_song_info(session: DBSession, song_id: int) -> MaiSong:
         """
         获取曲目信息，如果数据库中不存在则从远程获取并保存
 
@@ -323,10 +359,11 @@ class MaiSongORM:
         return song_info
 
     @staticmethod
-    async def get_songs_info_by_ids(session: async_scoped_session, song_ids: list[int]) -> list[MaiSong]:
+    async def get_songs_info_by_ids(session: DBSession, song_ids: list[int]) -> list[MaiSong]:
         """
         批量获取曲目信息：
-        - 先用 IN 查询一次性取回数据库中已有的记录；
+        - 优先从内存缓存中读取；
+        - 再用 IN 查询一次性取回数据库中已有的记录；
         - 对缺失的 ID 再调用远程接口获取并落库；
         - 返回顺序与传入的 song_ids 一致，并去重。
         """
@@ -342,11 +379,15 @@ class MaiSongORM:
                 seen_ids.add(sid_int)
                 ordered_unique_ids.append(sid_int)
 
-        result = await session.execute(select(MaiSongORMModel).where(MaiSongORMModel.id.in_(ordered_unique_ids)))
-        rows = result.scalars().all()
-
         # 已有记录映射
-        id_to_song: dict[int, MaiSong] = {row.id: MaiSongORM._convert(row) for row in rows}
+        id_to_song: dict[int, MaiSong] = {
+            sid: MaiSongORM._cache[sid] for sid in ordered_unique_ids if sid in MaiSongORM._cache
+        }
+
+        uncached_ids = [sid for sid in ordered_unique_ids if sid not in id_to_song]
+        if uncached_ids:
+            result = await session.execute(select(MaiSongORMModel).where(MaiSongORMModel.id.in_(uncached_ids)))
+            id_to_song.update({row.id: MaiSongORM._convert(row) for row in result.scalars().all()})
 
         # 远程补齐缺失记录
         missing_ids = [sid for sid in ordered_unique_ids if sid not in id_to_song]
@@ -361,7 +402,7 @@ class MaiSongORM:
         return [id_to_song[sid] for sid in ordered_unique_ids if sid in id_to_song]
 
     @staticmethod
-    async def get_song_info_by_name_or_alias(session: async_scoped_session, name_or_alias: str) -> list[MaiSong]:
+    async def get_song_info_by_name_or_alias(session: DBSession, name_or_alias: str) -> list[MaiSong]:
         """
         通过乐曲名称或别名获取曲目信息
 
@@ -386,7 +427,7 @@ class MaiSongORM:
         return songs
 
     @staticmethod
-    async def get_all_song_ids(session: async_scoped_session) -> Sequence[int]:
+    async def get_all_song_ids(session: DBSession) -> Sequence[int]:
         """
         获取数据库中所有曲目的 ID 列表
         """
@@ -395,9 +436,116 @@ class MaiSongORM:
         return song_ids
 
 
+class MaiChartORM:
+    """舞萌DX 谱面表，按等级、定数等条件查询时无需解码曲目的 difficulties 列"""
+
+    @staticmethod
+    def _to_rows(song: MaiSong) -> list[dict[str, Any]]:
+        rows: dict[tuple[str, int], dict[str, Any]] = {}
+        for chart_type, charts in (("standard", song.difficulties.standard), ("dx", song.difficulties.dx)):
+            for chart in charts:
+                notes = chart.notes if isinstance(chart.notes, SongNotes) else SongNotes.from_dict(chart.notes or {})
+                rows[(chart_type, chart.difficulty)] = {
+                    "song_id": song.id,
+                    "type": chart_type,
+                    "difficulty": chart.difficulty,
+                    "level": chart.level,
+                    "level_value": chart.level_value or 0.0,
+                    "level_fit": chart.level_fit or 0.0,
+                    "designer": chart.note_designer or "",
+                    "version": chart.version or "",
+                    "notes_total": notes.total,
+                    "notes_tap": notes.tap,
+                    "notes_hold": notes.hold,
+                    "notes_slide": notes.slide,
+                    "notes_touch": notes.touch,
+                    "notes_break": notes.break_,
+                }
+        return list(rows.values())
+
+    @staticmethod
+    async def replace_charts(session: DBSession, songs: list[MaiSong]) -> None:
+        """
+        以曲目信息覆盖对应曲目的全部谱面，不提交事务
+
+        :param songs: 已写入曲目表的曲目
+        """
+        await session.execute(delete(MaiChart).where(MaiChart.song_id.in_([song.id for song in songs])))
+        rows = [row for song in songs for row in MaiChartORM._to_rows(song)]
+        if rows:
+            await session.execute(insert(MaiChart), rows)
+
+    @staticmethod
+    async def get_charts_by_level_value(
+        session: DBSession,
+        min_level_value: float,
+        max_level_value: float,
+        *,
+        difficulty: Optional[int] = None,
+        chart_type: Optional[Literal["standard", "dx"]] = None,
+    ) -> Sequence[MaiChart]:
+        """
+        获取定数在指定范围内的谱面，按定数降序排列
+
+        :param min_level_value: 最低定数（含）
+        :param max_level_value: 最高定数（含）
+        :param difficulty: 可选，仅获取指定难度的谱面
+        :param chart_type: 可选，仅获取指定类型的谱面
+        """
+        stmt = select(MaiChart).where(MaiChart.level_value.between(min_level_value, max_level_value))
+        if difficulty is not None:
+            stmt = stmt.where(MaiChart.difficulty == difficulty)
+        if chart_type:
+            stmt = stmt.where(MaiChart.type == chart_type)
+
+        result = await session.execute(stmt.order_by(MaiChart.level_value.desc(), MaiChart.song_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_charts_by_level(
+        session: DBSession,
+        level: str,
+        *,
+        difficulty: Optional[int] = None,
+        chart_type: Optional[Literal["standard", "dx"]] = None,
+    ) -> Sequence[MaiChart]:
+        """
+        获取指定标级的谱面，按定数降序排列
+
+        :param level: 难度标级，如 `13+`
+        :param difficulty: 可选，仅获取指定难度的谱面
+        :param chart_type: 可选，仅获取指定类型的谱面
+        """
+        stmt = select(MaiChart).where(MaiChart.level == level)
+        if difficulty is not None:
+            stmt = stmt.where(MaiChart.difficulty == difficulty)
+        if chart_type:
+            stmt = stmt.where(MaiChart.type == chart_type)
+
+        result = await session.execute(stmt.order_by(MaiChart.level_value.desc(), MaiChart.song_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_songs_by_level_value(
+        session: DBSession,
+        min_level_value: float,
+        max_level_value: float,
+        *,
+        difficulty: Optional[int] = None,
+        chart_type: Optional[Literal["standard", "dx"]] = None,
+    ) -> list[MaiSong]:
+        """
+        获取存在定数在指定范围内谱面的曲目，参数见 `get_charts_by_level_value`
+        """
+        charts = await MaiChartORM.get_charts_by_level_value(
+            session, min_level_value, max_level_value, difficulty=difficulty, chart_type=chart_type
+        )
+        return await MaiSongORM.get_songs_info_by_ids(session, [chart.song_id for chart in charts])
+
+
 class MaiSongAliasORM:
     @staticmethod
-    async def get_aliases(session: async_scoped_session, song_id: int) -> list[str]:
+    async def get_aliases(session: DBSession, song_id: int) -> list[str]:
         """
         获取曲目的所有别名
 
@@ -414,9 +562,7 @@ class MaiSongAliasORM:
         return list(set(aliases + custom_aliases))
 
     @staticmethod
-    async def update_aliases(
-        session: async_scoped_session, song_id: int, aliases: list[str], commit: bool = True
-    ) -> None:
+    async def update_aliases(session: DBSession, song_id: int, aliases: list[str], commit: bool = True) -> None:
         """
         更新曲目的别名列表
 
@@ -434,7 +580,7 @@ class MaiSongAliasORM:
             await session.commit()
 
     @staticmethod
-    async def add_custom_alias(session: async_scoped_session, song_id: int, custom_alias: str) -> None:
+    async def add_custom_alias(session: DBSession, song_id: int, custom_alias: str) -> None:
         """
         添加自定义别名到曲目
 
@@ -457,7 +603,7 @@ class MaiSongAliasORM:
         await session.commit()
 
     @staticmethod
-    async def add_alias_batch(session: async_scoped_session, song_to_aliases: "list[MusicAliasResponseItem]") -> None:
+    async def add_alias_batch(session: DBSession, song_to_aliases: "list[MusicAliasResponseItem]") -> None:
         """
         批量添加曲目别名
 
@@ -482,7 +628,7 @@ class MaiSongAliasORM:
         await session.commit()
 
     @staticmethod
-    async def find_song_by_alias(session: async_scoped_session, alias: str) -> list[MaiSong]:
+    async def find_song_by_alias(session: DBSession, alias: str) -> list[MaiSong]:
         """
         通过别名查找曲目信息
 
@@ -501,6 +647,8 @@ class MaiSongAliasORM:
 
 class ChuSongORM:
     _cache: dict[int, ChuSong] = {}
+    _generation: int = 0
+    """曲目缓存版本，缓存内容发生变化时递增，供依赖曲目缓存的派生索引判断是否需要重建"""
 
     @classmethod
     def get_song_sync(cls, song_id: int) -> Optional[ChuSong]:
@@ -512,9 +660,10 @@ class ChuSongORM:
     @classmethod
     def update_cache(cls, song: ChuSong) -> None:
         cls._cache[song.id] = song
+        cls._generation += 1
 
     @staticmethod
-    async def refresh_cache(session: async_scoped_session) -> None:
+    async def refresh_cache(session: DBSession) -> None:
         """
         刷新缓存，从数据库加载所有曲目信息
         """
@@ -556,7 +705,7 @@ class ChuSongORM:
         )
 
     @staticmethod
-    async def save_song_info(session: async_scoped_session, song: ChuSong) -> None:
+    async def save_song_info(session: DBSession, song: ChuSong) -> None:
         """
         保存曲目信息到数据库
         """
@@ -572,11 +721,13 @@ class ChuSongORM:
             difficulties=json.dumps(difficulties_list, ensure_ascii=False),
         )
         session.add(song_obj)
+        await session.flush()
+        await ChuChartORM.replace_charts(session, [song])
         await session.commit()
         ChuSongORM.update_cache(song)
 
     @staticmethod
-    async def save_song_info_batch(session: async_scoped_session, songs: list[ChuSong]) -> None:
+    async def save_song_info_batch(session: DBSession, songs: list[ChuSong]) -> None:
         """
         批量保存曲目信息到数据库，如果存在则更新
         """
@@ -614,12 +765,14 @@ class ChuSongORM:
                 )
                 session.add(song_obj)
 
+        await session.flush()
+        await ChuChartORM.replace_charts(session, songs)
         await session.commit()
         for song in songs:
             ChuSongORM.update_cache(song)
 
     @staticmethod
-    async def get_song_info(session: async_scoped_session, song_id: int) -> ChuSong:
+    async def get_song_info(session: DBSession, song_id: int) -> ChuSong:
         """
         获取曲目信息，如果数据库中不存在则从远程获取并保存
 
@@ -643,7 +796,7 @@ class ChuSongORM:
         return song_info
 
     @staticmethod
-    async def get_songs_info_by_ids(session: async_scoped_session, song_ids: list[int]) -> list[ChuSong]:
+    async def get_songs_info_by_ids(session: DBSession, song_ids: list[int]) -> list[ChuSong]:
         """
         批量获取曲目信息：
         - 先用 IN 查询一次性取回数据库中已有的记录；
@@ -683,7 +836,7 @@ class ChuSongORM:
         return [id_to_song[sid] for sid in ordered_unique_ids if sid in id_to_song]
 
     @staticmethod
-    async def get_song_info_by_name_or_alias(session: async_scoped_session, name_or_alias: str) -> list[ChuSong]:
+    async def get_song_info_by_name_or_alias(session: DBSession, name_or_alias: str) -> list[ChuSong]:
         """
         通过乐曲名称或别名获取曲目信息
 
@@ -708,7 +861,7 @@ class ChuSongORM:
         return songs
 
     @staticmethod
-    async def get_all_song_ids(session: async_scoped_session) -> Sequence[int]:
+    async def get_all_song_ids(session: DBSession) -> Sequence[int]:
         """
         获取数据库中所有曲目的 ID 列表
         """
@@ -717,9 +870,101 @@ class ChuSongORM:
         return song_ids
 
 
+class ChuChartORM:
+    """中二节奏谱面表，按等级、定数等条件查询时无需解码曲目的 difficulties 列"""
+
+    @staticmethod
+    def _to_rows(song: ChuSong) -> list[dict[str, Any]]:
+        rows: dict[int, dict[str, Any]] = {}
+        for chart in song.difficulties.difficulties:
+            notes = chart.notes
+            rows[chart.difficulty] = {
+                "song_id": song.id,
+                "difficulty": chart.difficulty,
+                "level": chart.level,
+                "level_value": chart.level_value or 0.0,
+                "designer": chart.note_designer or "",
+                "kanji": chart.kanji,
+                "notes_total": notes.total,
+                "notes_tap": notes.tap,
+                "notes_hold": notes.hold,
+                "notes_slide": notes.slide,
+                "notes_air": notes.air,
+                "notes_flick": notes.flick,
+            }
+        return list(rows.values())
+
+    @staticmethod
+    async def replace_charts(session: DBSession, songs: list[ChuSong]) -> None:
+        """
+        以曲目信息覆盖对应曲目的全部谱面，不提交事务
+
+        :param songs: 已写入曲目表的曲目
+        """
+        await session.execute(delete(ChuChart).where(ChuChart.song_id.in_([song.id for song in songs])))
+        rows = [row for song in songs for row in ChuChartORM._to_rows(song)]
+        if rows:
+            await session.execute(insert(ChuChart), rows)
+
+    @staticmethod
+    async def get_charts_by_level_value(
+        session: DBSession,
+        min_level_value: float,
+        max_level_value: float,
+        *,
+        difficulty: Optional[int] = None,
+    ) -> Sequence[ChuChart]:
+        """
+        获取定数在指定范围内的谱面，按定数降序排列
+
+        :param min_level_value: 最低定数（含）
+        :param max_level_value: 最高定数（含）
+        :param difficulty: 可选，仅获取指定难度的谱面
+        """
+        stmt = select(ChuChart).where(ChuChart.level_value.between(min_level_value, max_level_value))
+        if difficulty is not None:
+            stmt = stmt.where(ChuChart.difficulty == difficulty)
+
+        result = await session.execute(stmt.order_by(ChuChart.level_value.desc(), ChuChart.song_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_charts_by_level(
+        session: DBSession, level: str, *, difficulty: Optional[int] = None
+    ) -> Sequence[ChuChart]:
+        """
+        获取指定标级的谱面，按定数降序排列
+
+        :param level: 难度标级，如 `14+`
+        :param difficulty: 可选，仅获取指定难度的谱面
+        """
+        stmt = select(ChuChart).where(ChuChart.level == level)
+        if difficulty is not None:
+            stmt = stmt.where(ChuChart.difficulty == difficulty)
+
+        result = await session.execute(stmt.order_by(ChuChart.level_value.desc(), ChuChart.song_id))
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_songs_by_level_value(
+        session: DBSession,
+        min_level_value: float,
+        max_level_value: float,
+        *,
+        difficulty: Optional[int] = None,
+    ) -> list[ChuSong]:
+        """
+        获取存在定数在指定范围内谱面的曲目，参数见 `get_charts_by_level_value`
+        """
+        charts = await ChuChartORM.get_charts_by_level_value(
+            session, min_level_value, max_level_value, difficulty=difficulty
+        )
+        return await ChuSongORM.get_songs_info_by_ids(session, [chart.song_id for chart in charts])
+
+
 class ChuSongAliasORM:
     @staticmethod
-    async def get_aliases(session: async_scoped_session, song_id: int) -> list[str]:
+    async def get_aliases(session: DBSession, song_id: int) -> list[str]:
         """
         获取曲目的所有别名
 
@@ -736,9 +981,7 @@ class ChuSongAliasORM:
         return list(set(aliases + custom_aliases))
 
     @staticmethod
-    async def update_aliases(
-        session: async_scoped_session, song_id: int, aliases: list[str], commit: bool = True
-    ) -> None:
+    async def update_aliases(session: DBSession, song_id: int, aliases: list[str], commit: bool = True) -> None:
         """
         更新曲目的别名列表
 
@@ -756,7 +999,7 @@ class ChuSongAliasORM:
             await session.commit()
 
     @staticmethod
-    async def add_custom_alias(session: async_scoped_session, song_id: int, custom_alias: str) -> None:
+    async def add_custom_alias(session: DBSession, song_id: int, custom_alias: str) -> None:
         """
         添加自定义别名到曲目
 
@@ -779,7 +1022,7 @@ class ChuSongAliasORM:
         await session.commit()
 
     @staticmethod
-    async def add_alias_batch(session: async_scoped_session, song_to_aliases: "list[MusicAliasResponseItem]") -> None:
+    async def add_alias_batch(session: DBSession, song_to_aliases: "list[MusicAliasResponseItem]") -> None:
         """
         批量添加曲目别名
 
@@ -804,7 +1047,7 @@ class ChuSongAliasORM:
         await session.commit()
 
     @staticmethod
-    async def find_song_by_alias(session: async_scoped_session, alias: str) -> list[ChuSong]:
+    async def find_song_by_alias(session: DBSession, alias: str) -> list[ChuSong]:
         """
         通过别名查找曲目信息
 
@@ -841,15 +1084,21 @@ def _parse_chu_song_from_api(raw: dict) -> ChuSong:
 
 
 class MaiPlayCountORM:
+    _UPSERT_BATCH_SIZE: int = 200
+    """单条 UPSERT 语句写入的记录数量，每条记录占用 4 个绑定参数，需低于 SQLite 的参数数量上限"""
+    _UPSERT_INSERTS: dict[str, Callable[..., Any]] = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+    """支持 `ON CONFLICT DO UPDATE` 的数据库方言 -> 对应的 insert 构造函数"""
+
     @staticmethod
-    async def upsert_user_play_counts(
-        session: async_scoped_session, user_id: str, records: list[tuple[int, int, int]]
-    ) -> int:
+    async def upsert_user_play_counts(session: DBSession, user_id: str, records: list[tuple[int, int, int]]) -> int:
         """
         批量写入用户游玩次数。
 
+        SQLite 与 PostgreSQL 下分批执行 `INSERT ... ON CONFLICT DO UPDATE`，仅更新游玩次数发生变化的记录，
+        变化数量由数据库返回；其他数据库回退为查询后逐条比较写入
+
         :param records: (song_id, difficulty, play_count)
-        :return: 实际处理的记录数量
+        :return: 实际新增或更新的记录数量
         """
         if not records:
             return 0
@@ -858,6 +1107,41 @@ class MaiPlayCountORM:
         for song_id, difficulty, play_count in records:
             unique_map[(song_id, difficulty)] = play_count
 
+        dialect = session.get_bind(mapper=MaiPlayCount).dialect.name
+        insert = MaiPlayCountORM._UPSERT_INSERTS.get(dialect)
+        if insert is None:
+            return await MaiPlayCountORM._upsert_user_play_counts_fallback(session, user_id, unique_map)
+
+        rows = [
+            {"user_id": user_id, "song_id": song_id, "difficulty": difficulty, "play_count": play_count}
+            for (song_id, difficulty), play_count in unique_map.items()
+        ]
+
+        updated = 0
+        batch_size = MaiPlayCountORM._UPSERT_BATCH_SIZE
+        for start in range(0, len(rows), batch_size):
+            stmt = insert(MaiPlayCount).values(rows[start : start + batch_size])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MaiPlayCount.user_id, MaiPlayCount.song_id, MaiPlayCount.difficulty],
+                set_={"play_count": stmt.excluded.play_count},
+                where=MaiPlayCount.play_count != stmt.excluded.play_count,
+            )
+            result = await session.execute(stmt)
+            updated += result.rowcount  # type: ignore[attr-defined]
+
+        await session.commit()
+        return updated
+
+    @staticmethod
+    async def _upsert_user_play_counts_fallback(
+        session: DBSession, user_id: str, unique_map: dict[tuple[int, int], int]
+    ) -> int:
+        """
+        不支持 `ON CONFLICT` 的数据库下查询已有记录后逐条写入
+
+        :param unique_map: (song_id, difficulty) -> play_count
+        :return: 实际新增或更新的记录数量
+        """
         updated = len(unique_map)
 
         song_ids = [key[0] for key in unique_map]
@@ -888,7 +1172,7 @@ class MaiPlayCountORM:
 
     @staticmethod
     async def get_user_play_count_map(
-        session: async_scoped_session, user_id: str, song_ids: list[int]
+        session: DBSession, user_id: str, song_ids: list[int]
     ) -> dict[tuple[int, int], int]:
         """
         获取用户游玩次数映射
@@ -903,7 +1187,7 @@ class MaiPlayCountORM:
         return {(row.song_id, row.difficulty): row.play_count for row in rows}
 
     @staticmethod
-    async def get_all_user_play_counts(session: async_scoped_session, user_id: str) -> Sequence[MaiPlayCount]:
+    async def get_all_user_play_counts(session: DBSession, user_id: str) -> Sequence[MaiPlayCount]:
         """
         获取用户所有游玩次数记录
         """
@@ -915,13 +1199,17 @@ class MaiPlayCountORM:
 class LocationSubscriptionORM:
     """店铺变动订阅管理"""
 
+    _generation: int = 0
+    """订阅版本，订阅发生增删时递增，供缓存的订阅匹配器判断是否需要重建"""
+
     @staticmethod
     async def add_subscription(
-        session: async_scoped_session,
+        session: DBSession,
         user_id: str,
         game_type: str,
         keyword: str,
         group_id: Optional[str] = None,
+        bot_id: Optional[str] = None,
     ) -> None:
         """添加一条订阅"""
         from .orm_models import LocationSubscription
@@ -931,13 +1219,15 @@ class LocationSubscriptionORM:
             game_type=game_type,
             keyword=keyword,
             group_id=group_id,
+            bot_id=bot_id,
         )
         session.add(sub)
         await session.commit()
+        LocationSubscriptionORM._generation += 1
 
     @staticmethod
     async def remove_subscription(
-        session: async_scoped_session,
+        session: DBSession,
         user_id: str,
         game_type: str,
         keyword: Optional[str] = None,
@@ -963,11 +1253,12 @@ class LocationSubscriptionORM:
         for item in sub:
             await session.delete(item)
         await session.commit()
+        LocationSubscriptionORM._generation += 1
         return bool(sub)
 
     @staticmethod
     async def get_subscriptions_by_user(
-        session: async_scoped_session,
+        session: DBSession,
         user_id: str,
         game_type: Optional[str] = None,
     ) -> list[LocationSubscription]:
@@ -980,7 +1271,159 @@ class LocationSubscriptionORM:
         return list(result.scalars().all())
 
     @staticmethod
-    async def get_all_subscriptions(session: async_scoped_session, game_type: str) -> list[LocationSubscription]:
+    async def get_all_subscriptions(session: DBSession, game_type: str) -> list[LocationSubscription]:
         """获取某游戏类型的全部订阅"""
         result = await session.execute(select(LocationSubscription).where(LocationSubscription.game_type == game_type))
         return list(result.scalars().all())
+
+
+class OutboundMessageORM:
+    """主动消息发送队列"""
+
+    @staticmethod
+    async def enqueue(
+        session: DBSession,
+        target_id: str,
+        private: bool,
+        contents: list[str],
+        bot_id: Optional[str] = None,
+    ) -> None:
+        """按顺序将多段消息加入发送队列"""
+        session.add_all(
+            OutboundMessage(target_id=target_id, private=private, bot_id=bot_id, content=content)
+            for content in contents
+        )
+        await session.commit()
+
+    @staticmethod
+    async def get_pending(
+        session: DBSession,
+        now: float,
+        limit: int,
+        waiting_targets: Sequence[tuple[str, bool]] = (),
+    ) -> list[OutboundMessage]:
+        """
+        按入队顺序获取当前可以发送的消息
+
+        等待重试的消息，以及同一目标中排在等待重试的消息之后的消息都会被跳过，以保证同一目标的发送顺序
+
+        :param now: 当前时间戳
+        :param limit: 最多获取的消息数量
+        :param waiting_targets: 仍处于发送间隔内的 (目标 ID, 是否私聊)，这些目标的消息也会被跳过
+        """
+        earlier = aliased(OutboundMessage)
+        stmt = select(OutboundMessage).where(
+            OutboundMessage.next_attempt_at <= now,
+            ~exists().where(
+                earlier.target_id == OutboundMessage.target_id,
+                earlier.private == OutboundMessage.private,
+                earlier.id < OutboundMessage.id,
+                earlier.next_attempt_at > now,
+            ),
+        )
+        if waiting_targets:
+            stmt = stmt.where(
+                not_(
+                    or_(
+                        *(
+                            and_(OutboundMessage.target_id == target_id, OutboundMessage.private == private)
+                            for target_id, private in waiting_targets
+                        )
+                    )
+                )
+            )
+        result = await session.execute(stmt.order_by(OutboundMessage.id).limit(limit))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_next_attempt_at(session: DBSession, now: float) -> Optional[float]:
+        """
+        获取等待重试的消息中最早的下次发送时间
+
+        :return: 时间戳，没有等待重试的消息时返回 None
+        """
+        return await session.scalar(
+            select(func.min(OutboundMessage.next_attempt_at)).where(OutboundMessage.next_attempt_at > now)
+        )
+
+    @staticmethod
+    async def remove(session: DBSession, message_id: int) -> None:
+        """移除已发送或放弃发送的消息"""
+        await session.execute(delete(OutboundMessage).where(OutboundMessage.id == message_id))
+        await session.commit()
+
+    @staticmethod
+    async def reschedule(session: DBSession, message_id: int, attempts: int, next_attempt_at: float) -> None:
+        """记录一次发送失败，并推迟下次发送时间"""
+        await session.execute(
+            update(OutboundMessage)
+            .where(OutboundMessage.id == message_id)
+            .values(attempts=attempts, next_attempt_at=next_attempt_at)
+        )
+        await session.commit()
+
+
+class BackgroundJobORM:
+    """后台任务状态管理"""
+
+    @staticmethod
+    async def create(session: DBSession, kind: str, user_id: str) -> int:
+        """
+        创建排队中的任务
+
+        :return: 任务 ID
+        """
+        now = time.time()
+        job = BackgroundJob(kind=kind, user_id=user_id, status="pending", progress="", created_at=now, updated_at=now)
+        session.add(job)
+        await session.commit()
+        return job.id
+
+    @staticmethod
+    async def update_status(
+        session: DBSession,
+        job_id: int,
+        status: str,
+        *,
+        progress: Optional[str] = None,
+        result: Optional[str] = None,
+    ) -> None:
+        """
+        更新任务状态，progress 与 result 为空时保持原值
+        """
+        values: dict[str, Any] = {"status": status, "updated_at": time.time()}
+        if progress is not None:
+            values["progress"] = progress
+        if result is not None:
+            values["result"] = result
+
+        await session.execute(update(BackgroundJob).where(BackgroundJob.id == job_id).values(**values))
+        await session.commit()
+
+    @staticmethod
+    async def get_job(session: DBSession, job_id: int) -> Optional[BackgroundJob]:
+        """获取指定任务"""
+        return await session.get(BackgroundJob, job_id)
+
+    @staticmethod
+    async def get_user_jobs(session: DBSession, user_id: str, limit: int = 5) -> list[BackgroundJob]:
+        """获取用户最近提交的任务，按提交时间倒序排列"""
+        result = await session.execute(
+            select(BackgroundJob).where(BackgroundJob.user_id == user_id).order_by(BackgroundJob.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def fail_unfinished(session: DBSession, reason: str) -> int:
+        """
+        将所有未完成的任务标记为失败，用于启动时清理上次运行遗留的任务
+
+        :return: 受影响的任务数量
+        """
+        result = await session.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.status.in_(("pending", "running")))
+            .values(status="failed", result=reason, updated_at=time.time())
+        )
+        await session.commit()
+        return result.rowcount  # type: ignore[attr-defined]
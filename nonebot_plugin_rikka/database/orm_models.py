@@ -1,7 +1,7 @@
 from typing import Optional
 
 from nonebot_plugin_orm import Model
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import Boolean, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing_extensions import Literal, TypedDict
 
@@ -51,10 +51,46 @@ class MaiSongAlias(Model):
     song: Mapped["MaiSong"] = relationship("MaiSong", back_populates="alias_entry")
 
 
+class MaiChart(Model):
+    """舞萌DX 谱面，由 MaiSong.difficulties 展开，供按等级、定数等条件直接在数据库中查询"""
+
+    __tablename__ = "nonebot_plugin_rikka_maichart"
+    __table_args__ = (
+        Index("ix_nonebot_plugin_rikka_maichart_level_value", "level_value", "difficulty"),
+        Index("ix_nonebot_plugin_rikka_maichart_level", "level", "difficulty"),
+    )
+
+    song_id: Mapped[int] = mapped_column(ForeignKey("nonebot_plugin_rikka_maisong.id"), primary_key=True)
+    type: Mapped[str] = mapped_column(String, primary_key=True)
+    """谱面类型: 'standard' 或 'dx'，宴会场谱面不展开"""
+    difficulty: Mapped[int] = mapped_column(Integer, primary_key=True)
+    """难度"""
+    level: Mapped[str] = mapped_column(String, nullable=False)
+    """难度标级"""
+    level_value: Mapped[float] = mapped_column(Float, nullable=False)
+    """谱面定数"""
+    level_fit: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    """拟合定数"""
+    designer: Mapped[str] = mapped_column(String, nullable=False, default="")
+    """谱师"""
+    version: Mapped[str] = mapped_column(String, nullable=False, default="")
+    """谱面首次出现版本"""
+    notes_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_tap: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_hold: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_slide: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_touch: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_break: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class MaiPlayCount(Model):
     """玩家铺面游玩次数"""
 
     __tablename__ = "nonebot_plugin_rikka_playcount"
+    __table_args__ = (
+        # 覆盖 get_user_play_count_map 所需的全部列，按用户与曲目查询时无需回表
+        Index("ix_nonebot_plugin_rikka_playcount_lookup", "user_id", "song_id", "difficulty", "play_count"),
+    )
 
     user_id: Mapped[str] = mapped_column(String, primary_key=True)
     song_id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -88,9 +124,42 @@ class ChuSongAlias(Model):
     song: Mapped["ChuSong"] = relationship("ChuSong", back_populates="alias_entry")
 
 
+class ChuChart(Model):
+    """中二节奏谱面，由 ChuSong.difficulties 展开，供按等级、定数等条件直接在数据库中查询"""
+
+    __tablename__ = "nonebot_plugin_rikka_chuchart"
+    __table_args__ = (
+        Index("ix_nonebot_plugin_rikka_chuchart_level_value", "level_value", "difficulty"),
+        Index("ix_nonebot_plugin_rikka_chuchart_level", "level", "difficulty"),
+    )
+
+    song_id: Mapped[int] = mapped_column(ForeignKey("nonebot_plugin_rikka_chusong.id"), primary_key=True)
+    difficulty: Mapped[int] = mapped_column(Integer, primary_key=True)
+    """难度 (0=BASIC, 1=ADVANCED, 2=EXPERT, 3=MASTER, 4=ULTIMA, 5=WORLDS_END)"""
+    level: Mapped[str] = mapped_column(String, nullable=False)
+    """难度标级"""
+    level_value: Mapped[float] = mapped_column(Float, nullable=False)
+    """谱面定数"""
+    designer: Mapped[str] = mapped_column(String, nullable=False, default="")
+    """谱师"""
+    kanji: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    """谱面属性（仅 WORLDS_END）"""
+    notes_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_tap: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_hold: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_slide: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_air: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    notes_flick: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class LocationSubscription(Model):
     """店铺分布变动订阅"""
 
+    __table_args__ = (
+        Index("ix_nonebot_plugin_rikka_locationsubscription_user_id_game_type", "user_id", "game_type"),
+        Index("ix_nonebot_plugin_rikka_locationsubscription_game_type", "game_type"),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str] = mapped_column(String, nullable=False)
     game_type: Mapped[str] = mapped_column(String, nullable=False)
@@ -99,3 +168,43 @@ class LocationSubscription(Model):
     """订阅的关键词"""
     group_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     """可选群组 ID，如果存在则向群组发送消息"""
+    bot_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    """订阅时所用 Bot 的 ID，通知优先通过该 Bot 发送"""
+
+
+class OutboundMessage(Model):
+    """待发送的主动消息"""
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    target_id: Mapped[str] = mapped_column(String, nullable=False)
+    """目标用户或群组 ID"""
+    private: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    """是否为私聊"""
+    bot_id: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    """发送所用 Bot 的 ID，为空时使用任意可用 Bot"""
+    content: Mapped[str] = mapped_column(String, nullable=False)
+    """消息文本"""
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    """已失败的发送次数"""
+    next_attempt_at: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    """下次允许发送的时间戳"""
+
+
+class BackgroundJob(Model):
+    """后台任务"""
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    """任务类型，如 'import_lxns'"""
+    user_id: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    """提交任务的用户 ID"""
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    """任务状态: 'pending', 'running', 'succeeded' 或 'failed'"""
+    progress: Mapped[str] = mapped_column(String, nullable=False, default="")
+    """最近一次上报的进度"""
+    result: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    """任务结果或失败原因"""
+    created_at: Mapped[float] = mapped_column(Float, nullable=False)
+    """提交时间戳"""
+    updated_at: Mapped[float] = mapped_column(Float, nullable=False)
+    """最近一次状态变化的时间戳"""
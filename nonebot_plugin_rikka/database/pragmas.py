@@ -0,0 +1,74 @@
+"""
+SQLite 性能参数
+
+nonebot-plugin-orm 默认使用 SQLite，默认参数下写事务会阻塞所有读取，且每次提交都需要完整刷盘。
+启动时为 SQLite 数据库启用 WAL 等参数以改善并发读写下的表现，其他数据库不受影响
+"""
+
+from typing import Any, Union
+
+from nonebot_plugin_orm import async_scoped_session
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+
+from .orm_models import UserBindInfo
+
+SQLITE_PRAGMAS: dict[str, Union[str, int]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -32000,
+    "mmap_size": 268435456,
+}
+"""
+启用的 PRAGMA 参数
+
+- journal_mode: WAL 模式下读写互不阻塞，该参数会持久化在数据库文件中
+- synchronous: WAL 模式下仅在检查点时刷盘，断电时可能丢失最近提交的事务，但不会损坏数据库
+- busy_timeout: 数据库被锁定时的最长等待时间（毫秒），超时后才报错
+- cache_size: 页缓存大小，负数表示以 KiB 为单位，即 32 MiB
+- mmap_size: 内存映射读取的最大字节数，即 256 MiB
+"""
+
+_APPLIED_KEY = "rikka_sqlite_pragmas"
+"""连接记录中标记已应用参数的键"""
+
+
+def _execute_pragmas(dbapi_connection: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+    # 除 journal_mode 外的参数仅对当前连接生效，每个连接首次取出时应用一次
+    if connection_record.info.get(_APPLIED_KEY):
+        return
+    _execute_pragmas(dbapi_connection)
+    connection_record.info[_APPLIED_KEY] = True
+
+
+def _install_sqlite_pragmas(connection: Connection) -> bool:
+    engine = connection.engine
+    if engine.dialect.name != "sqlite":
+        return False
+
+    if not event.contains(engine, "checkout", _on_checkout):
+        event.listen(engine, "checkout", _on_checkout)
+    # 当前连接在注册监听前已被取出，直接应用
+    for name, value in SQLITE_PRAGMAS.items():
+        connection.exec_driver_sql(f"PRAGMA {name}={value}")
+    return True
+
+
+async def apply_sqlite_pragmas(session: async_scoped_session) -> bool:
+    """
+    若插件所用数据库为 SQLite，为其所有连接应用 `SQLITE_PRAGMAS`
+
+    :return: 是否为 SQLite 数据库
+    """
+    connection = await session.connection(bind_arguments={"mapper": UserBindInfo})
+    return await connection.run_sync(_install_sqlite_pragmas)
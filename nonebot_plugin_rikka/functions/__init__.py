@@ -1,31 +1,50 @@
 from .analysis import PlayerStrength, get_player_strength
+from .dispatcher import enqueue_message
 from .fortunate import generate_today_fortune
 from .location import (
     ArcadeLocation,
+    LocationIndex,
+    get_chu_location_index,
     get_chu_locations,
+    get_mai_location_index,
     get_mai_locations,
     list_locations,
     search_locations,
 )
 from .maistatus import capture_maimai_status_png
 from .n50 import get_players_n50
+from .random_song import SongBuckets, get_chu_song_buckets, get_mai_song_buckets
 from .recommend_songs import RecommendSong, RecommendSongs, get_player_raise_score_songs
-from .song_tags import get_song_by_tags, get_songs_tags
+from .song_tags import (
+    get_song_by_tags,
+    get_song_tags_index,
+    get_songs_tags,
+    reload_song_tags,
+)
 
 __all__ = [
     "PlayerStrength",
     "ArcadeLocation",
+    "LocationIndex",
     "get_player_strength",
+    "enqueue_message",
     "generate_today_fortune",
+    "get_chu_location_index",
     "get_chu_locations",
+    "get_mai_location_index",
     "get_mai_locations",
     "list_locations",
     "search_locations",
     "capture_maimai_status_png",
     "get_players_n50",
+    "SongBuckets",
+    "get_chu_song_buckets",
+    "get_mai_song_buckets",
     "RecommendSong",
     "RecommendSongs",
     "get_player_raise_score_songs",
     "get_song_by_tags",
     "get_songs_tags",
+    "get_song_tags_index",
+    "reload_song_tags",
 ]
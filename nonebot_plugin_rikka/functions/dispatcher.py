@@ -0,0 +1,209 @@
+"""
+主动消息发送队列
+
+订阅通知等主动推送的消息先写入数据库中的发送队列，由后台任务按入队顺序发送：
+- 全局与单个目标分别限制最小发送间隔，避免风控
+- 发送失败时按指数退避重试，超过最大次数后放弃
+- 同一目标的消息严格按入队顺序发送，前一条等待重试时后续消息也会等待
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from nonebot import get_bot, get_driver, logger
+from nonebot_plugin_alconna.uniseg import Target, UniMessage
+from nonebot_plugin_orm import get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import config
+from ..database import OutboundMessageORM
+
+_BATCH_SIZE = 50
+"""每次从队列读取的消息数量"""
+_IDLE_INTERVAL = 60.0
+"""队列为空时的轮询间隔（秒）"""
+_MAX_ATTEMPTS = 8
+"""最大发送次数"""
+_RETRY_BASE_DELAY = 5.0
+"""首次重试的等待时间（秒），之后每次翻倍"""
+_RETRY_MAX_DELAY = 600.0
+"""重试的最长等待时间（秒）"""
+_MAX_MESSAGE_LENGTH = 4000
+"""单条消息的最大长度，超出时拆分为多条"""
+
+
+def split_message(message: str, max_length: int = _MAX_MESSAGE_LENGTH) -> list[str]:
+    """将长消息按行拆分为多段，避免超出平台消息长度限制"""
+    if len(message) <= max_length:
+        return [message]
+
+    parts: list[str] = []
+    current = ""
+    for line in message.split("\n"):
+        if len(current) + len(line) + 1 > max_length:
+            if current:
+                parts.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        parts.append(current)
+    return parts
+
+
+class MessageDispatcher:
+    """主动消息发送器"""
+
+    def __init__(self, global_interval: float, target_interval: float) -> None:
+        self._global_interval = global_interval
+        self._target_interval = target_interval
+        self._global_ready_at: float = 0.0
+        """下次允许发送任意消息的时间"""
+        self._target_ready_at: dict[tuple[str, bool], float] = {}
+        """(目标 ID, 是否私聊) -> 下次允许向该目标发送消息的时间"""
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task[None]] = None
+
+    async def enqueue(
+        self, target_id: str, message: str, *, private: bool = False, bot_id: Optional[str] = None
+    ) -> None:
+        """
+        将消息加入发送队列后立即返回，过长的消息会被拆分为多条
+
+        :param target_id: 目标用户或群组 ID
+        :param message: 消息文本
+        :param private: 是否为私聊
+        :param bot_id: 发送所用 Bot 的 ID，为空或该 Bot 不在线时使用任意可用 Bot
+        """
+        # 可能在定时任务等没有事件上下文的后台任务中调用，不使用共享的 scoped session
+        async with get_session() as session:
+            await OutboundMessageORM.enqueue(session, target_id, private, split_message(message), bot_id)
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """启动后台发送任务"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台发送任务，未发送的消息保留在队列中"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                delay = await self._drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Dispatcher] 处理发送队列失败: {e}")
+                delay = _IDLE_INTERVAL
+
+            if delay <= 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drain(self) -> float:
+        """
+        发送队列中当前可以发送的消息
+
+        :return: 距离下次需要处理队列的秒数
+        """
+        now = time.time()
+        self._target_ready_at = {
+            target: ready_at for target, ready_at in self._target_ready_at.items() if ready_at > now
+        }
+
+        async with get_session() as session:
+            return await self._drain_in_session(session, now)
+
+    async def _drain_in_session(self, session: AsyncSession, now: float) -> float:
+        # 提交后 ORM 对象的属性会过期，先取出需要的字段
+        messages = [
+            (row.id, row.target_id, row.private, row.bot_id, row.content, row.attempts)
+            for row in await OutboundMessageORM.get_pending(session, now, _BATCH_SIZE, list(self._target_ready_at))
+        ]
+        if not messages:
+            # 剩余消息都在等待重试或发送间隔，休眠到最早可以发送的时间
+            ready_times = list(self._target_ready_at.values())
+            next_attempt_at = await OutboundMessageORM.get_next_attempt_at(session, now)
+            if next_attempt_at is not None:
+                ready_times.append(next_attempt_at)
+            if not ready_times:
+                return _IDLE_INTERVAL
+            return min(min(ready_times) - time.time(), _IDLE_INTERVAL)
+
+        blocked: set[tuple[str, bool]] = set()
+        """本轮中已发送或未能发送消息的目标，其后续消息留到下一轮，以保证顺序与发送间隔"""
+
+        for message_id, target_id, private, bot_id, content, attempts in messages:
+            target = (target_id, private)
+            if target in blocked:
+                continue
+            blocked.add(target)
+
+            now = time.time()
+            if self._global_ready_at > now:
+                await asyncio.sleep(self._global_ready_at - now)
+
+            try:
+                await self._send(target_id, private, bot_id, content)
+            except Exception as e:
+                attempts += 1
+                if attempts >= _MAX_ATTEMPTS:
+                    logger.error(f"[Dispatcher] 向 {target_id} 发送消息失败 {attempts} 次，已放弃: {e}")
+                    await OutboundMessageORM.remove(session, message_id)
+                    continue
+
+                retry_delay = min(_RETRY_BASE_DELAY * 2 ** (attempts - 1), _RETRY_MAX_DELAY)
+                logger.warning(f"[Dispatcher] 向 {target_id} 发送消息失败，{retry_delay:.0f} 秒后重试: {e}")
+                await OutboundMessageORM.reschedule(session, message_id, attempts, time.time() + retry_delay)
+                continue
+            finally:
+                sent_at = time.time()
+                self._global_ready_at = sent_at + self._global_interval
+                self._target_ready_at[target] = sent_at + self._target_interval
+
+            await OutboundMessageORM.remove(session, message_id)
+
+        # 本轮已处理过消息，立即进入下一轮，由下一轮的查询决定休眠时间
+        return 0.0
+
+    @staticmethod
+    async def _send(target_id: str, private: bool, bot_id: Optional[str], content: str) -> None:
+        try:
+            bot = get_bot(bot_id)
+        except (KeyError, ValueError):
+            bot = get_bot()
+
+        await UniMessage(content).send(target=Target(target_id, private=private), bot=bot)
+
+
+dispatcher = MessageDispatcher(config.outbound_global_interval, config.outbound_target_interval)
+
+
+async def enqueue_message(target_id: str, message: str, *, private: bool = False, bot_id: Optional[str] = None) -> None:
+    """将主动消息加入发送队列，参数见 `MessageDispatcher.enqueue`"""
+    await dispatcher.enqueue(target_id, message, private=private, bot_id=bot_id)
+
+
+@get_driver().on_startup
+async def start_message_dispatcher():
+    dispatcher.start()
+
+
+@get_driver().on_shutdown
+async def stop_message_dispatcher():
+    await dispatcher.stop()
@@ -1,11 +1,13 @@
 import logging
-from typing import Any, Dict, List, Optional
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from nonebot_plugin_alconna import UniMessage
 from typing_extensions import TypedDict
 
 from ..database import MaiSongORM
+from .pipeline import chunked, post_with_retry
 
 logger = logging.getLogger("sdgb_workflow")
 
@@ -15,6 +17,16 @@ BASE_URL = "https://www.diving-fish.com/api/maimaidxprober"
 COMBO_ID_TO_NAME = ["", "fc", "fcp", "ap", "app"]
 SYNC_ID_TO_NAME = ["", "fs", "fsp", "fsd", "fsdp", "sync"]
 
+# 成绩状态从低到高的排序，用于判断成绩是否提升
+_FC_RANK = {name: rank for rank, name in enumerate(COMBO_ID_TO_NAME)}
+_FS_RANK = {name: rank for rank, name in enumerate(["", "sync", "fs", "fsp", "fsd", "fsdp"])}
+
+# 单次上传的最大记录数，超出时分块上传
+UPLOAD_CHUNK_SIZE = 200
+
+DivingFishRecordKey = Tuple[str, str, int]
+"""(曲名, 谱面类型, 难度)"""
+
 
 class DivingFishRecord(TypedDict):
     achievements: float
@@ -26,51 +38,112 @@ class DivingFishRecord(TypedDict):
     dxScore: int
 
 
-async def upload_to_diving_fish(token: str, payload: List[DivingFishRecord]) -> None:
-    """上传成绩到水鱼查分器"""
+async def upload_to_diving_fish(
+    token: str,
+    payload: List[DivingFishRecord],
+    client: Optional[httpx.AsyncClient] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> None:
+    """
+    上传成绩到水鱼查分器
+
+    成绩按 `chunk_size` 分块依次上传，每块失败时单独重试
+
+    :param client: 复用的 HTTP 客户端，为空时临时创建
+    """
     headers = {"Import-Token": token, "Content-Type": "application/json"}
 
     logger.info(f"准备上传 {len(payload)} 条记录到水鱼查分器...")
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        try:
-            resp = await client.post(
-                f"{BASE_URL}/player/update_records",
-                json=payload,
-                headers=headers,
-                timeout=30.0,
-            )
-
-            if resp.status_code == 200:
-                logger.info("水鱼查分器上传成功！")
-            elif resp.status_code == 400:
-                logger.error(f"上传失败：请求参数错误 ({resp.text})")
-            elif resp.status_code == 401 or resp.status_code == 403:  # 假设 401/403 是认证失败
-                logger.error("上传失败：Import Token 无效或鉴权失败")
-                raise RuntimeError("DivingFish Auth Failed")
-            else:
-                logger.error(f"上传失败：HTTP {resp.status_code} - {resp.text}")
-                resp.raise_for_status()
-
-        except httpx.RequestError as e:
-            logger.error(f"水鱼查分器连接失败: {e}")
-            raise
-
-
-def _get_song_title(music_id: int) -> Optional[str]:
-    """根据 musicId 获取曲名"""
-    if music_id >= 10000:
-        # DX 谱面，ID 减去 10000 后再查询
-        base_id = music_id - 10000
-    else:
-        base_id = music_id
-
-    # 尝试直接获取
-    song = MaiSongORM.get_song_sync(base_id)
-    if song:
-        return song.title
-
-    return None
+    async with nullcontext(client) if client else httpx.AsyncClient(timeout=30) as http_client:
+        for chunk in chunked(payload, chunk_size):
+            try:
+                resp = await post_with_retry(
+                    http_client,
+                    f"{BASE_URL}/player/update_records",
+                    json=chunk,
+                    headers=headers,
+                )
+
+                if resp.status_code == 200:
+                    logger.info(f"水鱼查分器上传成功！({len(chunk)} 条)")
+                elif resp.status_code == 400:
+                    logger.error(f"上传失败：请求参数错误 ({resp.text})")
+                elif resp.status_code == 401 or resp.status_code == 403:  # 假设 401/403 是认证失败
+                    logger.error("上传失败：Import Token 无效或鉴权失败")
+                    raise RuntimeError("DivingFish Auth Failed")
+                else:
+                    logger.error(f"上传失败：HTTP {resp.status_code} - {resp.text}")
+                    resp.raise_for_status()
+
+            except httpx.RequestError as e:
+                logger.error(f"水鱼查分器连接失败: {e}")
+                raise
+
+
+async def fetch_diving_fish_records(
+    token: str, client: Optional[httpx.AsyncClient] = None
+) -> Dict[DivingFishRecordKey, DivingFishRecord]:
+    """
+    获取玩家在水鱼查分器上的全部成绩
+
+    :param client: 复用的 HTTP 客户端，为空时临时创建
+    :return: (曲名, 谱面类型, 难度) -> 成绩
+    """
+    headers = {"Import-Token": token}
+
+    async with nullcontext(client) if client else httpx.AsyncClient(timeout=30) as http_client:
+        resp = await http_client.get(f"{BASE_URL}/player/records", headers=headers, timeout=30.0)
+        if resp.status_code == 401 or resp.status_code == 403:
+            logger.error("获取成绩失败：Import Token 无效或鉴权失败")
+            raise RuntimeError("DivingFish Auth Failed")
+        resp.raise_for_status()
+
+    records: Dict[DivingFishRecordKey, DivingFishRecord] = {}
+    for record in resp.json().get("records", []):
+        records.setdefault((record["title"], record["type"], record["level_index"]), record)
+    return records
+
+
+def _is_improved(record: DivingFishRecord, existing: DivingFishRecord) -> bool:
+    return (
+        round(record["achievements"], 4) > round(existing["achievements"], 4)
+        or record["dxScore"] > existing["dxScore"]
+        or _FC_RANK.get(record["fc"], 0) > _FC_RANK.get(existing["fc"] or "", 0)
+        or _FS_RANK.get(record["fs"], 0) > _FS_RANK.get(existing["fs"] or "", 0)
+    )
+
+
+def filter_improved_records(
+    records: List[DivingFishRecord], existing_records: Dict[DivingFishRecordKey, DivingFishRecord]
+) -> List[DivingFishRecord]:
+    """
+    筛选出水鱼查分器上没有、或达成率、DX 分数、FC、FS 任意一项有提升的成绩
+
+    :param records: 待上传的成绩
+    :param existing_records: `fetch_diving_fish_records` 的返回值
+    """
+    improved: List[DivingFishRecord] = []
+    for record in records:
+        existing = existing_records.get((record["title"], record["type"], record["level_index"]))
+        if existing is None or _is_improved(record, existing):
+            improved.append(record)
+    return improved
+
+
+_song_titles: Dict[int, str] = {}
+_song_titles_generation: Optional[int] = None
+
+
+def get_song_title_map() -> Dict[int, str]:
+    """获取曲目 ID (不含 DX 谱面的 10000 偏移) 到曲名的映射，曲目缓存变化后自动重建"""
+    global _song_titles, _song_titles_generation
+
+    generation = MaiSongORM._generation
+    if _song_titles_generation != generation:
+        _song_titles = {song_id: song.title for song_id, song in MaiSongORM._cache.items()}
+        _song_titles_generation = generation
+    return _song_titles
 
 
 async def convert_to_diving_fish_format(
@@ -79,6 +152,7 @@ async def convert_to_diving_fish_format(
     """将 UserMusicDetail 列表转换为水鱼查分器格式"""
     df_list = []
     send_warning_message = False
+    song_titles = get_song_title_map()
     for score in scores:
         music_id = score["musicId"]
 
@@ -86,7 +160,8 @@ async def convert_to_diving_fish_format(
         if music_id >= 100000 or music_id == 11407:
             continue
 
-        title = _get_song_title(music_id)
+        # DX 谱面的 ID 带有 10000 偏移
+        title = song_titles.get(music_id - 10000 if music_id >= 10000 else music_id)
         if not title:
             logger.warning(f"未知曲目 ID: {music_id}, 已跳过")
             if not send_warning_message:
@@ -2,9 +2,12 @@
 舞萌今日运势生成类
 """
 
+import hashlib
 import random
-from datetime import datetime
+from copy import copy
+from datetime import date
 from pathlib import Path
+from typing import Optional
 
 from nonebot import logger
 from nonebot_plugin_alconna import UniMessage
@@ -13,6 +16,7 @@ from nonebot_plugin_orm import get_scoped_session
 
 from ..config import config
 from ..database import MaiSongORM
+from ..models.song import MaiSong
 
 _activates = ["拼机", "推分", "下埋", "打新曲", "开随机段位", "打旧框"]
 
@@ -22,45 +26,96 @@ _TEMPLATE = """今日人品值: {luck_value}
 {title}({id})
 """
 
+_song_ids: tuple[int, ...] = ()
+_song_ids_generation: Optional[int] = None
+
+_fortune_day: Optional[date] = None
+_fortune_cache: dict[str, UniMessage] = {}
+"""用户 ID -> 当日运势消息，日期变化时清空"""
+
+
+def _get_fortune_rng(user_id: str, day: date) -> random.Random:
+    """
+    获取用户当日的独立随机数生成器
+
+    种子由用户 ID 与日期的摘要得出，不受进程重启与 `PYTHONHASHSEED` 影响，也不会改动全局 `random` 的状态
+    """
+    digest = hashlib.sha256(f"{user_id}:{day.isoformat()}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _get_song_ids() -> tuple[int, ...]:
+    """获取曲目缓存中的全部曲目 ID (升序)，曲目缓存变化后自动重建"""
+    global _song_ids, _song_ids_generation
+
+    generation = MaiSongORM._generation
+    if _song_ids_generation != generation:
+        _song_ids = tuple(sorted(MaiSongORM._cache))
+        _song_ids_generation = generation
+    return _song_ids
+
+
+def _resolve_song_cover(song_id: int) -> Path:
+    cover_dir = Path(config.static_resource_path) / "mai" / "cover"
+
+    song_cover = cover_dir / f"{song_id}.png"
+    if not song_cover.exists():
+        song_cover = cover_dir / f"{song_id + 10000}.png"  # DX 版封面
+        if not song_cover.exists():
+            logger.warning(f"未找到乐曲 {song_id} 的封面图片")
+            song_cover = cover_dir / "0.png"
+
+    return song_cover
+
 
 async def generate_today_fortune(user_id: str) -> UniMessage:
     """
     生成用户的今日运势
+
+    同一用户当日的结果相同，生成的消息会缓存至当日结束
     """
+    global _fortune_day
+
+    today = date.today()
+    if _fortune_day != today:
+        _fortune_cache.clear()
+        _fortune_day = today
+
+    cached = _fortune_cache.get(user_id)
+    if cached is None:
+        cached = _fortune_cache[user_id] = await _build_today_fortune(user_id, today)
+
+    return copy(cached)
+
+
+async def _build_today_fortune(user_id: str, today: date) -> UniMessage:
     # 确保当日同一用户获取到同一的测评结果
-    user_seed = hash(user_id + datetime.strftime(datetime.now(), "%d%m%Y"))
-    random.seed(user_seed)
+    rng = _get_fortune_rng(user_id, today)
 
     # 人品值
-    luck_value = random.randint(1, 101)
+    luck_value = rng.randint(1, 101)
 
     # 推荐活动
     available_activates = _activates.copy()
-    lucky_activates = random.sample(available_activates, k=random.randint(0, len(available_activates)))
+    lucky_activates = rng.sample(available_activates, k=rng.randint(0, len(available_activates)))
     available_activates = [item for item in available_activates if item not in lucky_activates]
-    unlucky_activates = random.sample(available_activates, k=random.randint(0, len(available_activates)))
+    unlucky_activates = rng.sample(available_activates, k=rng.randint(0, len(available_activates)))
     fortunate_activates = "\n".join(
         [f"宜 {item}" for item in lucky_activates] + [f"忌 {item}" for item in unlucky_activates]
     )
 
     # 推荐乐曲
-    session = get_scoped_session()
-    song_ids = await MaiSongORM.get_all_song_ids(session)
-    lucky_song_id = random.choice(song_ids)
-    lucky_song = await MaiSongORM.get_song_info(session, lucky_song_id)
+    if not MaiSongORM._cache:
+        await MaiSongORM.refresh_cache(get_scoped_session())
 
-    # 重置随机种子
-    random.seed()
+    song_ids = _get_song_ids()
+    if not song_ids:
+        raise ValueError("乐曲数据库为空，请先执行 .update songs")
 
-    # 处理乐曲信息
-    song_cover = Path(config.static_resource_path) / "mai" / "cover" / f"{lucky_song.id}.png"
+    lucky_song: MaiSong = MaiSongORM._cache[rng.choice(song_ids)]
 
-    if not song_cover.exists():
-        dx_song_id = lucky_song.id + 10000  # DX 版封面
-        song_cover = Path(config.static_resource_path) / "mai" / "cover" / f"{dx_song_id}.png"
-        if not song_cover.exists():
-            logger.warning(f"未找到乐曲 {lucky_song.id} 的封面图片")
-            song_cover = Path(config.static_resource_path) / "mai" / "cover" / "0.png"
+    # 处理乐曲信息
+    song_cover = _resolve_song_cover(lucky_song.id)
 
     response_difficulties_content = []
 
@@ -0,0 +1,250 @@
+"""
+后台任务队列
+
+导入成绩、发票、解锁与数据更新等耗时操作在后台执行，消息处理器只负责校验参数、提交任务并回复任务 ID：
+- 任务状态持久化在数据库中，可通过 `.job` 命令查询进度与结果
+- 固定数量的 worker 并发执行任务，排队与执行中的任务总数超出上限时拒绝提交
+- 同一用户的同类任务在完成前不会重复提交
+- 任务结束后通过主动消息发送队列推送结果
+
+二维码等任务参数只保存在内存中，Bot 重启时未完成的任务会被标记为失败
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from traceback import format_exc
+from typing import Awaitable, Callable, Optional
+
+from nonebot import get_driver, logger
+from nonebot_plugin_orm import get_scoped_session, get_session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import config
+from ..database import BackgroundJob, BackgroundJobORM
+from .dispatcher import enqueue_message
+
+JOB_KIND_NAMES = {
+    "import": "导入游玩次数",
+    "import_divingfish": "同步水鱼查分器",
+    "import_lxns": "同步落雪查分器",
+    "import_all": "同步落雪和水鱼查分器",
+    "ticket": "发送六倍票",
+    "unlock": "解锁新框紫铺",
+    "update": "全量更新",
+    "update_songs": "更新乐曲信息",
+    "update_alias": "更新乐曲别名",
+    "update_chart": "更新谱面文件",
+}
+"""任务类型 -> 任务名称"""
+
+JOB_STATUS_NAMES = {
+    "pending": "排队中",
+    "running": "执行中",
+    "succeeded": "已完成",
+    "failed": "失败",
+}
+"""任务状态 -> 状态名称"""
+
+
+class JobQueueFullError(RuntimeError):
+    """排队与执行中的任务过多"""
+
+
+@dataclass
+class JobNotifyTarget:
+    """任务结束后推送结果的目标"""
+
+    target_id: str
+    """目标用户或群组 ID"""
+    private: bool
+    """是否为私聊"""
+    bot_id: Optional[str] = None
+    """提交任务时所用 Bot 的 ID"""
+
+
+@dataclass
+class JobContext:
+    """传递给任务函数的上下文"""
+
+    job_id: int
+    """任务 ID"""
+    user_id: str
+    """提交任务的用户 ID"""
+    session: AsyncSession
+    """本任务独占的数据库会话，任务结束后自动关闭"""
+
+    async def report_progress(self, progress: str) -> None:
+        """
+        上报任务进度，可通过 `.job` 命令查看
+
+        :param progress: 进度描述
+        """
+        await BackgroundJobORM.update_status(self.session, self.job_id, "running", progress=progress)
+
+
+JobRunner = Callable[[JobContext], Awaitable[str]]
+"""任务函数，返回推送给用户的结果文本，抛出异常时任务失败并推送异常信息"""
+
+
+@dataclass
+class _QueuedJob:
+    job_id: int
+    user_id: str
+    kind: str
+    dedupe_key: tuple[str, str]
+    runner: JobRunner
+    notify: Optional[JobNotifyTarget]
+
+
+class JobQueue:
+    """后台任务队列"""
+
+    def __init__(self, workers: int, max_active: int) -> None:
+        self._worker_count = workers
+        self._max_active = max_active
+        self._queue: asyncio.Queue[_QueuedJob] = asyncio.Queue()
+        self._active: dict[tuple[str, str], int] = {}
+        """(用户 ID, 去重键) -> 排队中或执行中的任务 ID"""
+        self._submit_lock = asyncio.Lock()
+        self._workers: list[asyncio.Task[None]] = []
+
+    async def submit(
+        self,
+        kind: str,
+        user_id: str,
+        runner: JobRunner,
+        *,
+        notify: Optional[JobNotifyTarget] = None,
+        dedupe_key: Optional[str] = None,
+    ) -> tuple[int, bool]:
+        """
+        提交后台任务
+
+        :param kind: 任务类型，见 `JOB_KIND_NAMES`
+        :param user_id: 提交任务的用户 ID
+        :param runner: 任务函数
+        :param notify: 任务结束后推送结果的目标，为空时不推送
+        :param dedupe_key: 去重键，同一用户存在相同去重键的未完成任务时不再提交，默认为任务类型
+        :return: (任务 ID, 是否为新提交的任务)，重复提交时返回已有任务的 ID
+        :raise JobQueueFullError: 排队与执行中的任务数量已达上限
+        """
+        key = (user_id, dedupe_key or kind)
+        async with self._submit_lock:
+            if key in self._active:
+                return self._active[key], False
+            if len(self._active) >= self._max_active:
+                raise JobQueueFullError("当前排队的任务过多，请稍后再试")
+
+            job_id = await BackgroundJobORM.create(get_scoped_session(), kind, user_id)
+            self._active[key] = job_id
+
+        self._queue.put_nowait(_QueuedJob(job_id, user_id, kind, key, runner, notify))
+        logger.info(f"[Job] 用户 {user_id} 提交任务 #{job_id} ({kind})，当前未完成任务 {len(self._active)} 个")
+        return job_id, True
+
+    def start(self) -> None:
+        """启动 worker"""
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self._worker_count:
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """停止所有 worker，执行中的任务将被取消"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Job] 处理任务 #{job.job_id} 失败: {e}")
+            finally:
+                self._active.pop(job.dedupe_key, None)
+                self._queue.task_done()
+
+    async def _execute(self, job: _QueuedJob) -> None:
+        # worker 在启动时创建，没有事件上下文，scoped session 会被所有后台任务共用，因此每个任务使用独立的会话
+        async with get_session() as session:
+            await self._execute_in_session(job, JobContext(job.job_id, job.user_id, session))
+
+    async def _execute_in_session(self, job: _QueuedJob, context: JobContext) -> None:
+        kind_name = JOB_KIND_NAMES.get(job.kind, job.kind)
+        await BackgroundJobORM.update_status(context.session, context.job_id, "running")
+
+        start = time.perf_counter()
+        try:
+            result = await job.runner(context)
+        except asyncio.CancelledError:
+            await BackgroundJobORM.update_status(context.session, context.job_id, "failed", result="任务已取消")
+            raise
+        except asyncio.TimeoutError:
+            logger.error(format_exc())
+            status, result = "failed", "上游服务请求超时，或许等一下再试试？"
+        except Exception as e:
+            logger.error(format_exc())
+            status, result = "failed", str(e) or type(e).__name__
+        else:
+            status = "succeeded"
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"[Job] 任务 #{context.job_id} ({job.kind}) {JOB_STATUS_NAMES[status]}，耗时 {elapsed:.2f}s")
+        await BackgroundJobORM.update_status(context.session, context.job_id, status, result=result)
+
+        if job.notify is None:
+            return
+        if status == "succeeded":
+            message = f"[任务 #{context.job_id}] {kind_name}完成: {result}"
+        else:
+            message = f"[任务 #{context.job_id}] {kind_name}失败: {result}"
+        await enqueue_message(job.notify.target_id, message, private=job.notify.private, bot_id=job.notify.bot_id)
+
+
+def format_job(job: BackgroundJob) -> str:
+    """将任务格式化为 `.job` 命令展示的文本"""
+    submitted_at = datetime.fromtimestamp(job.created_at).strftime("%m-%d %H:%M:%S")
+    lines = [
+        f"#{job.id} {JOB_KIND_NAMES.get(job.kind, job.kind)} - {JOB_STATUS_NAMES.get(job.status, job.status)}",
+        f"提交时间: {submitted_at}",
+    ]
+    if job.status == "running" and job.progress:
+        lines.append(f"当前进度: {job.progress}")
+    if job.result:
+        lines.append(f"{'结果' if job.status == 'succeeded' else '原因'}: {job.result}")
+    return "\n".join(lines)
+
+
+job_queue = JobQueue(config.job_workers, config.job_max_active)
+
+
+async def submit_job(
+    kind: str,
+    user_id: str,
+    runner: JobRunner,
+    *,
+    notify: Optional[JobNotifyTarget] = None,
+    dedupe_key: Optional[str] = None,
+) -> tuple[int, bool]:
+    """提交后台任务，参数见 `JobQueue.submit`"""
+    return await job_queue.submit(kind, user_id, runner, notify=notify, dedupe_key=dedupe_key)
+
+
+@get_driver().on_startup
+async def start_job_queue():
+    async with get_session() as session:
+        interrupted = await BackgroundJobORM.fail_unfinished(session, "Bot 重启，任务已中断，请重新提交")
+    if interrupted:
+        logger.warning(f"[Job] 已将 {interrupted} 个中断的任务标记为失败")
+    job_queue.start()
+
+
+@get_driver().on_shutdown
+async def stop_job_queue():
+    await job_queue.stop()
@@ -0,0 +1,75 @@
+"""
+多关键词匹配
+
+基于 Aho-Corasick 自动机，一次扫描文本即可找出其中出现的全部关键词
+"""
+
+from collections import deque
+from typing import Iterable
+
+
+class KeywordMatcher:
+    """Aho-Corasick 多关键词匹配自动机，构建后只读"""
+
+    __slots__ = ("keywords", "_goto", "_fail", "_output")
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        """
+        :param keywords: 关键词列表，空字符串与重复的关键词会被忽略
+        """
+        self.keywords: tuple[str, ...] = tuple(dict.fromkeys(keyword for keyword in keywords if keyword))
+        """去重后的关键词"""
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        outputs: list[list[str]] = [[]]
+
+        # 构建字典树
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword)
+
+        # 按层序计算失配指针，并沿失配指针合并输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if state:
+                    self._fail[next_state] = self._goto[fail].get(char, 0)
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+
+        self._output: list[tuple[str, ...]] = [tuple(output) for output in outputs]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, text: str) -> set[str]:
+        """
+        获取文本中出现的全部关键词
+
+        :param text: 待匹配文本
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        found: set[str] = set()
+
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return found
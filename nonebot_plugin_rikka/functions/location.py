@@ -1,25 +1,31 @@
 """店铺分布查询模块
 
 提供舞萌 (maimai) 和中二节奏 (CHUNITHM) 的店铺查询功能。
-数据来源于华立科技世嘉注册接口，带 12 小时 TTL 缓存。
+数据来源于华立科技世嘉注册接口，带 12 小时 TTL 缓存，缓存过期后先返回旧数据并在后台刷新。
+店铺列表会持久化为本地快照并在启动时恢复，重启后首次同步仍可检测店铺变动。
 支持店铺变动订阅：当缓存刷新时检测新增/移除店铺，并主动通知匹配关键词的订阅者。
 """
 
 from __future__ import annotations
 
 import asyncio
+import json
+import re
 import time
-from dataclasses import dataclass, field
-from typing import Literal, Optional
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Literal, Optional, Union
 
 import aiohttp
-from nonebot import get_bot, logger
-from nonebot_plugin_alconna.uniseg import Target, UniMessage
+from nonebot import get_driver, logger
 from nonebot_plugin_apscheduler import scheduler
-from nonebot_plugin_orm import get_scoped_session
+from nonebot_plugin_localstore import get_plugin_data_file
+from nonebot_plugin_orm import get_session
 
 from ..database.crud import LocationSubscriptionORM
 from ..database.orm_models import LocationSubscription
+from .dispatcher import enqueue_message
+from .keyword_matcher import KeywordMatcher
 
 # API endpoints
 _MAI_LOCATION_URL = "https://sega-register.wahlap.net/api/sega/maidx/rest/location"
@@ -28,9 +34,6 @@ _CHU_LOCATION_URL = "https://sega-register.wahlap.net/api/sega/midtr/rest/locati
 # TTL: 12 hours in seconds
 _CACHE_TTL = 12 * 60 * 60
 
-# 每条消息之间的延迟（秒），避免风控
-_DELAYED_SECOND_PER_PARAGRAPH = 0.5
-
 
 @dataclass
 class ArcadeLocation:
@@ -48,6 +51,108 @@ class ArcadeLocation:
         return f"{index}. {self.arcade_name}({self.place_id})\n地址: {self.address}"
 
 
+_PROVINCE_PATTERN = re.compile(r"^(.+?(?:特别行政区|自治区|省|市))")
+_CITY_PATTERN = re.compile(r"^(.+?(?:自治州|地区|盟|市))")
+_REGION_SUFFIX_PATTERN = re.compile(r"(?:特别行政区|(?:维吾尔|壮族|回族)?自治区|自治州|地区|省|市|盟)$")
+
+
+def _region_keys(name: str) -> list[str]:
+    """获取行政区划名称的检索键，包括全称与去掉后缀的简称，如 `广东省` -> `广东省`, `广东`"""
+    keys = [name]
+    short_name = _REGION_SUFFIX_PATTERN.sub("", name)
+    if short_name != name and len(short_name) >= 2:
+        keys.append(short_name)
+    return keys
+
+
+def parse_region(address: str) -> tuple[Optional[str], Optional[str]]:
+    """
+    从地址开头解析省级与地级行政区
+
+    :param address: 地址，如 `广东省广州市天河区...`
+    :return: (省级行政区, 地级行政区)，无法解析的部分为 None；直辖市没有地级行政区
+    """
+    address = address.strip()
+    province_match = _PROVINCE_PATTERN.match(address)
+    if not province_match:
+        return None, None
+
+    province = province_match.group(1)
+    if province.endswith("市"):
+        return province, None
+
+    city_match = _CITY_PATTERN.match(address[len(province) :])
+    return province, city_match.group(1) if city_match else None
+
+
+def _bigrams(text: str) -> set[str]:
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+class LocationIndex:
+    """
+    店铺检索索引
+
+    对店铺名称与地址分别建立单字与双字 (bigram) 倒排索引，并按地址开头的省、市划分店铺；
+    检索时对各双字的倒排列表求交集得到候选店铺，再逐个确认是否包含关键词
+    """
+
+    def __init__(self, locations: Iterable[ArcadeLocation]) -> None:
+        self.locations: list[ArcadeLocation] = list(locations)
+        """店铺列表，顺序与接口返回一致"""
+        self._name_postings: dict[str, set[int]] = {}
+        self._address_postings: dict[str, set[int]] = {}
+        self.regions: dict[str, set[int]] = {}
+        """省、市名称 (全称及简称) -> 地址以其开头的店铺下标"""
+
+        for i, loc in enumerate(self.locations):
+            for gram in set(loc.arcade_name) | _bigrams(loc.arcade_name):
+                self._name_postings.setdefault(gram, set()).add(i)
+            for gram in set(loc.address) | _bigrams(loc.address):
+                self._address_postings.setdefault(gram, set()).add(i)
+
+            for region in parse_region(loc.address):
+                if region is None:
+                    continue
+                for key in _region_keys(region):
+                    self.regions.setdefault(key, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    @staticmethod
+    def _candidates(postings: dict[str, set[int]], keyword: str) -> set[int]:
+        grams = [keyword] if len(keyword) == 1 else sorted(_bigrams(keyword))
+        posting_lists = sorted((postings.get(gram, set()) for gram in grams), key=len)
+        if not posting_lists[0]:
+            return set()
+        return posting_lists[0].intersection(*posting_lists[1:])
+
+    def search(self, keyword: str) -> list[ArcadeLocation]:
+        """
+        搜索名称或地址包含关键词的店铺
+
+        名称命中的店铺排在仅地址命中的店铺之前，两者内部保持原有顺序
+
+        :param keyword: 关键词
+        """
+        if not keyword:
+            return []
+
+        locations = self.locations
+        name_hits = {i for i in self._candidates(self._name_postings, keyword) if keyword in locations[i].arcade_name}
+
+        # 以省、市开头的地址必然包含该省、市名称，无需再逐个确认
+        region_hits = self.regions.get(keyword, set())
+        address_hits = region_hits | {
+            i
+            for i in self._candidates(self._address_postings, keyword) - region_hits
+            if keyword in locations[i].address
+        }
+
+        return [locations[i] for i in sorted(name_hits)] + [locations[i] for i in sorted(address_hits - name_hits)]
+
+
 @dataclass
 class LocationDiff:
     """店铺变动差异"""
@@ -62,6 +167,75 @@ class LocationDiff:
         return bool(self.added or self.removed)
 
 
+SubscriptionTarget = tuple[str, Optional[str]]
+"""(用户 ID, 群组 ID)"""
+
+
+@dataclass
+class SubscriptionMatch:
+    """某个通知目标命中的店铺变动"""
+
+    keywords: list[str] = field(default_factory=list)
+    """命中的关键词"""
+    added: list[ArcadeLocation] = field(default_factory=list)
+    """命中的新增店铺"""
+    removed: list[ArcadeLocation] = field(default_factory=list)
+    """命中的移除店铺"""
+
+
+@dataclass
+class SubscriptionMatcher:
+    """某游戏类型全部订阅的关键词匹配器"""
+
+    generation: int
+    """构建时的订阅版本"""
+    matcher: KeywordMatcher
+    """全部订阅关键词的匹配自动机"""
+    targets: dict[str, list[SubscriptionTarget]]
+    """关键词 -> 订阅该关键词的通知目标"""
+    target_bots: dict[SubscriptionTarget, Optional[str]]
+    """通知目标 -> 订阅时所用 Bot 的 ID"""
+
+    @staticmethod
+    def build(subscriptions: Iterable[LocationSubscription], generation: int) -> SubscriptionMatcher:
+        targets: dict[str, list[SubscriptionTarget]] = {}
+        target_bots: dict[SubscriptionTarget, Optional[str]] = {}
+        for sub in subscriptions:
+            target = (sub.user_id, sub.group_id)
+            keyword_targets = targets.setdefault(sub.keyword, [])
+            if target not in keyword_targets:
+                keyword_targets.append(target)
+            if target_bots.get(target) is None:
+                target_bots[target] = sub.bot_id
+
+        return SubscriptionMatcher(generation, KeywordMatcher(targets), targets, target_bots)
+
+    def match(self, diff: LocationDiff) -> dict[SubscriptionTarget, SubscriptionMatch]:
+        """
+        匹配店铺变动，每家变动的店铺只扫描一次，结果按通知目标合并
+
+        :param diff: 店铺变动差异
+        :return: 通知目标 -> 命中的店铺变动，同一店铺命中多个关键词时只记录一次
+        """
+        matches: dict[SubscriptionTarget, SubscriptionMatch] = {}
+        keyword_order = {keyword: i for i, keyword in enumerate(self.matcher.keywords)}
+
+        for locations, attr in ((diff.added, "added"), (diff.removed, "removed")):
+            for loc in locations:
+                keywords = self.matcher.find(loc.arcade_name) | self.matcher.find(loc.address)
+                notified: set[SubscriptionTarget] = set()
+                for keyword in sorted(keywords, key=keyword_order.__getitem__):
+                    for target in self.targets[keyword]:
+                        match = matches.setdefault(target, SubscriptionMatch())
+                        if keyword not in match.keywords:
+                            match.keywords.append(keyword)
+                        if target not in notified:
+                            getattr(match, attr).append(loc)
+                            notified.add(target)
+
+        return matches
+
+
 class LocationCache:
     """带 TTL 的店铺数据缓存，支持差异检测和订阅通知"""
 
@@ -70,9 +244,13 @@ class LocationCache:
         """游戏类型: 'mai' 或 'chu'"""
         self._url = url
         self._locations: list[ArcadeLocation] = []
+        self._index = LocationIndex(())
+        self._subscription_matcher: Optional[SubscriptionMatcher] = None
         self._last_update: float = 0.0
         self._previous_place_ids: set[str] = set()
         """上一次缓存的 placeId 集合，用于差异检测"""
+        self._refresh_task: Optional[asyncio.Task[Optional[LocationDiff]]] = None
+        """进行中的同步任务，并发的刷新请求共享同一次同步"""
 
     @property
     def is_expired(self) -> bool:
@@ -127,39 +305,103 @@ class LocationCache:
                 await self._notify_subscribers(diff)
 
         # 更新缓存
-        self._locations = locations
-        self._previous_place_ids = {loc.place_id for loc in locations}
-        self._last_update = time.time()
+        self._set_locations(locations, time.time())
+        self._save_snapshot()
         logger.debug(f"[Location] 拉取完成，共 {len(self._locations)} 家店铺")
 
         return diff
 
+    def _set_locations(self, locations: list[ArcadeLocation], last_update: float) -> None:
+        self._locations = locations
+        self._index = LocationIndex(locations)
+        self._previous_place_ids = {loc.place_id for loc in locations}
+        self._last_update = last_update
+
+    def _snapshot_file(self) -> Path:
+        return get_plugin_data_file(f"location_{self._game_type}.json")
+
+    def _save_snapshot(self) -> None:
+        """将当前店铺列表写入本地快照"""
+        path = self._snapshot_file()
+        data = {"last_update": self._last_update, "locations": [asdict(loc) for loc in self._locations]}
+        temp_path = path.with_suffix(".tmp")
+        try:
+            temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            temp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"[Location][{self._game_type}] 保存店铺快照失败: {e}")
+
+    def load_snapshot(self) -> bool:
+        """从本地快照恢复店铺列表，返回是否成功恢复"""
+        path = self._snapshot_file()
+        if not path.exists():
+            return False
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            locations = [ArcadeLocation(**item) for item in data["locations"]]
+            last_update = float(data["last_update"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"[Location][{self._game_type}] 读取店铺快照失败: {e}")
+            return False
+
+        self._set_locations(locations, last_update)
+        logger.debug(f"[Location][{self._game_type}] 已从快照恢复 {len(locations)} 家店铺")
+        return True
+
+    def _start_refresh(self) -> asyncio.Task[Optional[LocationDiff]]:
+        """启动同步任务，已有同步进行中时直接返回该任务"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.sync())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    def _on_refresh_done(self, task: asyncio.Task[Optional[LocationDiff]]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"[Location][{self._game_type}] 同步店铺列表失败: {task.exception()}")
+
+    async def refresh(self) -> Optional[LocationDiff]:
+        """同步店铺列表，并发调用时只会进行一次同步"""
+        return await asyncio.shield(self._start_refresh())
+
     async def get_locations(self) -> list[ArcadeLocation]:
-        """获取店铺列表，如果缓存过期则重新拉取"""
-        if self.is_expired or not self._locations:
-            await self.sync()
+        """
+        获取店铺列表
+
+        缓存为空时等待同步完成；缓存过期时直接返回旧数据，同时在后台启动一次同步
+        """
+        if not self._locations:
+            await self.refresh()
+        elif self.is_expired:
+            self._start_refresh()
         return self._locations
 
+    async def get_index(self) -> LocationIndex:
+        """获取店铺检索索引，如果缓存过期则重新拉取"""
+        await self.get_locations()
+        return self._index
+
     async def _notify_subscribers(self, diff: LocationDiff) -> None:
         """通知所有匹配关键词的订阅者"""
 
-        session = get_scoped_session()
-        subscriptions: list[LocationSubscription] = await LocationSubscriptionORM.get_all_subscriptions(
-            session, self._game_type
-        )
+        # 订阅未变化时复用已构建的匹配器，无需重新读取订阅
+        generation = LocationSubscriptionORM._generation
+        subscription_matcher = self._subscription_matcher
+        if subscription_matcher is None or subscription_matcher.generation != generation:
+            # 同步可能在定时任务或后台刷新中并发进行，每次读取使用独立的会话，避免与其他任务共用 scoped session
+            async with get_session() as session:
+                subscriptions = await LocationSubscriptionORM.get_all_subscriptions(session, self._game_type)
+                subscription_matcher = self._subscription_matcher = SubscriptionMatcher.build(subscriptions, generation)
 
-        if not subscriptions:
+        if not subscription_matcher.targets:
             return
 
         game_name = "舞萌" if self._game_type == "mai" else "中二"
 
-        for sub in subscriptions:
-            keyword = sub.keyword
-            matched_added = [loc for loc in diff.added if keyword in loc.arcade_name or keyword in loc.address]
-            matched_removed = [loc for loc in diff.removed if keyword in loc.arcade_name or keyword in loc.address]
-
-            if not matched_added and not matched_removed:
-                continue
+        for (user_id, group_id), match in subscription_matcher.match(diff).items():
+            keyword = "、".join(match.keywords)
+            matched_added = match.added
+            matched_removed = match.removed
 
             # 构造通知消息
             parts = [f"📍 [{game_name}店铺变动提醒] 关键词: {keyword}"]
@@ -174,50 +416,20 @@ class LocationCache:
 
             message = "\n".join(parts)
 
+            # 有 group_id 则向群组发送，否则私聊发送；消息由发送队列异步发出，不阻塞同步
+            bot_id = subscription_matcher.target_bots.get((user_id, group_id))
             try:
-                await self._send_message(sub.user_id, sub.group_id, message)
-                logger.debug(f"[Location] 已通知用户 {sub.user_id} (关键词: {keyword})")
+                if group_id:
+                    await enqueue_message(group_id, message, private=False, bot_id=bot_id)
+                else:
+                    await enqueue_message(user_id, message, private=True, bot_id=bot_id)
+                logger.debug(f"[Location] 已加入通知队列: 用户 {user_id} (关键词: {keyword})")
             except Exception as e:
-                logger.warning(f"[Location] 通知用户 {sub.user_id} 失败: {e}")
-
-    @staticmethod
-    async def _send_message(user_id: str, group_id: Optional[str], message: str) -> None:
-        """发送消息给用户
-
-        如果有 group_id 则向群组发送，否则私聊发送。
-        """
-        if group_id:
-            target = Target(group_id, private=False)
-        else:
-            target = Target(user_id, private=True)
-
-        messages = LocationCache._split_message(message)
-        bot = get_bot()
-        for msg in messages:
-            await UniMessage(msg).send(target=target, bot=bot)
-            await asyncio.sleep(_DELAYED_SECOND_PER_PARAGRAPH)
-
-    @staticmethod
-    def _split_message(message: str, max_length: int = 4000) -> list[str]:
-        """将长消息拆分为多段，避免超出平台消息长度限制"""
-        if len(message) <= max_length:
-            return [message]
-
-        parts: list[str] = []
-        current = ""
-        for line in message.split("\n"):
-            if len(current) + len(line) + 1 > max_length:
-                if current:
-                    parts.append(current)
-                current = line
-            else:
-                current = f"{current}\n{line}" if current else line
-        if current:
-            parts.append(current)
-        return parts
+                logger.warning(f"[Location] 通知用户 {user_id} 失败: {e}")
 
     def clear(self) -> None:
         self._locations.clear()
+        self._index = LocationIndex(())
         self._previous_place_ids.clear()
         self._last_update = 0.0
 
@@ -250,16 +462,17 @@ def list_locations(
 
 
 def search_locations(
-    locations: list[ArcadeLocation],
+    locations: Union[LocationIndex, list[ArcadeLocation]],
     *,
     keyword: str,
     max_results: int = 20,
 ) -> str:
-    """搜索包含关键词的店铺"""
+    """搜索包含关键词的店铺，名称命中的店铺排在前面"""
     if not keyword:
         return "请输入搜索关键词"
 
-    matched = [loc for loc in locations if keyword in loc.arcade_name or keyword in loc.address]
+    index = locations if isinstance(locations, LocationIndex) else LocationIndex(locations)
+    matched = index.search(keyword)
 
     if not matched:
         return f'未找到与 "{keyword}" 相关的店铺'
@@ -283,16 +496,25 @@ async def get_chu_locations() -> list[ArcadeLocation]:
     return await _chu_cache.get_locations()
 
 
+async def get_mai_location_index() -> LocationIndex:
+    """获取舞萌店铺检索索引"""
+    return await _mai_cache.get_index()
+
+
+async def get_chu_location_index() -> LocationIndex:
+    """获取中二节奏店铺检索索引"""
+    return await _chu_cache.get_index()
+
+
 async def location_sync(target: Optional[Literal["mai", "chu"]] = None) -> Optional[LocationDiff]:
-    """同步店铺列表"""
+    """同步店铺列表，未指定游戏时同时同步舞萌与中二节奏"""
     if target == "mai":
-        diff = await _mai_cache.sync()
+        diff = await _mai_cache.refresh()
     elif target == "chu":
-        diff = await _chu_cache.sync()
+        diff = await _chu_cache.refresh()
     else:
         diff = LocationDiff()
-        mai_diff = await _mai_cache.sync()
-        chu_diff = await _chu_cache.sync()
+        mai_diff, chu_diff = await asyncio.gather(_mai_cache.refresh(), _chu_cache.refresh())
         if mai_diff:
             diff.added += mai_diff.added
             diff.removed += mai_diff.removed
@@ -302,6 +524,13 @@ async def location_sync(target: Optional[Literal["mai", "chu"]] = None) -> Optio
     return diff
 
 
+@get_driver().on_startup
+async def load_location_snapshots():
+    """启动时从本地快照恢复店铺列表"""
+    for cache in (_mai_cache, _chu_cache):
+        cache.load_snapshot()
+
+
 @scheduler.scheduled_job("cron", hour="*/6", id="sync_locations")
 async def run_every_2_hour():
     """每 6 小时同步一次店铺列表"""
@@ -1,11 +1,13 @@
 import logging
+from contextlib import nullcontext
 from datetime import datetime, timezone
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 import httpx
 from typing_extensions import TypedDict
 
 from ..database import MaiSongORM
+from .pipeline import chunked, post_with_retry
 
 logger = logging.getLogger("sdgb_workflow")
 
@@ -14,6 +16,9 @@ BASE_URL = "https://maimai.lxns.net/api/v0/user/maimai/player"
 COMBO_ID_TO_NAME = [None, "fc", "fcp", "ap", "app"]
 SYNC_ID_TO_NAME = [None, "fs", "fsp", "fsd", "fsdp", "sync"]
 
+# 单次上传的最大记录数，超出时分块上传
+UPLOAD_CHUNK_SIZE = 200
+
 
 class LXNSMaimaiRecord(TypedDict):
     id: int
@@ -39,31 +44,42 @@ class UserMusicDetail(TypedDict):
     extNum2: int
 
 
-async def upload_to_lxns_maimai(token: str, scores: List[LXNSMaimaiRecord]) -> None:
-    """上传成绩到落雪查分器"""
+async def upload_to_lxns_maimai(
+    token: str,
+    scores: List[LXNSMaimaiRecord],
+    client: Optional[httpx.AsyncClient] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> None:
+    """
+    上传成绩到落雪查分器
+
+    成绩按 `chunk_size` 分块依次上传，每块失败时单独重试
+
+    :param client: 复用的 HTTP 客户端，为空时临时创建
+    """
     headers = {"X-User-Token": token, "Content-Type": "application/json"}
 
     logger.info(f"准备上传 {len(scores)} 条记录到落雪查分器...")
-    payload = {"scores": scores}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(
-                f"{BASE_URL}/scores",
-                json=payload,
-                headers=headers,
-                timeout=30.0,
-            )
+    async with nullcontext(client) if client else httpx.AsyncClient() as http_client:
+        for chunk in chunked(scores, chunk_size):
+            try:
+                resp = await post_with_retry(
+                    http_client,
+                    f"{BASE_URL}/scores",
+                    json={"scores": chunk},
+                    headers=headers,
+                )
 
-            if resp.status_code != 200:
-                logger.error(f"[LXNS] 上传失败：HTTP {resp.status_code} - {resp.text}")
-                resp.raise_for_status()
+                if resp.status_code != 200:
+                    logger.error(f"[LXNS] 上传失败：HTTP {resp.status_code} - {resp.text}")
+                    resp.raise_for_status()
 
-            logger.info("[LXNS] 上传成功！")
+                logger.info(f"[LXNS] 上传成功！({len(chunk)} 条)")
 
-        except httpx.RequestError as e:
-            logger.error(f"[LXNS] 连接至服务器时出现问题: {e}")
-            raise
+            except httpx.RequestError as e:
+                logger.error(f"[LXNS] 连接至服务器时出现问题: {e}")
+                raise
 
 
 def convert_to_lxns_maimai_format(
@@ -110,15 +126,19 @@ def convert_to_lxns_maimai_format(
     return lx_list
 
 
-async def get_updated_score(all_scores: list[UserMusicDetail], user_token: str) -> list[UserMusicDetail]:
+async def get_updated_score(
+    all_scores: list[UserMusicDetail], user_token: str, client: Optional[httpx.AsyncClient] = None
+) -> list[UserMusicDetail]:
     """
     获取需要更新的成绩列表
+
+    :param client: 复用的 HTTP 客户端，为空时临时创建
     """
     headers = {"X-User-Token": user_token, "Content-Type": "application/json"}
 
-    async with httpx.AsyncClient() as client:
+    async with nullcontext(client) if client else httpx.AsyncClient() as http_client:
         try:
-            resp = await client.get(
+            resp = await http_client.get(
                 f"{BASE_URL}/scores",
                 headers=headers,
                 timeout=30.0,
@@ -135,6 +155,10 @@ async def get_updated_score(all_scores: list[UserMusicDetail], user_token: str)
     existing_scores: list[LXNSMaimaiRecord] = resp.json()["data"]
     updated_scores: list[UserMusicDetail] = []
 
+    existing_map: dict[tuple[int, str, int], LXNSMaimaiRecord] = {}
+    for record in existing_scores:
+        existing_map.setdefault((record["id"], record["type"], record["level_index"]), record)
+
     for score in all_scores:
         music_id = score["musicId"]
 
@@ -152,14 +176,7 @@ async def get_updated_score(all_scores: list[UserMusicDetail], user_token: str)
             continue
 
         # 查找对应的成绩记录
-        existing_record = next(
-            (
-                record
-                for record in existing_scores
-                if record["id"] == music_id and record["type"] == notes_type and record["level_index"] == score["level"]
-            ),
-            None,
-        )
+        existing_record = existing_map.get((music_id, notes_type, score["level"]))
 
         # 如果没有现有记录，或者成绩有更新，则添加到更新列表
         if not existing_record or (
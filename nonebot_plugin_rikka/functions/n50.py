@@ -1,47 +1,7 @@
 from ..constants import MAI_VERSION_MAP
 from ..database import MaiSongORM
 from ..score.maimai import PlayerMaiB50, PlayerMaiScore
-
-
-def calc_dx_rating(level_value: float, ach: float) -> int:
-    coefficient = 0.0
-    if ach >= 100.5:
-        coefficient = 0.224
-    elif ach >= 100.0:
-        coefficient = 0.216 + (ach - 100.0) * 0.016
-    elif ach >= 99.5:
-        coefficient = 0.211 + (ach - 99.5) * 0.01
-    elif ach >= 99.0:
-        coefficient = 0.208 + (ach - 99.0) * 0.006
-    elif ach >= 98.0:
-        coefficient = 0.203 + (ach - 98.0) * 0.005
-    elif ach >= 97.0:
-        coefficient = 0.2 + (ach - 97.0) * 0.003
-    elif ach >= 94.0:
-        coefficient = 0.168 + (ach - 94.0) * 0.008 / 3
-    elif ach >= 90.0:
-        coefficient = 0.152 + (ach - 90.0) * 0.004
-    elif ach >= 80.0:
-        coefficient = 0.136 + (ach - 80.0) * 0.0016
-    elif ach >= 75.0:
-        coefficient = 0.120 + (ach - 75.0) * 0.0032
-    elif ach >= 70.0:
-        coefficient = 0.112 + (ach - 70.0) * 0.0016
-    elif ach >= 60.0:
-        coefficient = 0.096 + (ach - 60.0) * 0.0016
-    elif ach >= 50.0:
-        coefficient = 0.08 + (ach - 50.0) * 0.0016
-    elif ach >= 40.0:
-        coefficient = 0.064 + (ach - 40.0) * 0.0016
-    elif ach >= 30.0:
-        coefficient = 0.048 + (ach - 30.0) * 0.0016
-    elif ach >= 20.0:
-        coefficient = 0.032 + (ach - 20.0) * 0.0016
-    elif ach >= 10.0:
-        coefficient = 0.016 + (ach - 10.0) * 0.0016
-    else:
-        coefficient = 0.0
-    return round(level_value * coefficient * ach)
+from ..score.maimai.rating import calc_dx_rating_many, select_best_indices
 
 
 def get_players_n50(scores: list[PlayerMaiScore]) -> PlayerMaiB50:
@@ -49,8 +9,9 @@ def get_players_n50(scores: list[PlayerMaiScore]) -> PlayerMaiB50:
     获得玩家的拟合50
     """
     current_version = list(MAI_VERSION_MAP.keys())[-1]
-    previous_version_scores: list[PlayerMaiScore] = []
-    current_version_scores: list[PlayerMaiScore] = []
+    fit_scores: list[PlayerMaiScore] = []
+    level_values: list[float] = []
+    is_current_version: list[bool] = []
 
     for score in scores:
         song = MaiSongORM.get_song_sync(score.song_id)
@@ -63,15 +24,17 @@ def get_players_n50(scores: list[PlayerMaiScore]) -> PlayerMaiB50:
         song_diff = (
             song.difficulties.dx[song_diff_value] if song_type == "dx" else song.difficulties.standard[song_diff_value]
         )
-        score.song_level_value = song_diff.level_fit
-        score.dx_rating = calc_dx_rating(score.song_level_value, score.achievements)
+        fit_scores.append(score)
+        level_values.append(song_diff.level_fit)
+        is_current_version.append(song.version / 100 >= current_version)
 
-        if song.version / 100 >= current_version:
-            current_version_scores.append(score)
-        else:
-            previous_version_scores.append(score)
+    dx_ratings = calc_dx_rating_many(level_values, [score.achievements for score in fit_scores]).tolist()
+    for score, level_value, dx_rating in zip(fit_scores, level_values, dx_ratings):
+        score.song_level_value = level_value
+        score.dx_rating = dx_rating
 
-    previous_version_scores.sort(key=lambda x: x.dx_rating, reverse=True)
-    current_version_scores.sort(key=lambda x: x.dx_rating, reverse=True)
+    previous_indices, current_indices = select_best_indices(dx_ratings, is_current_version)
 
-    return PlayerMaiB50(previous_version_scores[:35], current_version_scores[:15])
+    return PlayerMaiB50(
+        [fit_scores[i] for i in previous_indices.tolist()], [fit_scores[i] for i in current_indices.tolist()]
+    )
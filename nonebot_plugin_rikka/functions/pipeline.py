@@ -0,0 +1,148 @@
+"""
+查分指令的并发流水线工具
+
+将互不依赖的上游请求并发执行，并在成绩数据可用时立即在后台预取封面、头像等渲染资源，
+使端到端耗时接近于最慢的单个上游请求加上渲染耗时
+"""
+
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterator,
+    Sequence,
+    TypeVar,
+    overload,
+)
+
+import httpx
+from nonebot import logger
+
+from ..tracing import span
+
+T = TypeVar("T")
+T1 = TypeVar("T1")
+T2 = TypeVar("T2")
+T3 = TypeVar("T3")
+
+_background_tasks: set[asyncio.Task] = set()
+"""后台任务引用，防止任务在执行完毕前被垃圾回收"""
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+
+    if task.cancelled():
+        return
+
+    if (exc := task.exception()) is not None:
+        logger.warning(f"后台任务 {task.get_name()} 执行失败: {exc}")
+
+
+def spawn_background(coro: Coroutine[Any, Any, Any], name: str | None = None) -> asyncio.Task:
+    """
+    在后台运行协程，异常只记录日志而不会向上抛出
+
+    :param coro: 需要运行的协程
+    :param name: 任务名称，用于日志
+    """
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
+
+
+async def then_prefetch(aw: Awaitable[T], prefetch: Callable[[T], Coroutine[Any, Any, Any]]) -> T:
+    """
+    等待上游请求完成后，立即以其结果在后台启动资源预取
+
+    :param aw: 上游请求
+    :param prefetch: 接收请求结果并返回预取协程的函数
+    """
+    result = await aw
+    spawn_background(_traced_prefetch(prefetch(result)), name="prefetch")
+    return result
+
+
+async def _traced_prefetch(coro: Coroutine[Any, Any, Any]) -> None:
+    # 预取过程中发起下载时 `_download_once` 会将 cache_hit 标记为 False
+    with span("prefetch", cache_hit=True):
+        await coro
+
+
+@overload
+async def gather_stages(aw1: Awaitable[T1], aw2: Awaitable[T2], /) -> tuple[T1, T2]: ...
+
+
+@overload
+async def gather_stages(aw1: Awaitable[T1], aw2: Awaitable[T2], aw3: Awaitable[T3], /) -> tuple[T1, T2, T3]: ...
+
+
+@overload
+async def gather_stages(*aws: Awaitable[Any]) -> tuple[Any, ...]: ...
+
+
+async def gather_stages(*aws: Awaitable[Any]) -> tuple[Any, ...]:
+    """
+    并发执行互不依赖的上游请求
+
+    任意一个请求失败时取消其余仍在进行的请求，并抛出该异常
+
+    :return: 与传入顺序一致的结果元组
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+
+    try:
+        return tuple(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        raise
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    """
+    将序列按固定大小切分
+
+    :param items: 序列
+    :param size: 每块的最大长度
+    """
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+async def post_with_retry(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    json: Any,
+    headers: dict[str, str],
+    timeout: float = 30.0,
+    max_attempts: int = 3,
+    backoff: float = 1.0,
+) -> httpx.Response:
+    """
+    发送 POST 请求，连接失败、超时、HTTP 429 或 5xx 时按指数退避重试
+
+    :param max_attempts: 最大尝试次数
+    :param backoff: 首次重试前的等待时间（秒），之后每次翻倍
+    :return: 最后一次请求的响应，调用方需自行检查状态码
+    :raise httpx.RequestError: 所有尝试均无法完成请求
+    """
+    for attempt in range(1, max_attempts):
+        try:
+            resp = await client.post(url, json=json, headers=headers, timeout=timeout)
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            reason = f"HTTP {resp.status_code}"
+        except httpx.RequestError as e:
+            reason = str(e)
+
+        delay = backoff * 2 ** (attempt - 1)
+        logger.warning(f"请求 {url} 失败 ({attempt}/{max_attempts})，{delay:g} 秒后重试: {reason}")
+        await asyncio.sleep(delay)
+
+    return await client.post(url, json=json, headers=headers, timeout=timeout)
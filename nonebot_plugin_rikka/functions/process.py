@@ -1,6 +1,11 @@
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+import weakref
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from ..constants import MAI_VERSION_MAP
+from ..database import MaiSongORM
 from ..models.song import MaiSong, SongDifficulty
 from ..score.maimai import PlayerMaiScore
 from ..score.maimai._schema import SongType
@@ -24,108 +29,443 @@ class LevelProcessData:
     counts: Dict[str, int]  # total, completed, unfinished, not_played
 
 
+_ACHIEVEMENT_PLANS = ["S", "S+", "SS", "SS+", "SSS", "SSS+"]
+_ACHIEVEMENT_THRESHOLDS = [97.0, 98.0, 99.0, 99.5, 100.0, 100.5]
+_COMBO_PLANS = ["FC", "FCP", "AP", "APP"]
+_SYNC_PLANS = ["FS", "FSP", "FSD", "FSDP"]
+
+PLANS: Dict[str, Tuple[str, int]] = {
+    **{plan: ("ach", tier) for tier, plan in enumerate(_ACHIEVEMENT_PLANS, start=1)},
+    **{plan: ("fc", tier) for tier, plan in enumerate(_COMBO_PLANS, start=1)},
+    **{plan: ("fs", tier) for tier, plan in enumerate(_SYNC_PLANS, start=1)},
+}
+"""目标 -> (类别, 等级)，成绩在该类别的等级不低于目标等级即视为完成"""
+
+_PLAN_ALIASES = {"FC+": "FCP", "AP+": "APP", "FS+": "FSP", "FSD+": "FSDP", "FDX": "FSD", "FDX+": "FSDP"}
+
+_COMBO_TIERS = {plan.lower(): tier for plan, (category, tier) in PLANS.items() if category == "fc"}
+_SYNC_TIERS = {plan.lower(): tier for plan, (category, tier) in PLANS.items() if category == "fs"}
+
+NOT_PLAYED = -1
+"""未游玩谱面的等级"""
+
+
+def normalize_plan(plan: str) -> str:
+    """
+    规范化目标名称，如 `fc+` -> `FCP`
+
+    :raise LevelProcessError: 不支持的目标
+    """
+    plan = plan.upper()
+    plan = _PLAN_ALIASES.get(plan, plan)
+    if plan not in PLANS:
+        raise LevelProcessError(f"不支持的目标: {plan}，可选目标: {', '.join(PLANS)}")
+    return plan
+
+
+@dataclass
+class LevelChart:
+    song: MaiSong
+    difficulty: SongDifficulty
+    is_dx: bool
+
+
+@dataclass
+class LevelIndex:
+    """等级 -> 谱面列表 的索引，随曲目缓存版本重建"""
+
+    generation: int
+    """构建索引时的曲目缓存版本"""
+    charts: Dict[str, List[LevelChart]] = field(default_factory=dict)
+    """等级标签 (如 `13+`) -> 谱面列表"""
+
+    @staticmethod
+    def build(songs: Iterable[MaiSong], generation: int = -1) -> "LevelIndex":
+        index = LevelIndex(generation=generation)
+        for s in songs:
+            for d in s.difficulties.standard:
+                index.charts.setdefault(d.level, []).append(LevelChart(s, d, False))
+            for d in s.difficulties.dx:
+                index.charts.setdefault(d.level, []).append(LevelChart(s, d, True))
+        return index
+
+
+_level_index: Optional[LevelIndex] = None
+
+
+def get_level_index() -> LevelIndex:
+    """获取当前曲目缓存对应的等级索引，曲目缓存变化后自动重建"""
+    global _level_index
+
+    generation = MaiSongORM._generation
+    if _level_index is None or _level_index.generation != generation:
+        _level_index = LevelIndex.build(MaiSongORM._cache.values(), generation)
+    return _level_index
+
+
+@dataclass
+class LevelProgress:
+    """某一等级全部谱面在各类别下的完成等级"""
+
+    level: str
+    charts: List[LevelChart]
+    scores: List[Optional[PlayerMaiScore]]
+    tiers: Dict[str, List[int]]
+    """类别 (ach / fc / fs) -> 每个谱面的完成等级，未游玩为 NOT_PLAYED"""
+
+    def counts(self, plan: str) -> Dict[str, int]:
+        """获取指定目标的完成数量统计"""
+        category, target = PLANS[normalize_plan(plan)]
+        tiers = self.tiers[category]
+        not_played = sum(1 for tier in tiers if tier == NOT_PLAYED)
+        completed = sum(1 for tier in tiers if tier >= target)
+        return {
+            "total": len(tiers),
+            "completed": completed,
+            "unfinished": len(tiers) - completed - not_played,
+            "not_played": not_played,
+        }
+
+    def to_process_data(self, plan: str) -> LevelProcessData:
+        """展开指定目标的完成情况"""
+        plan = normalize_plan(plan)
+        category, target = PLANS[plan]
+
+        completed_list: list[tuple[MaiSong, Optional[PlayerMaiScore], int]] = []
+        unfinished_list: list[tuple[MaiSong, Optional[PlayerMaiScore], int]] = []
+        not_played_list: list[tuple[MaiSong, int]] = []
+
+        for chart, sc, tier in zip(self.charts, self.scores, self.tiers[category]):
+            if tier == NOT_PLAYED:
+                not_played_list.append((chart.song, chart.difficulty.difficulty))
+            elif tier >= target:
+                completed_list.append((chart.song, sc, chart.difficulty.difficulty))
+            else:
+                unfinished_list.append((chart.song, sc, chart.difficulty.difficulty))
+
+        return LevelProcessData(
+            level=self.level,
+            plan=plan,
+            completed=completed_list,
+            unfinished=unfinished_list,
+            not_played=not_played_list,
+            counts={
+                "total": len(self.charts),
+                "completed": len(completed_list),
+                "unfinished": len(unfinished_list),
+                "not_played": len(not_played_list),
+            },
+        )
+
+
+@dataclass
+class PlayerProgress:
+    """玩家全部等级、全部目标的完成情况"""
+
+    levels: Dict[str, LevelProgress]
+
+    def get(self, level: str, plan: str) -> LevelProcessData:
+        if level not in self.levels:
+            raise LevelProcessError(f"未找到等级为 {level} 的曲目")
+        return self.levels[level].to_process_data(plan)
+
+
+def _score_tiers(sc: PlayerMaiScore) -> Tuple[int, int, int]:
+    ach_tier = sum(1 for threshold in _ACHIEVEMENT_THRESHOLDS if sc.achievements >= threshold)
+    fc_tier = _COMBO_TIERS.get(sc.fc.lower(), 0) if sc.fc else 0
+    fs_tier = _SYNC_TIERS.get(sc.fs.lower(), 0) if sc.fs else 0
+    return ach_tier, fc_tier, fs_tier
+
+
+def compute_player_progress(index: LevelIndex, scores: List[PlayerMaiScore]) -> PlayerProgress:
+    """
+    一次性计算玩家在全部等级、全部目标下的完成情况
+
+    :param index: 等级索引
+    :param scores: 玩家全部成绩
+    """
+    played_map: dict[tuple[int, bool, int], tuple[PlayerMaiScore, tuple[int, int, int]]] = {}
+    for player_score in scores:
+        is_dx = player_score.song_type == SongType.DX
+        played_map[(player_score.song_id, is_dx, int(player_score.song_difficulty))] = (
+            player_score,
+            _score_tiers(player_score),
+        )
+
+    not_played = (None, (NOT_PLAYED, NOT_PLAYED, NOT_PLAYED))
+    levels: Dict[str, LevelProgress] = {}
+    for level, charts in index.charts.items():
+        level_scores: list[Optional[PlayerMaiScore]] = []
+        ach_tiers: list[int] = []
+        fc_tiers: list[int] = []
+        fs_tiers: list[int] = []
+        for chart in charts:
+            sc, (ach_tier, fc_tier, fs_tier) = played_map.get(
+                (chart.song.id, chart.is_dx, chart.difficulty.difficulty), not_played
+            )
+            level_scores.append(sc)
+            ach_tiers.append(ach_tier)
+            fc_tiers.append(fc_tier)
+            fs_tiers.append(fs_tier)
+
+        levels[level] = LevelProgress(
+            level=level,
+            charts=charts,
+            scores=level_scores,
+            tiers={"ach": ach_tiers, "fc": fc_tiers, "fs": fs_tiers},
+        )
+
+    return PlayerProgress(levels=levels)
+
+
+_progress_cache: "OrderedDict[str, tuple[int, weakref.ref[object], PlayerProgress]]" = OrderedDict()
+"""用户 ID -> (曲目缓存版本, 成绩快照的弱引用, 完成情况)"""
+_PROGRESS_CACHE_MAXSIZE = 256
+
+
+def get_player_progress(user_id: str, scores: List[PlayerMaiScore], snapshot: object) -> PlayerProgress:
+    """
+    获取玩家全部等级、全部目标的完成情况
+
+    结果按用户缓存，曲目缓存变化或成绩快照不再是同一对象时重新计算
+
+    :param user_id: 用户 ID
+    :param scores: 玩家全部成绩
+    :param snapshot: 成绩所属的快照对象，如查分器缓存的成绩对象；需支持弱引用，按对象身份比较，成绩更新后应为新的对象
+    """
+    index = get_level_index()
+
+    cached = _progress_cache.get(user_id)
+    if cached is not None and cached[0] == index.generation and cached[1]() is snapshot:
+        _progress_cache.move_to_end(user_id)
+        return cached[2]
+
+    progress = compute_player_progress(index, scores)
+    _progress_cache[user_id] = (index.generation, weakref.ref(snapshot), progress)
+    _progress_cache.move_to_end(user_id)
+    while len(_progress_cache) > _PROGRESS_CACHE_MAXSIZE:
+        _progress_cache.popitem(last=False)
+    return progress
+
+
 def get_level_process_data(
     songs: List[MaiSong],
     scores: List[PlayerMaiScore],
     level: str,
     plan: str,
 ) -> LevelProcessData:
+    """
+    计算指定曲目范围内某一等级、某一目标的完成情况，不使用缓存
+    """
+    return compute_player_progress(LevelIndex.build(songs), scores).get(level, plan)
 
-    target_tasks: list[tuple[MaiSong, SongDifficulty, bool]] = []  # (Song, SongDifficulty, is_dx)
 
-    for s in songs:
-        for d in s.difficulties.standard:
-            if d.level == level:
-                target_tasks.append((s, d, False))
-        for d in s.difficulties.dx:
-            if d.level == level:
-                target_tasks.append((s, d, True))
+class PlateProcessError(ProcessDataError):
+    pass
 
-    if not target_tasks:
-        raise LevelProcessError(f"未找到等级为 {level} 的曲目")
 
-    played_map: dict[tuple[int, bool, int], PlayerMaiScore] = {}
+class UnknownPlateError(PlateProcessError):
+    """本地牌子表未收录该版本字，需回退到 maimai.py 计算"""
+
+
+_PRE_DX_VERSIONS = tuple(version for version in sorted(MAI_VERSION_MAP) if version < 200)
+
+_PLATE_VERSIONS: Dict[str, Tuple[int, ...]] = {
+    "真": (100, 110),
+    "超": (120,),
+    "檄": (130,),
+    "橙": (140,),
+    "晓": (150,),
+    "暁": (150,),
+    "桃": (160,),
+    "樱": (170,),
+    "櫻": (170,),
+    "紫": (180,),
+    "堇": (185,),
+    "菫": (185,),
+    "白": (190,),
+    "雪": (195,),
+    "辉": (199,),
+    "輝": (199,),
+    "舞": _PRE_DX_VERSIONS,
+    "霸": _PRE_DX_VERSIONS,
+    "熊": (200,),
+    "华": (200,),
+    "華": (200,),
+    "爽": (210,),
+    "煌": (210,),
+    "宙": (220,),
+    "星": (220,),
+    "祭": (230,),
+    "祝": (230,),
+    "双": (240,),
+    "宴": (240,),
+    "镜": (250,),
+}
+"""
+牌子版本字 -> 包含的版本 (`MAI_VERSION_MAP` 的键)，国服舞萌DX 同一版本的两个牌子共用同一批谱面
+
+未收录的版本字 (如尚未确定牌子名称的新版本) 由 `UnknownPlateError` 回退到 maimai.py 计算
+"""
+
+_VERSION_KEYS = sorted(MAI_VERSION_MAP)
+
+_PLATE_REQUIREMENTS: Dict[str, Tuple[str, int]] = {
+    "极": ("fc", PLANS["FC"][1]),
+    "極": ("fc", PLANS["FC"][1]),
+    "将": ("ach", PLANS["SSS"][1]),
+    "神": ("fc", PLANS["AP"][1]),
+    "舞舞": ("fs", PLANS["FSD"][1]),
+    "者": ("clear", 1),
+}
+"""牌子类型 -> (类别, 等级)"""
+
+_PLATE_CLEAR_ACHIEVEMENTS = 80.0
+"""霸者的达成率要求"""
+
+_TIER_POSITIONS = {"ach": 0, "fc": 1, "fs": 2}
+
+
+@dataclass
+class PlateProcessData:
+    plate: str
+    total: int
+    """谱面总数"""
+    cleared: int
+    """已达成谱面数"""
+    remained: List[Tuple[LevelChart, Optional[PlayerMaiScore]]]
+    """未达成的谱面及玩家成绩，未游玩时成绩为 None"""
+
 
+@dataclass
+class PlateIndex:
+    """牌子版本字 -> 谱面列表 的索引，随曲目缓存版本重建"""
+
+    generation: int
+    charts: Dict[str, List[LevelChart]] = field(default_factory=dict)
+
+    @staticmethod
+    def build(songs: Iterable[MaiSong], generation: int = -1) -> "PlateIndex":
+        version_charts: Dict[int, List[LevelChart]] = {}
+        remaster_charts: Dict[int, List[LevelChart]] = {}
+        for s in songs:
+            if s.disabled:
+                continue
+            for is_dx, difficulties in ((False, s.difficulties.standard), (True, s.difficulties.dx)):
+                for d in difficulties:
+                    version = _chart_version(s, d)
+                    # 舞萌DX 之前的牌子只统计标准谱面，舞萌DX 及之后的牌子只统计 DX 谱面
+                    if is_dx != (version >= 200):
+                        continue
+                    target = remaster_charts if d.difficulty >= 4 else version_charts
+                    target.setdefault(version, []).append(LevelChart(s, d, is_dx))
+
+        index = PlateIndex(generation=generation)
+        for name, versions in _PLATE_VERSIONS.items():
+            charts = [chart for version in versions for chart in version_charts.get(version, [])]
+            # 舞系与霸者需要包含 Re:MASTER 谱面
+            if name in ("舞", "霸"):
+                charts += [chart for version in versions for chart in remaster_charts.get(version, [])]
+            index.charts[name] = charts
+        return index
+
+
+def _chart_version(song: MaiSong, difficulty: SongDifficulty) -> int:
+    """
+    获取谱面首次出现的版本 (`MAI_VERSION_MAP` 的键)
+
+    同一曲目的谱面可能在不同版本加入 (如后续追加的 DX 谱面或 Re:MASTER 谱面)，因此优先使用谱面自身的版本，
+    未记录时使用曲目版本
+    """
+    try:
+        version = int(difficulty.version or 0)
+    except ValueError:
+        version = 0
+    version = (version or song.version) // 100
+    return _VERSION_KEYS[max(bisect_right(_VERSION_KEYS, version) - 1, 0)]
+
+
+_plate_index: Optional[PlateIndex] = None
+
+
+def get_plate_index() -> PlateIndex:
+    """获取当前曲目缓存对应的牌子索引，曲目缓存变化后自动重建"""
+    global _plate_index
+
+    generation = MaiSongORM._generation
+    if _plate_index is None or _plate_index.generation != generation:
+        _plate_index = PlateIndex.build(MaiSongORM._cache.values(), generation)
+    return _plate_index
+
+
+def parse_plate(plate_name: str) -> Tuple[str, str]:
+    """
+    解析牌子名称，如 `真极` -> (`真`, `极`)，`霸者` -> (`霸`, `者`)
+
+    :raise UnknownPlateError: 本地牌子表未收录该版本字
+    :raise PlateProcessError: 无效的牌子
+    """
+    version, kind = plate_name[:1], plate_name[1:]
+    if kind not in _PLATE_REQUIREMENTS or (version == "霸") != (kind == "者"):
+        raise PlateProcessError(f"无效的牌子: {plate_name}")
+    if version not in _PLATE_VERSIONS:
+        raise UnknownPlateError(f"本地牌子表未收录: {plate_name}")
+    if plate_name == "真将":
+        raise PlateProcessError("真系没有真将哦")
+    return version, kind
+
+
+def get_plate_process_data(plate_name: str, scores: List[PlayerMaiScore]) -> PlateProcessData:
+    """
+    根据本地曲目缓存与玩家成绩计算牌子进度
+
+    :param plate_name: 牌子名称，如 `真极`, `熊将`, `紫舞舞`, `霸者`
+    :param scores: 玩家全部成绩
+    """
+    version, kind = parse_plate(plate_name)
+    category, target = _PLATE_REQUIREMENTS[kind]
+    charts = get_plate_index().charts[version]
+
+    played_map: dict[tuple[int, bool, int], PlayerMaiScore] = {}
     for player_score in scores:
         is_dx = player_score.song_type == SongType.DX
         played_map[(player_score.song_id, is_dx, int(player_score.song_difficulty))] = player_score
 
-    completed_list: list[tuple[MaiSong, Optional[PlayerMaiScore], int]] = []
-    unfinished_list: list[tuple[MaiSong, Optional[PlayerMaiScore], int]] = []
-    not_played_list: list[tuple[MaiSong, int]] = []
+    cleared = 0
+    remained: List[Tuple[LevelChart, Optional[PlayerMaiScore]]] = []
+    for chart in charts:
+        sc = played_map.get((chart.song.id, chart.is_dx, chart.difficulty.difficulty))
+        if sc is not None:
+            if category == "clear":
+                tier = 1 if sc.achievements >= _PLATE_CLEAR_ACHIEVEMENTS else 0
+            else:
+                tier = _score_tiers(sc)[_TIER_POSITIONS[category]]
+            if tier >= target:
+                cleared += 1
+                continue
+        remained.append((chart, sc))
 
-    plan_val = 0.0
-    plan_mode = "ach"  # ach, fc, fs
+    return PlateProcessData(plate=plate_name, total=len(charts), cleared=cleared, remained=remained)
 
-    plan = plan.upper()
-    if plan == "SSS+":
-        plan_val = 100.5
-    elif plan == "SSS":
-        plan_val = 100.0
-    elif plan == "SS+":
-        plan_val = 99.5
-    elif plan == "SS":
-        plan_val = 99.0
-    elif plan == "S+":
-        plan_val = 98.0
-    elif plan == "S":
-        plan_val = 97.0
-    elif "FC" in plan or "AP" in plan:
-        plan_mode = "fc"
-    elif "FS" in plan or "SYNC" in plan:
-        plan_mode = "fs"
-
-    combo_rank_order = ["fc", "fcp", "ap", "app"]
-    sync_rank_order = ["fs", "fsp", "fsd", "fsdp"]
-
-    for s, d, is_dx in target_tasks:
-        sc = played_map.get((s.id, is_dx, d.difficulty))
-
-        if sc is None:
-            not_played_list.append((s, d.difficulty))
+
+def build_plate_process_data(
+    plate_name: str, total: int, cleared: int, remained: Iterable[Tuple[int, bool, int]]
+) -> PlateProcessData:
+    """
+    根据 maimai.py 计算的牌子进度构造结果，用于本地牌子表未收录的版本
+
+    :param total: 谱面总数
+    :param cleared: 已达成谱面数
+    :param remained: 未达成谱面的 (曲目 ID, 是否为 DX 谱面, 难度)，本地曲目缓存中不存在的谱面会被忽略
+    """
+    charts: List[Tuple[LevelChart, Optional[PlayerMaiScore]]] = []
+    for song_id, is_dx, difficulty in remained:
+        song = MaiSongORM._cache.get(song_id)
+        if song is None:
             continue
+        for d in song.difficulties.dx if is_dx else song.difficulties.standard:
+            if d.difficulty == difficulty:
+                charts.append((LevelChart(song, d, is_dx), None))
+                break
 
-        is_comp = False
-        if plan_mode == "ach":
-            is_comp = sc.achievements >= plan_val
-        elif plan_mode == "fc":
-            if sc.fc:
-                try:
-                    curr_idx = combo_rank_order.index(sc.fc.lower())
-                    target_idx = -1
-                    if plan.lower() in combo_rank_order:
-                        target_idx = combo_rank_order.index(plan.lower())
-                    if target_idx != -1:
-                        is_comp = curr_idx >= target_idx
-                except ValueError:
-                    pass
-        elif plan_mode == "fs":
-            if sc.fs:
-                try:
-                    curr_idx = sync_rank_order.index(sc.fs.lower())
-                    target_idx = -1
-                    if plan.lower() in sync_rank_order:
-                        target_idx = sync_rank_order.index(plan.lower())
-                    if target_idx != -1:
-                        is_comp = curr_idx >= target_idx
-                except ValueError:
-                    pass
-
-        if is_comp:
-            completed_list.append((s, sc, d.difficulty))
-        else:
-            unfinished_list.append((s, sc, d.difficulty))
-
-    return LevelProcessData(
-        level=level,
-        plan=plan,
-        completed=completed_list,
-        unfinished=unfinished_list,
-        not_played=not_played_list,
-        counts={
-            "total": len(target_tasks),
-            "completed": len(completed_list),
-            "unfinished": len(unfinished_list),
-            "not_played": len(not_played_list),
-        },
-    )
+    return PlateProcessData(plate=plate_name, total=total, cleared=cleared, remained=charts)
@@ -0,0 +1,121 @@
+"""
+随机选曲
+
+按曲目缓存预先将曲目划分到以 (难度, 等级, 定数) 为键的桶中，每种条件组合（含未指定的条件）各对应一个桶，
+随机选曲时直接取桶并均匀抽取，无需访问数据库；曲目缓存变化后桶会自动重建
+"""
+
+import random
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+from ..database import ChuSongORM, MaiSongORM
+from ..models.chu_song import ChuSong
+from ..models.song import MaiSong
+
+SongT = TypeVar("SongT")
+
+BucketKey = tuple[Optional[int], Optional[str], Optional[float]]
+"""(难度, 等级, 定数)，None 表示不限"""
+
+
+def _level_value_key(level_value: Optional[float]) -> Optional[float]:
+    return None if level_value is None else round(level_value, 4)
+
+
+@dataclass
+class SongBuckets(Generic[SongT]):
+    """随机选曲桶，调用方不应修改其中的内容"""
+
+    generation: int
+    """构建时的曲目缓存版本"""
+    buckets: dict[BucketKey, tuple[SongT, ...]] = field(default_factory=dict)
+    """条件组合 -> 满足条件的曲目，每首曲目在同一个桶中只出现一次"""
+
+    @staticmethod
+    def build(
+        songs: Iterable[SongT],
+        charts: Callable[[SongT], Iterable[tuple[int, str, float]]],
+        generation: int,
+    ) -> "SongBuckets[SongT]":
+        """
+        构建随机选曲桶
+
+        :param songs: 曲目列表
+        :param charts: 获取曲目全部谱面 (难度, 等级, 定数) 的函数
+        :param generation: 曲目缓存版本
+        """
+        buckets: dict[BucketKey, list[SongT]] = {}
+
+        for song in songs:
+            keys: set[BucketKey] = set()
+            for difficulty, level, level_value in charts(song):
+                chart_key = (difficulty, level, _level_value_key(level_value))
+                for mask in product((True, False), repeat=3):
+                    keys.add(tuple(value if keep else None for value, keep in zip(chart_key, mask)))  # type: ignore
+            for key in keys:
+                buckets.setdefault(key, []).append(song)
+
+        return SongBuckets(generation, {key: tuple(bucket) for key, bucket in buckets.items()})
+
+    def count(
+        self, difficulty: Optional[int] = None, level: Optional[str] = None, level_value: Optional[float] = None
+    ) -> int:
+        """获取满足条件的曲目数量"""
+        return len(self.buckets.get((difficulty, level, _level_value_key(level_value)), ()))
+
+    def choice(
+        self,
+        difficulty: Optional[int] = None,
+        level: Optional[str] = None,
+        level_value: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+    ) -> Optional[SongT]:
+        """
+        随机抽取一首存在满足全部条件谱面的曲目，每首满足条件的曲目被抽中的概率相同
+
+        :param difficulty: 难度
+        :param level: 等级，如 `12+`
+        :param level_value: 定数
+        :param rng: 随机数生成器，默认使用 `random` 模块
+        :return: 抽中的曲目，没有满足条件的曲目时返回 None
+        """
+        bucket = self.buckets.get((difficulty, level, _level_value_key(level_value)))
+        if not bucket:
+            return None
+        return bucket[(rng or random).randrange(len(bucket))]
+
+
+def _mai_charts(song: MaiSong) -> Iterable[tuple[int, str, float]]:
+    for diff in (*song.difficulties.standard, *song.difficulties.dx):
+        yield diff.difficulty, diff.level, diff.level_value
+
+
+def _chu_charts(song: ChuSong) -> Iterable[tuple[int, str, float]]:
+    for diff in song.difficulties.difficulties:
+        yield diff.difficulty, diff.level, diff.level_value
+
+
+_mai_buckets: Optional[SongBuckets[MaiSong]] = None
+_chu_buckets: Optional[SongBuckets[ChuSong]] = None
+
+
+def get_mai_song_buckets() -> SongBuckets[MaiSong]:
+    """获取当前舞萌DX 曲目缓存对应的随机选曲桶，曲目缓存变化后自动重建"""
+    global _mai_buckets
+
+    generation = MaiSongORM._generation
+    if _mai_buckets is None or _mai_buckets.generation != generation:
+        _mai_buckets = SongBuckets.build(MaiSongORM._cache.values(), _mai_charts, generation)
+    return _mai_buckets
+
+
+def get_chu_song_buckets() -> SongBuckets[ChuSong]:
+    """获取当前中二节奏曲目缓存对应的随机选曲桶，曲目缓存变化后自动重建"""
+    global _chu_buckets
+
+    generation = ChuSongORM._generation
+    if _chu_buckets is None or _chu_buckets.generation != generation:
+        _chu_buckets = SongBuckets.build(ChuSongORM._cache.values(), _chu_charts, generation)
+    return _chu_buckets
@@ -0,0 +1,189 @@
+"""
+机台成绩导入流水线
+
+机台成绩 (UserMusicDetail) 只转换一次，随后并发上传至水鱼查分器、落雪查分器并写入本地游玩次数，
+所有上传共用同一个 HTTP 客户端。各阶段互不影响，返回各阶段的结果与耗时
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Optional, TypeVar
+
+import httpx
+from nonebot import logger
+
+from ..database import DBSession, MaiPlayCountORM
+from .diving_fish import (
+    convert_to_diving_fish_format,
+    fetch_diving_fish_records,
+    filter_improved_records,
+    upload_to_diving_fish,
+)
+from .lxns import (
+    UserMusicDetail,
+    convert_to_lxns_maimai_format,
+    get_updated_score,
+    upload_to_lxns_maimai,
+)
+
+T = TypeVar("T")
+
+_STAGE_NAMES = {
+    "convert": "转换",
+    "divingfish": "水鱼",
+    "lxns": "落雪",
+    "play_count": "游玩次数",
+    "total": "总计",
+}
+
+
+@dataclass
+class ScoreImportReport:
+    """成绩导入结果"""
+
+    divingfish_uploaded: Optional[int] = None
+    """上传至水鱼查分器的记录数（增量模式下仅包含有提升的成绩），未上传时为 None"""
+    lxns_uploaded: Optional[int] = None
+    """上传至落雪查分器的记录数（仅包含有提升的成绩），未上传时为 None"""
+    play_count_imported: int = 0
+    """实际写入的游玩次数记录数"""
+    errors: dict[str, Exception] = field(default_factory=dict)
+    """阶段 -> 异常，仅包含执行失败的阶段"""
+    timings: dict[str, float] = field(default_factory=dict)
+    """阶段 -> 耗时（秒），并发执行的阶段各自计时"""
+
+    def format_timings(self) -> str:
+        """格式化各阶段耗时，如 `转换 0.01s / 水鱼 1.20s / 总计 1.25s`"""
+        return " / ".join(f"{_STAGE_NAMES.get(stage, stage)} {cost:.2f}s" for stage, cost in self.timings.items())
+
+    def format_outcomes(self) -> str:
+        """格式化已执行阶段的结果，如 `水鱼 成功 (12 条) / 落雪 失败 (HTTP 502) / 游玩次数 成功 (300 条)`"""
+        counts = {
+            "divingfish": self.divingfish_uploaded,
+            "lxns": self.lxns_uploaded,
+            "play_count": self.play_count_imported,
+        }
+        outcomes = []
+        for stage, count in counts.items():
+            if stage in self.errors:
+                outcomes.append(f"{_STAGE_NAMES[stage]} 失败 ({self.errors[stage]})")
+            elif stage in self.timings:
+                outcomes.append(f"{_STAGE_NAMES[stage]} 成功 ({count} 条)")
+        return " / ".join(outcomes)
+
+
+def extract_play_count_records(scores: list[Any]) -> list[tuple[int, int, int]]:
+    """
+    从机台成绩中提取游玩次数，跳过格式不正确的记录
+
+    :return: (song_id, difficulty, play_count) 列表
+    """
+    records: list[tuple[int, int, int]] = []
+    for item in scores:
+        if not isinstance(item, dict):
+            continue
+        try:
+            song_id = int(item["musicId"])
+            difficulty = int(item["level"])
+            play_count = int(item["playCount"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        records.append((song_id, difficulty, play_count))
+    return records
+
+
+async def _timed(report: ScoreImportReport, stage: str, aw: Awaitable[T]) -> T:
+    start = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        report.timings[stage] = time.perf_counter() - start
+
+
+async def _import_divingfish(client: httpx.AsyncClient, token: str, payload: list, delta: bool) -> int:
+    if delta:
+        try:
+            existing_records = await fetch_diving_fish_records(token, client=client)
+        except httpx.HTTPError as e:
+            logger.warning(f"获取水鱼查分器成绩失败，将上传全部成绩: {e}")
+        else:
+            payload = filter_improved_records(payload, existing_records)
+            logger.debug(f"需要更新的水鱼成绩数量: {len(payload)}")
+
+    if payload:
+        await upload_to_diving_fish(token, payload, client=client)
+    return len(payload)
+
+
+async def _import_lxns(client: httpx.AsyncClient, token: str, scores: list[UserMusicDetail]) -> int:
+    updated_scores = await get_updated_score(scores, token, client=client)
+    logger.debug(f"需要更新的成绩数量: {len(updated_scores)}")
+    if updated_scores:
+        await upload_to_lxns_maimai(token, convert_to_lxns_maimai_format(updated_scores), client=client)
+    return len(updated_scores)
+
+
+async def import_scores(
+    session: DBSession,
+    user_id: str,
+    scores: list[Any],
+    *,
+    divingfish_token: Optional[str] = None,
+    lxns_token: Optional[str] = None,
+    divingfish_delta: bool = True,
+) -> ScoreImportReport:
+    """
+    导入机台成绩
+
+    上传水鱼、上传落雪与写入游玩次数三个阶段并发执行，单个阶段失败不会影响其余阶段，
+    失败原因记录在 `ScoreImportReport.errors` 中；所有阶段均失败时抛出第一个阶段的异常
+
+    :param scores: 机台成绩列表 (UserMusicDetail)
+    :param divingfish_token: 水鱼查分器导入 Token，为空时跳过水鱼
+    :param lxns_token: 落雪查分器用户 Token，为空时跳过落雪
+    :param divingfish_delta: 是否只向水鱼查分器上传有提升的成绩，获取已有成绩失败时上传全部成绩
+    """
+    report = ScoreImportReport()
+    start = time.perf_counter()
+
+    convert_start = time.perf_counter()
+    divingfish_payload = await convert_to_diving_fish_format(scores) if divingfish_token else []  # type: ignore
+    play_count_records = extract_play_count_records(scores)
+    report.timings["convert"] = time.perf_counter() - convert_start
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        stages: dict[str, Awaitable[int]] = {}
+        if divingfish_token:
+            stages["divingfish"] = _import_divingfish(client, divingfish_token, divingfish_payload, divingfish_delta)
+        if lxns_token:
+            stages["lxns"] = _import_lxns(client, lxns_token, scores)
+        stages["play_count"] = MaiPlayCountORM.upsert_user_play_counts(session, user_id, play_count_records)
+
+        # 各阶段互相独立，某个查分器暂时不可用时不应中断其余上传
+        results = await asyncio.gather(
+            *(_timed(report, stage, aw) for stage, aw in stages.items()), return_exceptions=True
+        )
+
+    for stage, result in zip(stages, results):
+        if isinstance(result, Exception):
+            logger.warning(f"[{user_id}] 成绩导入阶段 {_STAGE_NAMES[stage]} 失败: {result}")
+            report.errors[stage] = result
+        elif isinstance(result, BaseException):
+            raise result
+        elif stage == "divingfish":
+            report.divingfish_uploaded = result
+        elif stage == "lxns":
+            report.lxns_uploaded = result
+        else:
+            report.play_count_imported = result
+    report.timings["total"] = time.perf_counter() - start
+
+    if "play_count" in report.errors:
+        # 写入失败后会话处于待回滚状态，回滚后调用方才能继续使用该会话
+        await session.rollback()
+    if len(report.errors) == len(stages):
+        raise next(iter(report.errors.values()))
+
+    logger.info(f"[{user_id}] 成绩导入完成, 耗时: {report.format_timings()}")
+    return report
@@ -1,18 +1,17 @@
 from __future__ import annotations
 
 import json
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Literal, Optional
 
+from nonebot import logger
 from typing_extensions import TypedDict
 
 from ..config import config
 
 _SONG_TAGS_FILE = Path(config.static_resource_path) / "combined_tags.json"
 SONG_TAGS_DATA_AVAILABLE = _SONG_TAGS_FILE.exists() and _SONG_TAGS_FILE.stat().st_size > 0
-_SONG_TAGS_DATA: DxRatingCombinedTags = (
-    json.loads(_SONG_TAGS_FILE.read_text(encoding="utf-8")) if SONG_TAGS_DATA_AVAILABLE else {}  # type: ignore
-)
 
 
 class DxRatingTag(TypedDict):
@@ -41,22 +40,87 @@ class DxRatingCombinedTags(TypedDict):
     tagSongs: list[DxRatingTagSong]
 
 
+ChartKey = tuple[str, str, str]
+"""(曲名, 谱面类型, 谱面难度)，谱面难度为小写"""
+
+
+@dataclass
+class SongTagsIndex:
+    """谱面标签索引，由 combined_tags.json 预先构建，调用方不应修改其中的内容"""
+
+    chart_tags: dict[ChartKey, list[str]] = field(default_factory=dict)
+    """谱面 -> 标签名列表"""
+    tag_charts: dict[str, set[ChartKey]] = field(default_factory=dict)
+    """标签名 -> 谱面集合"""
+    tag_names: dict[int, str] = field(default_factory=dict)
+    """标签 ID -> 标签名 (zh-Hans)"""
+
+    @staticmethod
+    def build(data: DxRatingCombinedTags) -> SongTagsIndex:
+        index = SongTagsIndex()
+
+        for tag in data.get("tags", []):
+            index.tag_names.setdefault(tag["id"], tag["localized_name"].get("zh-Hans", "未知标签"))
+
+        for tag_song in data.get("tagSongs", []):
+            tag_name = index.tag_names.get(tag_song["tag_id"])
+            if tag_name is None:
+                continue
+            key = (tag_song["song_id"], tag_song["sheet_type"], tag_song["sheet_difficulty"])
+            index.chart_tags.setdefault(key, []).append(tag_name)
+            index.tag_charts.setdefault(tag_name, set()).add(key)
+
+        return index
+
+
+_song_tags_index: Optional[SongTagsIndex] = None
+_song_tags_signature: Optional[tuple[int, int]] = None
+"""已加载标签文件的 (修改时间, 大小)"""
+
+
+def _get_song_tags_signature() -> Optional[tuple[int, int]]:
+    try:
+        stat = _SONG_TAGS_FILE.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reload_song_tags() -> SongTagsIndex:
+    """
+    重新读取 combined_tags.json 并重建谱面标签索引
+    """
+    global _song_tags_index, _song_tags_signature
+
+    signature = _get_song_tags_signature()
+    data: DxRatingCombinedTags = {}  # type: ignore
+    if signature is not None and signature[1] > 0:
+        try:
+            data = json.loads(_SONG_TAGS_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取谱面标签数据失败: {e}")
+
+    _song_tags_index = SongTagsIndex.build(data)
+    _song_tags_signature = signature
+    logger.debug(f"已加载谱面标签索引，共 {len(_song_tags_index.chart_tags)} 个谱面")
+    return _song_tags_index
+
+
+def get_song_tags_index() -> SongTagsIndex:
+    """
+    获取谱面标签索引
+
+    首次调用时加载标签文件，之后复用已构建的索引，标签文件发生变化时自动重新加载
+    """
+    if _song_tags_index is None or _get_song_tags_signature() != _song_tags_signature:
+        return reload_song_tags()
+    return _song_tags_index
+
+
 def get_songs_tags(
     song_name: str, song_type: Literal["dx", "std"], song_difficulty: Literal["remaster", "master", "expert"]
 ) -> list[str]:
-    tags = []
-    for tag_song in _SONG_TAGS_DATA["tagSongs"]:
-        if (
-            tag_song["song_id"] == song_name
-            and tag_song["sheet_type"] == song_type
-            and tag_song["sheet_difficulty"] == song_difficulty.lower()
-        ):
-            tag_id = tag_song["tag_id"]
-            for tag in _SONG_TAGS_DATA["tags"]:
-                if tag["id"] == tag_id:
-                    tags.append(tag["localized_name"].get("zh-Hans", "未知标签"))
-                    break
-    return tags
+    return list(get_song_tags_index().chart_tags.get((song_name, song_type, song_difficulty.lower()), []))
 
 
 def get_song_by_tags(
@@ -64,16 +128,13 @@ def get_song_by_tags(
     song_type: Optional[Literal["dx", "std"]] = None,
     song_difficulty: Optional[Literal["remaster", "master", "expert"]] = None,
 ) -> list[str]:
-    song_names = []
-    tag_ids = []
-    for tag in _SONG_TAGS_DATA["tags"]:
-        if tag["localized_name"].get("zh-Hans", "未知标签") in tags:
-            tag_ids.append(tag["id"])
-    for tag_song in _SONG_TAGS_DATA["tagSongs"]:
-        if tag_song["tag_id"] in tag_ids:
-            if song_type and tag_song["sheet_type"] != song_type:
+    tag_charts = get_song_tags_index().tag_charts
+    song_names = set()
+    for tag in tags:
+        for name, sheet_type, sheet_difficulty in tag_charts.get(tag, ()):
+            if song_type and sheet_type != song_type:
                 continue
-            if song_difficulty and tag_song["sheet_difficulty"] != song_difficulty:
+            if song_difficulty and sheet_difficulty != song_difficulty:
                 continue
-            song_names.append(tag_song["song_id"])
-    return list(set(song_names))
+            song_names.add(name)
+    return list(song_names)
@@ -0,0 +1,171 @@
+"""add MaiChart and ChuChart
+
+迁移 ID: 5a0b8f3e2c61
+父迁移: 9c4d2e7b6f10
+创建时间: 2026-10-19 23:26:12.947051
+
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Sequence
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "5a0b8f3e2c61"
+down_revision: str | Sequence[str] | None = "9c4d2e7b6f10"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def _notes(chart: dict[str, Any]) -> dict[str, int]:
+    notes = chart.get("notes") or {}
+    return {key: int(value or 0) for key, value in notes.items()}
+
+
+def _mai_chart_rows(song_id: int, difficulties: str) -> list[dict[str, Any]]:
+    data = json.loads(difficulties) if difficulties else {}
+    rows: dict[tuple[str, int], dict[str, Any]] = {}
+    for chart_type in ("standard", "dx"):
+        for chart in data.get(chart_type) or []:
+            notes = _notes(chart)
+            rows[(chart_type, chart["difficulty"])] = {
+                "song_id": song_id,
+                "type": chart_type,
+                "difficulty": chart["difficulty"],
+                "level": chart.get("level") or "",
+                "level_value": chart.get("level_value") or 0.0,
+                "level_fit": chart.get("level_fit") or 0.0,
+                "designer": chart.get("note_designer") or "",
+                "version": chart.get("version") or "",
+                "notes_total": notes.get("total", 0),
+                "notes_tap": notes.get("tap", 0),
+                "notes_hold": notes.get("hold", 0),
+                "notes_slide": notes.get("slide", 0),
+                "notes_touch": notes.get("touch", 0),
+                # 曲目表中的物量由 dataclass 序列化而来，键名为 break_
+                "notes_break": notes.get("break_", notes.get("break", 0)),
+            }
+    return list(rows.values())
+
+
+def _chu_chart_rows(song_id: int, difficulties: str) -> list[dict[str, Any]]:
+    data = json.loads(difficulties) if difficulties else []
+    rows: dict[int, dict[str, Any]] = {}
+    for chart in data:
+        notes = _notes(chart)
+        rows[chart["difficulty"]] = {
+            "song_id": song_id,
+            "difficulty": chart["difficulty"],
+            "level": chart.get("level") or "",
+            "level_value": chart.get("level_value") or 0.0,
+            "designer": chart.get("note_designer") or "",
+            "kanji": chart.get("kanji"),
+            "notes_total": notes.get("total", 0),
+            "notes_tap": notes.get("tap", 0),
+            "notes_hold": notes.get("hold", 0),
+            "notes_slide": notes.get("slide", 0),
+            "notes_air": notes.get("air", 0),
+            "notes_flick": notes.get("flick", 0),
+        }
+    return list(rows.values())
+
+
+def _backfill(song_table: str, chart_table: sa.Table, to_rows: Any) -> None:
+    """由曲目表中已有的 difficulties 列展开谱面"""
+    songs = sa.table(song_table, sa.column("id", sa.Integer()), sa.column("difficulties", sa.String()))
+    rows = [
+        row
+        for song_id, difficulties in op.get_bind().execute(sa.select(songs.c.id, songs.c.difficulties))
+        for row in to_rows(song_id, difficulties)
+    ]
+    if rows:
+        op.bulk_insert(chart_table, rows)
+
+
+def upgrade(name: str = "") -> None:
+    if name:
+        return
+    # ### commands auto generated by Alembic - please adjust! ###
+    mai_chart = op.create_table(
+        "nonebot_plugin_rikka_maichart",
+        sa.Column("song_id", sa.Integer(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("difficulty", sa.Integer(), nullable=False),
+        sa.Column("level", sa.String(), nullable=False),
+        sa.Column("level_value", sa.Float(), nullable=False),
+        sa.Column("level_fit", sa.Float(), nullable=False),
+        sa.Column("designer", sa.String(), nullable=False),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("notes_total", sa.Integer(), nullable=False),
+        sa.Column("notes_tap", sa.Integer(), nullable=False),
+        sa.Column("notes_hold", sa.Integer(), nullable=False),
+        sa.Column("notes_slide", sa.Integer(), nullable=False),
+        sa.Column("notes_touch", sa.Integer(), nullable=False),
+        sa.Column("notes_break", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["song_id"],
+            ["nonebot_plugin_rikka_maisong.id"],
+            name=op.f("fk_nonebot_plugin_rikka_maichart_song_id_nonebot_plugin_rikka_maisong"),
+        ),
+        sa.PrimaryKeyConstraint("song_id", "type", "difficulty", name=op.f("pk_nonebot_plugin_rikka_maichart")),
+        info={"bind_key": "nonebot_plugin_rikka"},
+    )
+    with op.batch_alter_table("nonebot_plugin_rikka_maichart", schema=None) as batch_op:
+        batch_op.create_index("ix_nonebot_plugin_rikka_maichart_level", ["level", "difficulty"], unique=False)
+        batch_op.create_index(
+            "ix_nonebot_plugin_rikka_maichart_level_value", ["level_value", "difficulty"], unique=False
+        )
+
+    chu_chart = op.create_table(
+        "nonebot_plugin_rikka_chuchart",
+        sa.Column("song_id", sa.Integer(), nullable=False),
+        sa.Column("difficulty", sa.Integer(), nullable=False),
+        sa.Column("level", sa.String(), nullable=False),
+        sa.Column("level_value", sa.Float(), nullable=False),
+        sa.Column("designer", sa.String(), nullable=False),
+        sa.Column("kanji", sa.String(), nullable=True),
+        sa.Column("notes_total", sa.Integer(), nullable=False),
+        sa.Column("notes_tap", sa.Integer(), nullable=False),
+        sa.Column("notes_hold", sa.Integer(), nullable=False),
+        sa.Column("notes_slide", sa.Integer(), nullable=False),
+        sa.Column("notes_air", sa.Integer(), nullable=False),
+        sa.Column("notes_flick", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["song_id"],
+            ["nonebot_plugin_rikka_chusong.id"],
+            name=op.f("fk_nonebot_plugin_rikka_chuchart_song_id_nonebot_plugin_rikka_chusong"),
+        ),
+        sa.PrimaryKeyConstraint("song_id", "difficulty", name=op.f("pk_nonebot_plugin_rikka_chuchart")),
+        info={"bind_key": "nonebot_plugin_rikka"},
+    )
+    with op.batch_alter_table("nonebot_plugin_rikka_chuchart", schema=None) as batch_op:
+        batch_op.create_index("ix_nonebot_plugin_rikka_chuchart_level", ["level", "difficulty"], unique=False)
+        batch_op.create_index(
+            "ix_nonebot_plugin_rikka_chuchart_level_value", ["level_value", "difficulty"], unique=False
+        )
+
+    # ### end Alembic commands ###
+
+    _backfill("nonebot_plugin_rikka_maisong", mai_chart, _mai_chart_rows)
+    _backfill("nonebot_plugin_rikka_chusong", chu_chart, _chu_chart_rows)
+
+
+def downgrade(name: str = "") -> None:
+    if name:
+        return
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table("nonebot_plugin_rikka_chuchart", schema=None) as batch_op:
+        batch_op.drop_index("ix_nonebot_plugin_rikka_chuchart_level_value")
+        batch_op.drop_index("ix_nonebot_plugin_rikka_chuchart_level")
+
+    op.drop_table("nonebot_plugin_rikka_chuchart")
+    with op.batch_alter_table("nonebot_plugin_rikka_maichart", schema=None) as batch_op:
+        batch_op.drop_index("ix_nonebot_plugin_rikka_maichart_level_value")
+        batch_op.drop_index("ix_nonebot_plugin_rikka_maichart_level")
+
+    op.drop_table("nonebot_plugin_rikka_maichart")
+    # ### end Alembic commands ###
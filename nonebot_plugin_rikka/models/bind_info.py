@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+
+@dataclass(frozen=True)
+class UserBindRecord:
+    """用户绑定信息的不可变快照，字段与默认值和 `UserBindInfo` 表保持一致"""
+
+    user_id: str
+    """用户 ID"""
+    default_provider: Optional[Literal["lxns", "divingfish"]] = "lxns"
+    """默认查分器"""
+    mai_friend_code: Optional[str] = ""
+    """舞萌好友码"""
+    chu_friend_code: Optional[str] = ""
+    """中二节奏好友码"""
+    lxns_api_key: Optional[str] = ""
+    """落雪咖啡屋个人 API 密钥"""
+    diving_fish_import_token: Optional[str] = ""
+    """水鱼查分器导入密钥"""
+    diving_fish_username: Optional[str] = ""
+    """水鱼查分器用户名"""
+    maimaipy_identifier: Optional[str] = ""
+    """Maimai.py 鉴权凭证"""
@@ -10,16 +10,24 @@
 - [StartendInfinity/CometInfinity_Bot](https://github.com/StartendInfinity/CometInfinity_Bot)
 """
 
+from typing import TYPE_CHECKING, Any
+
+from . import maimai
 from .chunithm import DrawChuBest
-from .maimai import (
-    DrawBest,
-    DrawScores,
-    draw_music_info,
-    draw_player_rating_trend,
-    draw_player_strength_analysis,
-)
+from .maimai import DrawBest, DrawScores, draw_music_info
 from .utils import image_to_bytes
 
+if TYPE_CHECKING:
+    from .maimai import draw_player_rating_trend, draw_player_strength_analysis
+
+
+def __getattr__(name: str) -> Any:
+    # 依赖 matplotlib 的绘图函数由 painters.maimai 按需导入
+    if name in ("draw_player_rating_trend", "draw_player_strength_analysis"):
+        return getattr(maimai, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "DrawBest",
     "DrawScores",
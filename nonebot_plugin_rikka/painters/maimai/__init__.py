@@ -4,11 +4,31 @@
 参考自: - maimaidx_draw (https://github.com/Yuri-YuzuChaN/nonebot-plugin-maimaidx)
 """
 
-from .analysis import draw_player_strength_analysis
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from .b50 import DrawBest
 from .score import DrawScores
 from .song import draw_music_info
-from .trend import draw_player_rating_trend
+
+if TYPE_CHECKING:
+    from .analysis import draw_player_strength_analysis
+    from .trend import draw_player_rating_trend
+
+_LAZY_ATTRS = {
+    "draw_player_strength_analysis": ".analysis",
+    "draw_player_rating_trend": ".trend",
+}
+"""依赖 matplotlib 的绘图函数 -> 所在模块，首次访问时才导入"""
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRS[name], __name__), name)
+    globals()[name] = value
+    return value
+
 
 __all__ = [
     "DrawBest",
@@ -0,0 +1,76 @@
+"""
+matplotlib 字体配置
+
+扫描系统字体较慢，首次绘制图表时才选取可用的 CJK 字体，结果在进程内缓存
+"""
+
+from functools import lru_cache
+
+import matplotlib.font_manager as fm
+import matplotlib.pyplot as plt
+
+from ._config import FONT_DIR
+
+
+def _load_cjk_font_from_static() -> str | None:
+    """优先从 static 目录加载项目自带字体，保证容器与本地渲染一致。"""
+    static_candidates = [
+        "ShangguMonoSC-Regular.otf",
+        "ResourceHanRoundedCN-Bold.ttf",
+    ]
+    for filename in static_candidates:
+        font_path = FONT_DIR / filename
+        if not font_path.exists():
+            continue
+        try:
+            fm.fontManager.addfont(font_path)
+            return fm.FontProperties(fname=font_path).get_name()
+        except Exception:
+            continue
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_cjk_font() -> str:
+    """按优先级选取可用的 CJK 字体，兼容 Windows 和 Linux 容器环境。"""
+    static_font = _load_cjk_font_from_static()
+    if static_font:
+        return static_font
+
+    exact_candidates = [
+        "SimHei",  # Windows
+        "Noto Sans CJK SC",  # Debian/Ubuntu fonts-noto-cjk
+        "Noto Sans CJK JP",
+        "Noto Sans CJK TC",
+        "Noto Sans CJK KR",
+        "Noto Sans CJK",
+        "Noto Serif CJK SC",
+        "Noto Serif CJK JP",
+        "WenQuanYi Micro Hei",
+        "AR PL UMing CN",
+        "Noto Sans CJK",
+        "Noto Serif CJK",
+        "WenQuanYi",
+        "Source Han Sans",
+        "Source Han Serif",
+    ]
+
+    available = sorted({f.name for f in fm.fontManager.ttflist})
+
+    for font in exact_candidates:
+        if font in available:
+            return font
+
+    return "DejaVu Sans"  # 最终回退（无 CJK 字形，但不会崩溃）
+
+
+def use_cjk_font() -> str:
+    """将 CJK 字体设为 matplotlib 默认字体
+
+    :return: 字体名称
+    """
+    font = get_cjk_font()
+    plt.rcParams["font.sans-serif"] = [font]
+    plt.rcParams["font.family"] = [font]
+    plt.rcParams["axes.unicode_minus"] = False
+    return font
@@ -1,7 +1,6 @@
 import os
 from tempfile import TemporaryFile
 
-import matplotlib.font_manager as fm
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.gridspec import GridSpec
@@ -9,68 +8,12 @@ from PIL import Image
 
 from ...config import config
 from ...functions.analysis import PlayerStrength
-from ._config import FONT_DIR
-
-
-def _load_cjk_font_from_static() -> str | None:
-    """优先从 static 目录加载项目自带字体，保证容器与本地渲染一致。"""
-    static_candidates = [
-        "ShangguMonoSC-Regular.otf",
-        "ResourceHanRoundedCN-Bold.ttf",
-    ]
-    for filename in static_candidates:
-        font_path = FONT_DIR / filename
-        if not font_path.exists():
-            continue
-        try:
-            fm.fontManager.addfont(font_path)
-            return fm.FontProperties(fname=font_path).get_name()
-        except Exception:
-            continue
-    return None
-
-
-def _find_cjk_font() -> str:
-    """按优先级选取可用的 CJK 字体，兼容 Windows 和 Linux 容器环境。"""
-    static_font = _load_cjk_font_from_static()
-    if static_font:
-        return static_font
-
-    exact_candidates = [
-        "SimHei",  # Windows
-        "Noto Sans CJK SC",  # Debian/Ubuntu fonts-noto-cjk
-        "Noto Sans CJK JP",
-        "Noto Sans CJK TC",
-        "Noto Sans CJK KR",
-        "Noto Sans CJK",
-        "Noto Serif CJK SC",
-        "Noto Serif CJK JP",
-        "WenQuanYi Micro Hei",
-        "AR PL UMing CN",
-        "Noto Sans CJK",
-        "Noto Serif CJK",
-        "WenQuanYi",
-        "Source Han Sans",
-        "Source Han Serif",
-    ]
-
-    available = sorted({f.name for f in fm.fontManager.ttflist})
-
-    for font in exact_candidates:
-        if font in available:
-            return font
-
-    return "DejaVu Sans"  # 最终回退（无 CJK 字形，但不会崩溃）
-
-
-_DEFAULT_FONT = _find_cjk_font()
-_FONT_KWARGS = {"fontfamily": _DEFAULT_FONT}
-plt.rcParams["font.sans-serif"] = [_DEFAULT_FONT]
-plt.rcParams["font.family"] = [_DEFAULT_FONT]
-plt.rcParams["axes.unicode_minus"] = False
+from ._matplotlib import use_cjk_font
 
 
 def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
+    font = use_cjk_font()
+    font_kwargs = {"fontfamily": font}
     fig = plt.figure(figsize=(18, 8))
     # 中间的“难度标签统计”最多 3 项数据；若占满整行高度会显得 y 轴被过度拉伸。
     # 这里用 3x3 网格让中间条形图只占中间一格，左右雷达图占满整列高度。
@@ -86,7 +29,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
 
     # 子图1：配置标签统计（雷达图）
     ax1 = fig.add_subplot(gs[:, 0], polar=True)
-    ax1.set_title("配置标签统计", fontsize=16, fontweight="bold", color="#000000", family=_DEFAULT_FONT, y=1.10)
+    ax1.set_title("配置标签统计", fontsize=16, fontweight="bold", color="#000000", family=font, y=1.10)
     categories = list(data.patterns_strengths.keys())
     values = list(data.patterns_strengths.values())
     angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
@@ -95,7 +38,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
 
     ax1.plot(angles, values, "o-", color="#4ECDC4", linewidth=2, label="强度")
     ax1.fill(angles, values, color="#4ECDC4", alpha=0.25)
-    ax1.set_thetagrids(np.degrees(angles[:-1]), categories, fontsize=10, color="#444444", **_FONT_KWARGS)  # type: ignore  # noqa: E501
+    ax1.set_thetagrids(np.degrees(angles[:-1]), categories, fontsize=10, color="#444444", **font_kwargs)  # type: ignore  # noqa: E501
     ax1.set_ylim(0, max(values) * 1.1 if values else 1)
     ax1.grid(True, linestyle="--", alpha=0.3, color="#CCCCCC")
     ax1.spines["polar"].set_color("#88CCDD")
@@ -103,7 +46,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
 
     # 子图2：难度标签统计（水平条形图）
     ax2 = fig.add_subplot(gs[0, 1])
-    ax2.set_title("难度标签统计", fontsize=16, fontweight="bold", color="#000000", family=_DEFAULT_FONT)
+    ax2.set_title("难度标签统计", fontsize=16, fontweight="bold", color="#000000", family=font)
 
     # 按值降序显示：高值在上、低值在下
     difficulty_items = sorted(data.difficulty_strengths.items(), key=lambda kv: kv[1], reverse=False)
@@ -122,7 +65,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
         fontsize=12,
         color="#444444",
         ha="right",
-        fontdict={"family": _DEFAULT_FONT},
+        fontdict={"family": font},
     )
 
     # 让第一项（最大值）显示在最上方
@@ -159,7 +102,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
 
     # 子图3：评价标签统计（雷达图）
     ax3 = fig.add_subplot(gs[:, 2], polar=True)
-    ax3.set_title("评价标签统计", fontsize=16, fontweight="bold", color="#000000", family=_DEFAULT_FONT, y=1.10)
+    ax3.set_title("评价标签统计", fontsize=16, fontweight="bold", color="#000000", family=font, y=1.10)
     categories = list(data.song_evaluates.keys())
     values = list(data.song_evaluates.values())
     angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
@@ -168,7 +111,7 @@ def draw_player_strength_analysis(data: PlayerStrength) -> Image.Image:
 
     ax3.plot(angles, values, "o-", color="#4ECDC4", linewidth=2, label="强度")
     ax3.fill(angles, values, color="#4ECDC4", alpha=0.25)
-    ax3.set_thetagrids(np.degrees(angles[:-1]), categories, fontsize=10, color="#444444", **_FONT_KWARGS)  # type: ignore # noqa: E501
+    ax3.set_thetagrids(np.degrees(angles[:-1]), categories, fontsize=10, color="#444444", **font_kwargs)  # type: ignore # noqa: E501
     ax3.set_ylim(0, max(values) * 1.1 if values else 1)
     ax3.grid(True, linestyle="--", alpha=0.3, color="#CCCCCC")
     ax3.spines["polar"].set_color("#88CCDD")
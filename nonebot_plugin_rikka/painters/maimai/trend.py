@@ -10,10 +10,7 @@ from PIL import Image
 
 from ...config import config
 from ...score.maimai.providers.lxns import LXNSRatingTrend
-
-_DEFAULT_FONT = "SimHei"
-plt.rcParams["font.sans-serif"] = [_DEFAULT_FONT]
-plt.rcParams["axes.unicode_minus"] = False
+from ._matplotlib import use_cjk_font
 
 
 def _format_trend_date_labels(dates: Sequence[str]) -> Tuple[List[str], bool]:
@@ -63,6 +60,8 @@ def draw_player_rating_trend(
     :param show_standard_dx: 是否同时绘制 standard/dx 两条分量线
     """
 
+    font = use_cjk_font()
+
     # 按 date 排序
     sorted_trends = sorted(trends, key=lambda t: str(t.get("date", "")))
     dates = [t["date"] for t in sorted_trends]
@@ -107,7 +106,7 @@ def draw_player_rating_trend(
     fig.subplots_adjust(left=0.06, right=0.98, top=0.85, bottom=0.10)
 
     if title:
-        ax.set_title(title, fontsize=18, fontweight="bold", color="#000000", family=_DEFAULT_FONT, pad=14)
+        ax.set_title(title, fontsize=18, fontweight="bold", color="#000000", family=font, pad=14)
 
     # 颜色与现有 analysis 保持同一套主色
     c_total = "#4ECDC4"
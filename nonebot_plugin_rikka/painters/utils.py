@@ -5,6 +5,7 @@ from typing import Optional, Tuple, Union
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
 from ..score.maimai import PlayerMaiScore
+from ..tracing import span
 from .maimai._config import PIC_DIR
 
 
@@ -122,9 +123,10 @@ def image_to_bytes(img: Image.Image, format="PNG") -> bytes:
     :param format: 图片格式，默认为 PNG
     :return: 图片字节流
     """
-    output_buffer = BytesIO()
-    img.save(output_buffer, format)
-    return output_buffer.getvalue()
+    with span("encode", format=format):
+        output_buffer = BytesIO()
+        img.save(output_buffer, format)
+        return output_buffer.getvalue()
 
 
 def rounded_corners(
@@ -1,5 +1,6 @@
+import asyncio
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Any, Awaitable, Callable, Iterable, Literal, Optional
 
 from nonebot import logger
 from nonebot_plugin_orm import get_scoped_session
@@ -18,6 +19,7 @@ from .painters.maimai import draw_music_info as draw_mai_music_info
 from .painters.utils import image_to_bytes
 from .score.chunithm import PlayerChuBests, PlayerChuInfo, PlayerChuScore
 from .score.maimai import PlayerMaiB50, PlayerMaiInfo, PlayerMaiScore
+from .tracing import annotate
 from .updater.resources import (
     download_chu_icon,
     download_chu_jacket,
@@ -33,6 +35,30 @@ class ViewportDict(TypedDict):
     height: int
 
 
+_inflight_downloads: dict[str, asyncio.Future] = {}
+"""正在进行中的资源下载任务，用于合并并发的同一资源下载请求"""
+
+
+async def _download_once(key: str, download: Callable[[], Awaitable[Any]]) -> None:
+    """
+    下载资源，同一资源同时只会发起一次下载
+
+    后台预取与渲染流程可能同时请求同一资源，此时后来者会等待已有的下载任务完成
+
+    :param key: 资源唯一标识
+    :param download: 发起下载的函数
+    """
+    annotate(cache_hit=False)
+    future = _inflight_downloads.get(key)
+    if future is None:
+        future = asyncio.ensure_future(download())
+        _inflight_downloads[key] = future
+        future.add_done_callback(lambda _: _inflight_downloads.pop(key, None))
+
+    # 避免某个等待者被取消时连带取消共享的下载任务
+    await asyncio.shield(future)
+
+
 class MaiPicRenderer:
     def __init__(
         self,
@@ -77,7 +103,7 @@ class MaiPicRenderer:
         logger.warning(f"乐曲 {song_id} 的封面不存在!尝试从服务器下载...")
 
         try:
-            await download_mai_jacket(str(song_id))
+            await _download_once(f"mai/cover/{song_id}", lambda: download_mai_jacket(str(song_id)))
             return str(song_id)
         except Exception as e:
             logger.error(f"下载乐曲 {song_id} 封面失败: {e}")
@@ -95,7 +121,7 @@ class MaiPicRenderer:
             if not icon_path.exists():
                 logger.warning(f"头像资源 {icon_id} 不存在!尝试从服务器下载...")
                 try:
-                    await download_mai_icon(str(icon_id))
+                    await _download_once(f"mai/icon/{icon_id}", lambda: download_mai_icon(str(icon_id)))
                 except Exception as e:
                     logger.error(f"下载头像资源 {icon_id} 失败: {e}")
                     ok = False
@@ -106,7 +132,7 @@ class MaiPicRenderer:
             if not plate_path.exists():
                 logger.warning(f"姓名框资源 {plate_id} 不存在!尝试从服务器下载...")
                 try:
-                    await download_mai_plate(str(plate_id))
+                    await _download_once(f"mai/plate/{plate_id}", lambda: download_mai_plate(str(plate_id)))
                 except Exception as e:
                     logger.error(f"下载姓名框资源 {plate_id} 失败: {e}")
                     ok = False
@@ -124,6 +150,26 @@ class MaiPicRenderer:
 
         return ok
 
+    async def _ensure_covers(self, song_ids: Iterable[int]) -> None:
+        """
+        并发确保多个封面资源存在
+
+        :param song_ids: 乐曲 id 列表
+        """
+        await asyncio.gather(*(self._ensure_cover(song_id) for song_id in set(song_ids)))
+
+    async def prefetch_mai_profile(self, player_info: PlayerMaiInfo) -> None:
+        """预取玩家相关资源"""
+        await self._validate_profile_resources(player_info)
+
+    async def prefetch_mai_scores(self, scores: Iterable[PlayerMaiScore]) -> None:
+        """预取成绩列表中的封面资源"""
+        await self._ensure_covers(score.song_id for score in scores)
+
+    async def prefetch_mai_best50(self, player_best50: PlayerMaiB50) -> None:
+        """预取 Best50 中的封面资源"""
+        await self.prefetch_mai_scores(player_best50.standard + player_best50.dx)
+
     async def _get_song_level_value(
         self, song_id: int, song_type: Literal["standard", "dx", "utage"], difficulty: int
     ) -> float:
@@ -158,9 +204,10 @@ class MaiPicRenderer:
         渲染玩家 Best50 信息
         """
         # Ensure covers
-        for score in player_best50.standard + player_best50.dx:
-            await self._ensure_cover(score.song_id)
-            if calc_song_level_value:
+        await self.prefetch_mai_best50(player_best50)
+
+        if calc_song_level_value:
+            for score in player_best50.standard + player_best50.dx:
                 score.song_level_value = await self._get_song_level_value(
                     score.song_id, score.song_type.value, score.song_difficulty.value  # type: ignore
                 )
@@ -182,8 +229,9 @@ class MaiPicRenderer:
         await self._validate_profile_resources(player_info)
 
         # Ensure covers
+        await self.prefetch_mai_scores(scores)
+
         for score in scores:
-            await self._ensure_cover(score.song_id)
             score.song_level_value = await self._get_song_level_value(
                 score.song_id, score.song_type.value, score.song_difficulty.value  # type: ignore
             )
@@ -217,7 +265,7 @@ class ChuPicRenderer:
             return
         logger.warning(f"乐曲 {song_id} 封面不存在，尝试下载...")
         try:
-            await download_chu_jacket(str(song_id))
+            await _download_once(f"chu/cover/{song_id}", lambda: download_chu_jacket(str(song_id)))
         except Exception as e:
             logger.error(f"下载乐曲 {song_id} 封面失败: {e}")
 
@@ -229,7 +277,7 @@ class ChuPicRenderer:
             if not icon.exists():
                 logger.warning(f"角色图标 {character_id} 不存在，尝试下载...")
                 try:
-                    await download_chu_icon(str(character_id))
+                    await _download_once(f"chu/icon/{character_id}", lambda: download_chu_icon(str(character_id)))
                 except Exception as e:
                     logger.error(f"下载角色图标 {character_id} 失败: {e}")
         if player_info.name_plate_id:
@@ -238,10 +286,22 @@ class ChuPicRenderer:
             if not plate.exists():
                 logger.warning(f"名牌版 {plate_id} 不存在，尝试下载...")
                 try:
-                    await download_chu_plate(str(plate_id))
+                    await _download_once(f"chu/plate/{plate_id}", lambda: download_chu_plate(str(plate_id)))
                 except Exception as e:
                     logger.error(f"下载名牌版 {plate_id} 失败: {e}")
 
+    async def prefetch_chu_profile(self, player_info: PlayerChuInfo) -> None:
+        """预取玩家相关资源"""
+        await self._validate_player_resources(player_info)
+
+    async def prefetch_chu_scores(self, scores: Iterable[PlayerChuScore]) -> None:
+        """并发预取成绩列表中的封面资源"""
+        await asyncio.gather(*(self._ensure_cover(song_id) for song_id in {score.song_id for score in scores}))
+
+    async def prefetch_chu_bests(self, bests: PlayerChuBests) -> None:
+        """预取 Best 30 + Selection 10 + New 20 中的封面资源"""
+        await self.prefetch_chu_scores(bests.bests + bests.selections + bests.new_bests)
+
     async def render_chu_bests(self, player_info: PlayerChuInfo, bests: PlayerChuBests) -> bytes:
         """
         渲染中二节奏 Best 30 + Selection 10 + New 20
@@ -251,8 +311,7 @@ class ChuPicRenderer:
         :return: PNG 图片字节流
         """
         # 确保封面资源
-        for score in bests.bests + bests.selections + bests.new_bests:
-            await self._ensure_cover(score.song_id)
+        await self.prefetch_chu_bests(bests)
 
         # 确保玩家资源
         await self._validate_player_resources(player_info)
@@ -270,8 +329,7 @@ class ChuPicRenderer:
         await self._validate_player_resources(player_info)
 
         # Ensure covers
-        for score in scores:
-            await self._ensure_cover(score.song_id)
+        await self.prefetch_chu_scores(scores)
 
         img = self.drawer_score.draw_scorelist(player_info, scores, title or "Player Scores")
         return image_to_bytes(img)
@@ -31,6 +31,7 @@ from .maimai import (
     get_lxns_provider,
     get_maimaipy_provider,
 )
+from .score_set import ChuScoreSet, MaiScoreSet, ScoreSet
 
 __all__ = [
     # 舞萌DX
@@ -52,4 +53,8 @@ __all__ = [
     "PlayerChuInfo",
     "PlayerChuBests",
     "PlayerChuScore",
+    # 成绩集合
+    "ScoreSet",
+    "MaiScoreSet",
+    "ChuScoreSet",
 ]
@@ -69,7 +69,7 @@ class ChuRankType(str, Enum):
     D = "d"
 
 
-@dataclass
+@dataclass(slots=True)
 class PlayerChuScore:
     """中二节奏游玩成绩"""
 
@@ -6,13 +6,14 @@ API 文档: https://maimai.lxns.net/api/doc
 
 from __future__ import annotations
 
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from typing import Any, Optional, TypedDict
 
 from async_lru import alru_cache
 from nonebot import logger
 
 from ....config import config
+from ...decoder import ScoreDecoder, Src, json_loads
 from .._schema import (
     ChuClearType,
     ChuDifficulty,
@@ -26,6 +27,19 @@ from .._schema import (
     PlayerChuScore,
 )
 
+# API 返回 id/level，schema 字段为 song_id/song_level
+_SCORE_DECODER = ScoreDecoder(
+    PlayerChuScore,
+    song_id=Src("id", default=None),
+    song_name=Src("song_name", fallback="title", default=""),
+    song_level=Src("level", default=""),
+    song_difficulty=Src("level_index", ChuDifficulty),
+    clear=Src("clear", ChuClearType, default=None),
+    full_combo=Src("full_combo", ChuFullComboType, default=None),
+    full_chain=Src("full_chain", ChuFullChainType, default=None),
+    rank=Src("rank", ChuRankType, default=None),
+)
+
 
 class LXNSChuBestsResponse(TypedDict):
     bests: list[dict]
@@ -85,7 +99,7 @@ class LXNSChuScoreProvider:
         try:
             async with session.get(url, headers=headers) as resp:
                 resp.raise_for_status()
-                return await resp.json()
+                return await resp.json(loads=json_loads)
         except ClientResponseError as e:
             if e.status in (401, 403):
                 raise PermissionError(f"鉴权失败: {e.status} {url}") from e
@@ -105,7 +119,7 @@ class LXNSChuScoreProvider:
         try:
             async with session.get(url, headers=headers) as resp:
                 resp.raise_for_status()
-                return await resp.json()
+                return await resp.json(loads=json_loads)
         except ClientResponseError as e:
             if e.status in (401, 403):
                 raise PermissionError(f"鉴权失败: {e.status} {url}") from e
@@ -118,23 +132,12 @@ class LXNSChuScoreProvider:
     @staticmethod
     def _score_unpack(raw_score: dict) -> PlayerChuScore:
         """将 API 返回的原始成绩数据解包为 PlayerChuScore。"""
-        raw_score = raw_score.copy()
-
-        raw_score["song_difficulty"] = ChuDifficulty(raw_score["level_index"])
-        raw_score["clear"] = ChuClearType(raw_score["clear"]) if raw_score.get("clear") else None
-        raw_score["full_combo"] = ChuFullComboType(raw_score["full_combo"]) if raw_score.get("full_combo") else None
-        raw_score["full_chain"] = ChuFullChainType(raw_score["full_chain"]) if raw_score.get("full_chain") else None
-        raw_score["rank"] = ChuRankType(raw_score["rank"]) if raw_score.get("rank") else None
+        return _SCORE_DECODER.decode(raw_score)
 
-        # API 返回 id/level，schema 字段为 song_id/song_level
-        raw_score["song_id"] = raw_score.get("id")
-        raw_score["song_name"] = raw_score.get("song_name", raw_score.get("title", ""))
-        raw_score["song_level"] = raw_score.get("level", "")
-
-        valid_keys = {f.name for f in fields(PlayerChuScore)}
-        filtered = {k: v for k, v in raw_score.items() if k in valid_keys}
-
-        return PlayerChuScore(**filtered)
+    @staticmethod
+    def _scores_unpack(raw_scores: list[dict]) -> list[PlayerChuScore]:
+        """批量解包成绩数据。"""
+        return _SCORE_DECODER.decode_many(raw_scores)
 
     @staticmethod
     def _info_unpack(raw_info: dict) -> PlayerChuInfo:
@@ -252,9 +255,9 @@ class LXNSChuScoreProvider:
         response = await self._get_resp(endpoint, self._developer_api_key)
         data: LXNSChuBestsResponse = response.get("data", response)
 
-        bests = [self._score_unpack(s) for s in data.get("bests", [])]
-        selections = [self._score_unpack(s) for s in data.get("selections", [])]
-        new_bests = [self._score_unpack(s) for s in data.get("new_bests", [])]
+        bests = self._scores_unpack(data.get("bests", []))
+        selections = self._scores_unpack(data.get("selections", []))
+        new_bests = self._scores_unpack(data.get("new_bests", []))
 
         return PlayerChuBests(bests=bests, selections=selections, new_bests=new_bests)
 
@@ -266,7 +269,7 @@ class LXNSChuScoreProvider:
         response = await self._get_resp(endpoint, self._developer_api_key)
         data: list[dict] = response.get("data", response)
 
-        return [self._score_unpack(s) for s in data]
+        return self._scores_unpack(data)
 
     @alru_cache(1024, ttl=60)
     async def fetch_player_scores(self, params: LXNSChuParams, use_user_api: bool = True) -> list[PlayerChuScore]:
@@ -288,7 +291,7 @@ class LXNSChuScoreProvider:
 
         data: list[dict] = response.get("data", response)
 
-        return [self._score_unpack(s) for s in data]
+        return self._scores_unpack(data)
 
     async def fetch_player_trend(self, params: LXNSChuParams, version: Optional[int] = None) -> list[ChuRatingTrend]:
         """获取玩家 Rating 趋势。"""
@@ -0,0 +1,144 @@
+"""
+查分器成绩数据解码器
+
+根据字段描述为每种成绩结构生成一次专用的解码函数，
+将原始 JSON 字段直接映射为 dataclass 构造参数，避免逐条成绩重复计算字段集合、复制字典和调用 Enum 构造
+"""
+
+import json
+from dataclasses import MISSING, dataclass, fields
+from enum import Enum
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar, Union
+
+try:
+    import orjson
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        """解析 JSON 数据，已安装 orjson 时使用 orjson"""
+        return orjson.loads(data)
+
+except ImportError:  # pragma: no cover
+
+    def json_loads(data: Union[str, bytes]) -> Any:
+        """解析 JSON 数据，已安装 orjson 时使用 orjson"""
+        return json.loads(data)
+
+
+T = TypeVar("T")
+
+_REQUIRED: Any = object()
+
+
+@dataclass(frozen=True)
+class Src:
+    """原始数据字段描述"""
+
+    key: str
+    """原始数据中的字段名"""
+    convert: Optional[Any] = None
+    """值转换器，可以是 Enum 类或可调用对象；可选字段仅在值为真时转换，否则为 None"""
+    default: Any = _REQUIRED
+    """字段缺失时的默认值，未设置时表示原始数据中必须存在该字段"""
+    fallback: Optional[str] = None
+    """字段缺失时尝试读取的备用字段名"""
+
+
+@dataclass(frozen=True)
+class Const:
+    """固定值字段"""
+
+    value: Any
+
+
+class _EnumLookup(dict):
+    """Enum 值查找表，未命中时回退到 Enum 构造以保留原有的 ValueError"""
+
+    def __init__(self, enum_cls: type[Enum]) -> None:
+        super().__init__({member.value: member for member in enum_cls})
+        self.enum_cls = enum_cls
+
+    def __missing__(self, value: Any) -> Enum:
+        return self.enum_cls(value)
+
+
+class ScoreDecoder(Generic[T]):
+    """
+    预编译的成绩解码器
+
+    未在字段描述中出现的 dataclass 字段按同名字段读取：无默认值的字段必须存在，
+    有默认值的字段缺失时使用 dataclass 默认值，使用 `default_factory` 的字段不做处理
+    """
+
+    def __init__(self, target: type[T], **spec: Union[str, Src, Const]) -> None:
+        """
+        :param target: 目标 dataclass
+        :param spec: 目标字段名到原始字段描述的映射，字符串等价于 `Src(key)`
+        """
+        self.target = target
+
+        namespace: dict[str, Any] = {"_cls": target}
+        args: list[str] = []
+
+        for index, f in enumerate(fields(target)):  # type: ignore[arg-type]
+            src = spec.pop(f.name, None)
+            if src is None:
+                if f.default_factory is not MISSING:
+                    continue
+                src = Src(f.name) if f.default is MISSING else Src(f.name, default=f.default)
+            elif isinstance(src, str):
+                src = Src(src)
+
+            args.append(f"{f.name}={self._compile_field(index, src, namespace)}")
+
+        if spec:
+            raise ValueError(f"{target.__name__} 中不存在字段: {', '.join(spec)}")
+
+        call = f"_cls({', '.join(args)})"
+        source = (
+            "def decode(raw):\n"
+            f"    return {call}\n"
+            "\n"
+            "def decode_many(raws):\n"
+            f"    return [{call} for raw in raws]\n"
+        )
+        exec(source, namespace)
+
+        self.source = source
+        """生成的解码函数源码，便于调试"""
+        self.decode: Callable[[dict], T] = namespace["decode"]
+        """解码单条成绩"""
+        self.decode_many: Callable[[Iterable[dict]], list[T]] = namespace["decode_many"]
+        """批量解码成绩，循环在生成的函数内部完成"""
+
+    @staticmethod
+    def _compile_field(index: int, src: Union[Src, Const], namespace: dict[str, Any]) -> str:
+        """生成单个字段的取值表达式"""
+        if isinstance(src, Const):
+            namespace[f"_k{index}"] = src.value
+            return f"_k{index}"
+
+        required = src.default is _REQUIRED
+        if not required:
+            namespace[f"_d{index}"] = src.default
+
+        if src.fallback is not None:
+            default = "None" if required else f"_d{index}"
+            getter = f"raw.get({src.key!r}, raw.get({src.fallback!r}, {default}))"
+        elif required:
+            getter = f"raw[{src.key!r}]"
+        else:
+            getter = f"raw.get({src.key!r}, _d{index})"
+
+        if src.convert is None:
+            return getter
+
+        if isinstance(src.convert, type) and issubclass(src.convert, Enum):
+            namespace[f"_c{index}"] = _EnumLookup(src.convert)
+            converted = f"_c{index}[{{value}}]"
+        else:
+            namespace[f"_c{index}"] = src.convert
+            converted = f"_c{index}({{value}})"
+
+        if required:
+            return converted.format(value=getter)
+        return f"({converted.format(value=f'_v{index}')} if (_v{index} := {getter}) else None)"
@@ -3,6 +3,7 @@ from typing import Any, ClassVar, Generic, Optional, Type, TypeVar
 
 from aiohttp import ClientResponseError, ClientSession, ClientTimeout
 
+from ..decoder import json_loads
 from ._schema import PlayerMaiB50, PlayerMaiInfo
 
 P = TypeVar("P")
@@ -38,7 +39,7 @@ class BaseScoreProvider(ABC, Generic[P]):
         try:
             async with session.get(url, headers=headers) as resp:
                 resp.raise_for_status()
-                return await resp.json()
+                return await resp.json(loads=json_loads)
         except ClientResponseError as e:
             # 轻量异常映射：给调用方更清晰的语义（保留最小化改动）
             if e.status in (401, 403):
@@ -57,7 +58,7 @@ class BaseScoreProvider(ABC, Generic[P]):
         try:
             async with session.post(url, headers=headers, json=params) as resp:
                 resp.raise_for_status()
-                return await resp.json()
+                return await resp.json(loads=json_loads)
         except ClientResponseError as e:
             if e.status in (401, 403):
                 raise PermissionError(f"鉴权失败: {e.status} {url}") from e
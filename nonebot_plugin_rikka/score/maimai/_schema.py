@@ -103,7 +103,7 @@ class SongType(str, Enum):
     """宴会场谱面"""
 
 
-@dataclass
+@dataclass(slots=True)
 class PlayerMaiScore:
     song_id: int
     """乐曲 ID"""
@@ -0,0 +1,70 @@
+"""
+成绩版本划分
+
+批量解析成绩对应的曲目版本，将成绩划分为旧版本 (B35) 与当前版本 (B15) 并分别选出前若干条
+已知谱面版本的调用方可以传入逐条判断的函数，此时不再查询曲目版本
+"""
+
+from typing import Callable, Iterable, Optional, TypeVar
+
+from nonebot_plugin_orm import async_scoped_session
+
+from ...constants import MAI_VERSION_MAP
+from ...database import MaiSongORM
+from .rating import select_best_indices
+
+T = TypeVar("T")
+
+
+async def split_best_by_version(
+    session: async_scoped_session,
+    items: Iterable[T],
+    song_id: Callable[[T], int],
+    key: Callable[[T], float],
+    old_limit: int = 35,
+    new_limit: int = 15,
+    is_current_version: Optional[Callable[[T], Optional[bool]]] = None,
+) -> tuple[list[T], list[T]]:
+    """
+    按曲目版本划分成绩并分别取前若干条
+
+    所有曲目 ID 通过 `MaiSongORM.get_songs_info_by_ids` 一次性解析，Top-K 由 `select_best_indices` 完成，结果与
+    `sorted(..., key=key, reverse=True)[:limit]` 一致
+
+    :param items: 成绩列表，可以是原始成绩字典或成绩 dataclass
+    :param song_id: 获取成绩对应曲目 ID (不含 DX 谱面的 10000 偏移) 的函数
+    :param key: 排序依据
+    :param old_limit: 旧版本成绩数量
+    :param new_limit: 当前版本成绩数量
+    :param is_current_version: 判断成绩是否属于当前版本的函数，返回 None 表示版本未知；为空时按曲目版本判断
+    :return: (旧版本成绩, 当前版本成绩)
+    """
+    items = list(items)
+    if not items:
+        return [], []
+
+    if is_current_version is None:
+        current_version = max(MAI_VERSION_MAP)
+        songs = await MaiSongORM.get_songs_info_by_ids(session, [song_id(item) for item in items])
+        song_versions = {song.id: song.version // 100 for song in songs}
+
+        def by_song_version(item: T) -> Optional[bool]:
+            version = song_versions.get(song_id(item))
+            return None if version is None else version == current_version
+
+        is_current_version = by_song_version
+
+    known_items: list[T] = []
+    current_flags: list[bool] = []
+    for item in items:
+        is_current = is_current_version(item)
+        if is_current is None:
+            continue
+        known_items.append(item)
+        current_flags.append(is_current)
+
+    old_indices, new_indices = select_best_indices(
+        [key(item) for item in known_items], current_flags, old_limit=old_limit, new_limit=new_limit
+    )
+
+    return [known_items[i] for i in old_indices.tolist()], [known_items[i] for i in new_indices.tolist()]
@@ -1,11 +1,10 @@
-from dataclasses import dataclass, fields
+from dataclasses import dataclass
 from typing import Optional, TypedDict
 
 from nonebot import logger
 from nonebot_plugin_orm import get_scoped_session
 
-from ....constants import MAI_VERSION_MAP
-from ....database import MaiSongORM
+from ...decoder import Const, ScoreDecoder, Src
 from .._base import BaseScoreProvider
 from .._schema import (
     PlayerMaiB50,
@@ -17,6 +16,26 @@ from .._schema import (
     SongDifficulty,
     SongType,
 )
+from .._version import split_best_by_version
+
+
+def _convert_song_type(raw_type: str) -> SongType:
+    return SongType.STANDARD if raw_type == "SD" else SongType.DX
+
+
+_SCORE_DECODER = ScoreDecoder(
+    PlayerMaiScore,
+    song_name="title",
+    song_type=Src("type", _convert_song_type),
+    song_level="level",
+    song_difficulty=Src("level_index", SongDifficulty),
+    dx_score="dxScore",
+    dx_star=Const(0),  # unsupported.
+    dx_rating="ra",
+    rate=Src("rate", ScoreRateType),
+    fc=Src("fc", ScoreFCType, default=None),
+    fs=Src("fs", ScoreFSType, default=None),
+)
 
 
 class DivingFishCharts(TypedDict):
@@ -70,21 +89,11 @@ class DivingFishScoreProvider(BaseScoreProvider[DivingFishParams]):
 
     @staticmethod
     def _score_unpack(raw_score: dict) -> PlayerMaiScore:
-        raw_score["song_difficulty"] = SongDifficulty(raw_score["level_index"])
-        raw_score["fc"] = ScoreFCType(raw_score["fc"]) if raw_score.get("fc") else None
-        raw_score["fs"] = ScoreFSType(raw_score["fs"]) if raw_score.get("fs") else None
-        raw_score["rate"] = ScoreRateType(raw_score["rate"])
-        raw_score["song_type"] = SongType("standard" if raw_score["type"] == "SD" else "dx")
-
-        valid_keys = {f.name for f in fields(PlayerMaiScore)}
-        filtered = {k: v for k, v in raw_score.items() if k in valid_keys}
-        filtered["song_name"] = raw_score["title"]
-        filtered["song_level"] = raw_score["level"]
-        filtered["dx_score"] = raw_score["dxScore"]
-        filtered["dx_rating"] = raw_score["ra"]
-        filtered["dx_star"] = 0  # unsupported.
-
-        return PlayerMaiScore(**filtered)
+        return _SCORE_DECODER.decode(raw_score)
+
+    @staticmethod
+    def _scores_unpack(raw_scores: list[dict]) -> list[PlayerMaiScore]:
+        return _SCORE_DECODER.decode_many(raw_scores)
 
     async def fetch_player_info(self, params: DivingFishParams) -> PlayerMaiInfo:
         """
@@ -117,16 +126,8 @@ class DivingFishScoreProvider(BaseScoreProvider[DivingFishParams]):
 
         data: DivingFishBest50Response = await self._post_resp(endpoint, req_params)
 
-        standard_scores = []
-        dx_scores = []
-
-        for raw_score in data["charts"]["sd"]:
-            score = self._score_unpack(raw_score)
-            standard_scores.append(score)
-
-        for raw_score in data["charts"]["dx"]:
-            score = self._score_unpack(raw_score)
-            dx_scores.append(score)
+        standard_scores = self._scores_unpack(data["charts"]["sd"])
+        dx_scores = self._scores_unpack(data["charts"]["dx"])
 
         b50 = PlayerMaiB50(standard=standard_scores, dx=dx_scores)
         return b50
@@ -150,8 +151,6 @@ class DivingFishScoreProvider(BaseScoreProvider[DivingFishParams]):
         if params.import_token is None:
             raise ValueError("必须提供 import_token")
 
-        _CURRENT_VERSION = list(MAI_VERSION_MAP.keys())[-1]
-
         logger.debug("通过水鱼查分器间接查询 AP 50...")
         logger.debug("1/2 获取完整游玩记录")
 
@@ -161,25 +160,15 @@ class DivingFishScoreProvider(BaseScoreProvider[DivingFishParams]):
 
         logger.debug("2/2 划分版本信息")
 
-        session = get_scoped_session()
-        old_version_records = []
-        current_vesion_records = []
-
-        for record in ap_records:
-            song_id = record["song_id"] if record["type"].lower() != "dx" else record["song_id"] - 10000
-            song = await MaiSongORM.get_song_info(session, song_id)
-            is_current_version = song.version // 100 == _CURRENT_VERSION
-
-            if is_current_version:
-                current_vesion_records.append(record)
-            else:
-                old_version_records.append(record)
-
-        old_version_records.sort(key=lambda x: x["ra"], reverse=True)
-        current_vesion_records.sort(key=lambda x: x["ra"], reverse=True)
+        old_version_records, current_version_records = await split_best_by_version(
+            get_scoped_session(),
+            ap_records,
+            song_id=lambda r: r["song_id"] if r["type"].lower() != "dx" else r["song_id"] - 10000,
+            key=lambda r: r["ra"],
+        )
 
-        standard_scores = [self._score_unpack(record) for record in old_version_records[:35]]
-        dx_scores = [self._score_unpack(record) for record in current_vesion_records[:15]]
+        standard_scores = self._scores_unpack(old_version_records)
+        dx_scores = self._scores_unpack(current_version_records)
 
         ap50 = PlayerMaiB50(standard=standard_scores, dx=dx_scores)
         return ap50
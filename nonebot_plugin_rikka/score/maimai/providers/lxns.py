@@ -2,6 +2,7 @@ from dataclasses import dataclass, fields
 from typing import Any, Optional, TypedDict
 
 from ....config import config
+from ...decoder import ScoreDecoder, Src, json_loads
 from .._base import BaseScoreProvider
 from .._schema import (
     PlayerMaiB50,
@@ -17,6 +18,19 @@ from .._schema import (
     TrophyColor,
 )
 
+_SCORE_DECODER = ScoreDecoder(
+    PlayerMaiScore,
+    song_id="id",
+    song_type=Src("type", SongType),
+    song_level="level",
+    song_difficulty=Src("level_index", SongDifficulty),
+    rate=Src("rate", ScoreRateType),
+    fc=Src("fc", ScoreFCType, default=None),
+    fs=Src("fs", ScoreFSType, default=None),
+)
+
+_PLAYER_INFO_FIELDS = frozenset(f.name for f in fields(PlayerMaiInfo))
+
 
 class LXNSBest50Response(TypedDict):
     standard_total: int
@@ -55,23 +69,15 @@ class LXNSScoreProvider(BaseScoreProvider[LXNSParams]):
         url = f"{self.user_base_url.rstrip('/')}/{endpoint.lstrip('/')}"
         async with session.get(url, headers=headers) as resp:
             resp.raise_for_status()
-            return await resp.json()
+            return await resp.json(loads=json_loads)
 
     @staticmethod
     def _score_unpack(raw_score: dict) -> PlayerMaiScore:
-        raw_score["song_difficulty"] = SongDifficulty(raw_score["level_index"])
-        raw_score["fc"] = ScoreFCType(raw_score["fc"]) if raw_score.get("fc") else None
-        raw_score["fs"] = ScoreFSType(raw_score["fs"]) if raw_score.get("fs") else None
-        raw_score["rate"] = ScoreRateType(raw_score["rate"])
-        raw_score["type"] = SongType(raw_score["type"])
-
-        valid_keys = {f.name for f in fields(PlayerMaiScore)}
-        filtered = {k: v for k, v in raw_score.items() if k in valid_keys}
-        filtered["song_id"] = raw_score["id"]
-        filtered["song_type"] = raw_score["type"]
-        filtered["song_level"] = raw_score["level"]
+        return _SCORE_DECODER.decode(raw_score)
 
-        return PlayerMaiScore(**filtered)
+    @staticmethod
+    def _scores_unpack(raw_scores: list[dict]) -> list[PlayerMaiScore]:
+        return _SCORE_DECODER.decode_many(raw_scores)
 
     @staticmethod
     def _info_unpack(raw_info: dict) -> PlayerMaiInfo:
@@ -92,8 +98,7 @@ class LXNSScoreProvider(BaseScoreProvider[LXNSParams]):
         if frame:
             unpacked_info["frame"] = PlayerMaiCollection(**raw_info["frame"])
 
-        valid_keys = {f.name for f in fields(PlayerMaiInfo)}
-        filtered = {k: v for k, v in unpacked_info.items() if k in valid_keys}
+        filtered = {k: v for k, v in unpacked_info.items() if k in _PLAYER_INFO_FIELDS}
 
         return PlayerMaiInfo(**filtered)
 
@@ -147,16 +152,8 @@ class LXNSScoreProvider(BaseScoreProvider[LXNSParams]):
         response = await self._get_resp(endpoint, self._developer_api_key)
         data: LXNSBest50Response = response.get("data", response)
 
-        standard_scores = []
-        dx_scores = []
-
-        for raw_score in data["standard"]:
-            score = self._score_unpack(raw_score)
-            standard_scores.append(score)
-
-        for raw_score in data["dx"]:
-            score = self._score_unpack(raw_score)
-            dx_scores.append(score)
+        standard_scores = self._scores_unpack(data["standard"])
+        dx_scores = self._scores_unpack(data["dx"])
 
         b50 = PlayerMaiB50(
             standard=standard_scores,
@@ -174,16 +171,8 @@ class LXNSScoreProvider(BaseScoreProvider[LXNSParams]):
         response = await self._get_resp(endpoint, self._developer_api_key)
         data: LXNSBest50Response = response.get("data", response)
 
-        standard_scores = []
-        dx_scores = []
-
-        for raw_score in data["standard"]:
-            score = self._score_unpack(raw_score)
-            standard_scores.append(score)
-
-        for raw_score in data["dx"]:
-            score = self._score_unpack(raw_score)
-            dx_scores.append(score)
+        standard_scores = self._scores_unpack(data["standard"])
+        dx_scores = self._scores_unpack(data["dx"])
 
         ap50 = PlayerMaiB50(
             standard=standard_scores,
@@ -200,13 +189,7 @@ class LXNSScoreProvider(BaseScoreProvider[LXNSParams]):
         response = await self._get_resp(endpoint, self._developer_api_key)
         data: list[dict] = response.get("data", response)
 
-        scores = []
-
-        for raw_score in data:
-            score = self._score_unpack(raw_score)
-            scores.append(score)
-
-        return scores
+        return self._scores_unpack(data)
 
     async def fetch_player_trend(self, friend_code: str) -> list[LXNSRatingTrend]:
         """
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from decimal import ROUND_DOWN, Decimal
-from typing import Literal, Optional, TypeAlias, TypeVar, cast
+from functools import lru_cache
+from typing import Callable, Literal, Optional, TypeAlias, TypeVar, cast
 
 from async_lru import alru_cache
 from httpcore import NetworkError
@@ -27,7 +28,8 @@ from nonebot_plugin_alconna import At, UniMessage
 from nonebot_plugin_orm import async_scoped_session, get_scoped_session
 
 from ....config import config
-from ....database import MaiPlayCountORM, UserBindInfo, UserBindInfoORM
+from ....database import MaiPlayCountORM, UserBindInfoORM
+from ....models.bind_info import UserBindRecord
 from .._base import BaseScoreProvider
 from .._schema import (
     PlayerMaiB50,
@@ -39,14 +41,31 @@ from .._schema import (
     SongDifficulty,
     SongType,
 )
+from .._version import split_best_by_version
 
 _SUPPORT_PROVIDER: TypeAlias = DivingFishProvider | LXNSProvider | ArcadeProvider
 S = TypeVar("S", bound=list[PlayerMaiScore] | PlayerMaiB50)
 
-maimai_client = MaimaiClient()
-_divingfish_provider = DivingFishProvider(developer_token=config.divingfish_developer_api_key)
-_lxns_provider = LXNSProvider(developer_token=config.lxns_developer_api_key)
-_arcade_provider = ArcadeProvider(http_proxy=config.arcade_provider_http_proxy)
+
+# maimai_py 的客户端与查分器在构造时会初始化 HTTP 客户端与缓存，首次使用时才创建
+@lru_cache(maxsize=1)
+def get_maimai_client() -> MaimaiClient:
+    return MaimaiClient()
+
+
+@lru_cache(maxsize=1)
+def _get_divingfish_provider() -> DivingFishProvider:
+    return DivingFishProvider(developer_token=config.divingfish_developer_api_key)
+
+
+@lru_cache(maxsize=1)
+def _get_lxns_provider() -> LXNSProvider:
+    return LXNSProvider(developer_token=config.lxns_developer_api_key)
+
+
+@lru_cache(maxsize=1)
+def _get_arcade_provider() -> ArcadeProvider:
+    return ArcadeProvider(http_proxy=config.arcade_provider_http_proxy)
 
 
 @dataclass
@@ -134,26 +153,26 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         bind_info = await UserBindInfoORM.get_user_bind_info(session, user_id)
 
         if config.lxns_developer_api_key and not config.divingfish_developer_api_key:
-            return _lxns_provider
+            return _get_lxns_provider()
         if config.divingfish_developer_api_key and not config.lxns_developer_api_key:
-            return _divingfish_provider
+            return _get_divingfish_provider()
 
         if not bind_info:
-            return _lxns_provider
+            return _get_lxns_provider()
 
         if bind_info.default_provider is None:
             if bind_info.diving_fish_import_token:
-                return _divingfish_provider
+                return _get_divingfish_provider()
             else:
-                return _lxns_provider
+                return _get_lxns_provider()
 
         if bind_info.default_provider == "lxns":
-            return _lxns_provider
+            return _get_lxns_provider()
 
         elif bind_info.default_provider == "divingfish":
-            return _divingfish_provider
+            return _get_divingfish_provider()
 
-        return _lxns_provider
+        return _get_lxns_provider()
 
     @staticmethod
     async def auto_get_player_identifier(
@@ -184,7 +203,7 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
                 logger.debug(f"[{user_id}] 尝试通过 QQ 请求玩家数据")
                 try:
                     identifier = PlayerIdentifier(qq=int(user_id))
-                    player_obj = await score_provider.get_player(identifier, client=maimai_client)
+                    player_obj = await score_provider.get_player(identifier, client=get_maimai_client())
                     new_player_friend_code = player_obj.friend_code
                 except (HTTPStatusError, InvalidPlayerIdentifierError) as e:
                     if isinstance(e, HTTPStatusError) and e.response.status_code == 404:
@@ -228,7 +247,7 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         # elif isinstance(score_provider, DivingFishScoreProvider):
         else:
             # When score_provider is DivingFish, user_bind_info and diving_fish_username is not None.
-            user_bind_info = cast(UserBindInfo, user_bind_info)
+            user_bind_info = cast(UserBindRecord, user_bind_info)
             diving_fish_username = user_bind_info.diving_fish_username
             assert diving_fish_username
             identifier = PlayerIdentifier(
@@ -239,15 +258,23 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
 
     @alru_cache(maxsize=128, ttl=10 * 60)
     async def _fetch_maimai_scores(self, params: MaimaiPyParams) -> MaimaiScores:
-        return await maimai_client.scores(params.identifier, params.score_provider)
+        return await get_maimai_client().scores(params.identifier, params.score_provider)
+
+    async def fetch_player_scores_snapshot(self, params: MaimaiPyParams) -> MaimaiScores:
+        """
+        获取玩家全部成绩的快照
+
+        缓存有效期内返回同一对象，成绩重新获取后为新的对象，可按对象身份作为成绩相关结果的缓存键
+        """
+        return await self._fetch_maimai_scores(params)
 
     async def fetch_player_info(self, params: MaimaiPyParams) -> PlayerMaiInfo:
-        player_info = await maimai_client.players(params.identifier, params.score_provider)
+        player_info = await get_maimai_client().players(params.identifier, params.score_provider)
 
         return self._unpack_player_mai_info(player_info)
 
     async def fetch_player_b50(self, params: MaimaiPyParams) -> PlayerMaiB50:
-        player_b50 = await maimai_client.bests(params.identifier, params.score_provider)
+        player_b50 = await get_maimai_client().bests(params.identifier, params.score_provider)
 
         best35 = [self._score_unpack(score) for score in player_b50.scores_b35]
         best15 = [self._score_unpack(score) for score in player_b50.scores_b15]
@@ -268,12 +295,34 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
 
         logger.debug("2/2 划分版本信息")
 
-        ap50 = await MaimaiScores(maimai_client).configure(ap_records, b50_only=True)
+        best35, best15 = await split_best_by_version(
+            get_scoped_session(),
+            [score for score in ap_records if score.type != MaimaiPySongType.UTAGE],
+            song_id=lambda s: s.id,
+            key=lambda s: s.dx_rating or 0,
+            is_current_version=await self._get_chart_version_checker(),
+        )
+
+        return await self.fetch_player_play_counts(
+            PlayerMaiB50(
+                [self._score_unpack(score) for score in best35], [self._score_unpack(score) for score in best15]
+            )
+        )
+
+    @staticmethod
+    async def _get_chart_version_checker() -> Callable[[ScoreExtend], Optional[bool]]:
+        """
+        获取按谱面版本判断成绩是否属于当前版本的函数
 
-        best35 = [self._score_unpack(score) for score in ap50.scores_b35]
-        best15 = [self._score_unpack(score) for score in ap50.scores_b15]
+        同一曲目的不同谱面可能在不同版本加入，因此使用 maimai.py 曲目缓存中逐谱面记录的版本，版本未知时返回 None
+        """
+        chart_versions: dict[str, int] = await get_maimai_client()._cache.get("versions", namespace="songs") or {}
 
-        return await self.fetch_player_play_counts(PlayerMaiB50(best35, best15))
+        def is_current_version(score: ScoreExtend) -> Optional[bool]:
+            version = chart_versions.get(f"{score.id} {score.type} {score.level_index}")
+            return None if not version else version >= current_version.value
+
+        return is_current_version
 
     async def fetch_player_pc50(self, params: MaimaiPyParams) -> PlayerMaiB50:
         """
@@ -282,32 +331,47 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         注：需要用户使用 `.import` 指令导入游玩记录后才能获取
         """
         logger.debug("1/3 获取完整游玩记录")
-        scores = await maimai_client.scores(params.identifier, params.score_provider)
+        scores = await get_maimai_client().scores(params.identifier, params.score_provider)
 
-        scores_list = scores.scores.copy()
-        # scores_list.sort(key=lambda x: x.play_count or 0, reverse=True)
+        logger.debug("2/3 获取游玩次数")
+        score_pairs = [
+            (score, self._score_unpack(score)) for score in scores.scores if score.type != MaimaiPySongType.UTAGE
+        ]
+        await self.fetch_player_play_counts([unpacked for _, unpacked in score_pairs])
+
+        logger.debug("3/3 划分版本信息并返回结果")
+        is_current_chart_version = await self._get_chart_version_checker()
+        best35, best15 = await split_best_by_version(
+            get_scoped_session(),
+            score_pairs,
+            song_id=lambda pair: pair[0].id,
+            key=lambda pair: pair[1].play_count or 0,
+            is_current_version=lambda pair: is_current_chart_version(pair[0]),
+        )
 
-        logger.debug("2/3 划分版本信息")
-        old_version_scores: list[ScoreExtend] = []
-        new_version_scores: list[ScoreExtend] = []
-        song_diff_versions: dict[str, int] = await maimai_client._cache.get("versions", namespace="songs") or {}
-        for score in scores_list:
-            if score.type == MaimaiPySongType.UTAGE:
-                continue
+        return PlayerMaiB50(standard=[unpacked for _, unpacked in best35], dx=[unpacked for _, unpacked in best15])
 
-            # Find the version of the song, and decide whether it is b35 or b15.
-            diff_key = f"{score.id} {score.type} {score.level_index}"
-            if score_version := song_diff_versions.get(diff_key, None):
-                (new_version_scores if score_version >= current_version.value else old_version_scores).append(score)
+    async def fetch_player_plate(
+        self, params: MaimaiPyParams, plate_name: str
+    ) -> tuple[int, int, list[tuple[int, bool, int]]]:
+        """
+        通过 maimai.py 获取玩家牌子进度，用于本地牌子表未收录的版本
 
-        logger.debug("3/3 获取游玩次数并返回结果")
-        old_best = await self.fetch_player_play_counts([self._score_unpack(score) for score in old_version_scores])
-        new_best = await self.fetch_player_play_counts([self._score_unpack(score) for score in new_version_scores])
+        :param params: 鉴权参数对象
+        :param plate_name: 牌子名称
+        :return: (谱面总数, 已达成谱面数, 未达成谱面的 (曲目 ID, 是否为 DX 谱面, 难度) 列表)
+        :raise InvalidPlateError: 无效的牌子
+        """
+        plate = await get_maimai_client().plates(params.identifier, plate_name, params.score_provider)
 
-        best35 = sorted(old_best, key=lambda x: x.play_count or 0, reverse=True)[:35]
-        best15 = sorted(new_best, key=lambda x: x.play_count or 0, reverse=True)[:15]
+        is_dx = plate._major_type == MaimaiPySongType.DX
+        remained = [
+            (obj.song.id, is_dx, int(level_index.value))
+            for obj in await plate.get_remained()
+            for level_index in obj.levels
+        ]
 
-        return PlayerMaiB50(standard=best35, dx=best15)
+        return await plate.count_all(), await plate.count_cleared(), remained
 
     async def fetch_player_minfo(
         self, params: MaimaiPyParams, song_id: int, song_type: Literal["standard", "dx"]
@@ -325,7 +389,7 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         :rtype: list[PlayerMaiScore]
         """
 
-        player_song = await maimai_client.minfo(song_id, params.identifier, params.score_provider)
+        player_song = await get_maimai_client().minfo(song_id, params.identifier, params.score_provider)
 
         if not player_song:
             return []
@@ -396,7 +460,7 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         :rtype: str
         """
         try:
-            player = await maimai_client.identifiers(qr_code_data, provider=_arcade_provider)
+            player = await get_maimai_client().identifiers(qr_code_data, provider=_get_arcade_provider())
         except NetworkError as exc:
             logger.warning(f"尝试通过玩家二维码获取玩家数据时发生错误: {exc}")
             raise
@@ -408,7 +472,9 @@ class MaimaiPyScoreProvider(BaseScoreProvider[MaimaiPyParams]):
         """
         获取用户各铺面游玩次数
         """
-        maimai_scores = await maimai_client.scores(PlayerIdentifier(credentials=identifier), _arcade_provider)
+        maimai_scores = await get_maimai_client().scores(
+            PlayerIdentifier(credentials=identifier), _get_arcade_provider()
+        )
 
         return [self._score_unpack(score) for score in maimai_scores.scores]
 
@@ -0,0 +1,153 @@
+"""
+舞萌DX Rating 计算
+
+以分段系数表描述达成率与 Rating 系数的关系，提供标量与 NumPy 批量计算、
+按 Rating 阈值反解最低达成率，以及 B35/B15 的 Top-K 选取
+"""
+
+from bisect import bisect_right
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from ..score_set import top_k_indices
+
+ArrayLike = Union[np.ndarray, Sequence[float], float]
+
+_RATING_COEFFICIENT_TABLE: list[tuple[float, float, float, float]] = [
+    # (达成率下限, 基础系数, 斜率分子, 斜率分母)
+    (0.0, 0.0, 0.0, 1.0),
+    (10.0, 0.016, 0.0016, 1.0),
+    (20.0, 0.032, 0.0016, 1.0),
+    (30.0, 0.048, 0.0016, 1.0),
+    (40.0, 0.064, 0.0016, 1.0),
+    (50.0, 0.08, 0.0016, 1.0),
+    (60.0, 0.096, 0.0016, 1.0),
+    (70.0, 0.112, 0.0016, 1.0),
+    (75.0, 0.120, 0.0032, 1.0),
+    (80.0, 0.136, 0.0016, 1.0),
+    (90.0, 0.152, 0.004, 1.0),
+    (94.0, 0.168, 0.008, 3.0),
+    (97.0, 0.2, 0.003, 1.0),
+    (98.0, 0.203, 0.005, 1.0),
+    (99.0, 0.208, 0.006, 1.0),
+    (99.5, 0.211, 0.01, 1.0),
+    (100.0, 0.216, 0.016, 1.0),
+    (100.5, 0.224, 0.0, 1.0),
+]
+"""
+达成率分段系数表，按达成率下限升序排列
+
+区间内的系数为 `基础系数 + (达成率 - 下限) * 斜率分子 / 斜率分母`，
+斜率以分子、分母分开存储以保证与逐段计算的浮点结果完全一致
+"""
+
+_THRESHOLDS = np.array([row[0] for row in _RATING_COEFFICIENT_TABLE])
+_BASES = np.array([row[1] for row in _RATING_COEFFICIENT_TABLE])
+_SLOPE_NUMERATORS = np.array([row[2] for row in _RATING_COEFFICIENT_TABLE])
+_SLOPE_DENOMINATORS = np.array([row[3] for row in _RATING_COEFFICIENT_TABLE])
+_THRESHOLD_LIST = _THRESHOLDS.tolist()
+
+TARGET_ACHIEVEMENTS = np.arange(97.0, 101.5, 0.5)
+"""推分目标达成率档位: 97.0, 97.5, ..., 101.0"""
+
+
+def get_dx_rating_coefficient(ach: float) -> float:
+    """
+    获取达成率对应的 DX Rating 系数
+
+    :param ach: 达成率
+    """
+    index = max(bisect_right(_THRESHOLD_LIST, ach) - 1, 0)
+    threshold, base, numerator, denominator = _RATING_COEFFICIENT_TABLE[index]
+    return base + (ach - threshold) * numerator / denominator
+
+
+def calc_dx_rating(level_value: float, ach: float) -> int:
+    """
+    计算单个谱面的 DX Rating
+
+    :param level_value: 谱面定数
+    :param ach: 达成率
+    """
+    return round(level_value * get_dx_rating_coefficient(ach) * ach)
+
+
+def get_dx_rating_coefficients(achievements: ArrayLike) -> np.ndarray:
+    """
+    批量获取达成率对应的 DX Rating 系数
+
+    :param achievements: 达成率数组
+    """
+    achievements = np.asarray(achievements, dtype=np.float64)
+    index = np.maximum(np.searchsorted(_THRESHOLDS, achievements, side="right") - 1, 0)
+    return _BASES[index] + (achievements - _THRESHOLDS[index]) * _SLOPE_NUMERATORS[index] / _SLOPE_DENOMINATORS[index]
+
+
+def calc_dx_rating_many(level_values: ArrayLike, achievements: ArrayLike) -> np.ndarray:
+    """
+    批量计算 DX Rating，参数按 NumPy 规则广播，结果与逐个调用 `calc_dx_rating` 一致
+
+    :param level_values: 谱面定数数组
+    :param achievements: 达成率数组
+    """
+    level_values = np.asarray(level_values, dtype=np.float64)
+    achievements = np.asarray(achievements, dtype=np.float64)
+    ratings = level_values * get_dx_rating_coefficients(achievements) * achievements
+    return np.round(ratings).astype(np.int64)
+
+
+def solve_min_achievements(
+    level_values: ArrayLike,
+    min_dx_rating: int,
+    start_achievements: Optional[ArrayLike] = None,
+    achievements_grid: np.ndarray = TARGET_ACHIEVEMENTS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量求解 DX Rating 高于阈值所需的最低达成率
+
+    在升序的达成率档位中，为每个谱面选取不低于起始达成率、且 DX Rating 严格高于阈值的首个档位
+
+    :param level_values: 谱面定数数组
+    :param min_dx_rating: Rating 阈值，如 B50 底分
+    :param start_achievements: 每个谱面的起始达成率，为空时从首个档位开始
+    :param achievements_grid: 达成率档位，默认为 97.0 至 101.0 的半档
+    :return: (是否存在满足条件的档位, 最低达成率, 对应的 DX Rating)，不存在时后两项的值无意义
+    """
+    level_values = np.asarray(level_values, dtype=np.float64)
+    ratings = calc_dx_rating_many(level_values[:, None], achievements_grid)
+
+    eligible = ratings > min_dx_rating
+    if start_achievements is not None:
+        eligible &= achievements_grid >= np.asarray(start_achievements, dtype=np.float64)[:, None]
+
+    found = np.asarray(eligible.any(axis=1))
+    first = eligible.argmax(axis=1)
+
+    return found, achievements_grid[first], ratings[np.arange(len(first)), first]
+
+
+def select_best_indices(
+    values: ArrayLike, is_current_version: ArrayLike, old_limit: int = 35, new_limit: int = 15
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    按版本分别选取值最大的若干项，用于 B35/B15 等场景
+
+    结果与对两个版本分别执行 `sorted(..., reverse=True)[:limit]` 一致
+
+    :param values: 排序依据，如 DX Rating
+    :param is_current_version: 是否为当前版本的布尔数组
+    :param old_limit: 旧版本数量
+    :param new_limit: 当前版本数量
+    :return: (旧版本下标, 当前版本下标)，均按值降序排列
+    """
+    values = np.asarray(values)
+    is_current_version = np.asarray(is_current_version, dtype=bool)
+
+    old_indices = np.flatnonzero(~is_current_version)
+    new_indices = np.flatnonzero(is_current_version)
+
+    return (
+        old_indices[top_k_indices(values[old_indices], old_limit)],
+        new_indices[top_k_indices(values[new_indices], new_limit)],
+    )
@@ -0,0 +1,210 @@
+"""
+紧凑成绩集合
+
+以 NumPy 列（struct-of-arrays）存储成绩的关键字段，提供向量化的筛选、排序与 Top-K，
+结果可随时还原为原有的成绩 dataclass 供绘图模块使用
+"""
+
+from enum import Enum
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+import numpy as np
+
+from .chunithm._schema import (
+    ChuClearType,
+    ChuFullChainType,
+    ChuFullComboType,
+    ChuRankType,
+    PlayerChuScore,
+)
+from .maimai._schema import PlayerMaiScore, ScoreFCType, ScoreFSType, SongType
+
+S = TypeVar("S")
+SetT = TypeVar("SetT", bound="ScoreSet")
+
+
+def enum_codes(enum_cls: type[Enum]) -> dict[Optional[Enum], int]:
+    """
+    生成枚举到列编码的映射，None 编码为 0，其余成员按声明顺序从 1 开始编码
+
+    :param enum_cls: 枚举类型
+    """
+    codes: dict[Optional[Enum], int] = {None: 0}
+    for code, member in enumerate(enum_cls, start=1):
+        codes[member] = code
+    return codes
+
+
+def top_k_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    获取数组中最大的 k 个元素的下标，按值降序排列
+
+    结果与 `sorted(range(len(values)), key=values.__getitem__, reverse=True)[:k]` 一致，
+    边界处的并列元素按原有顺序取舍
+
+    :param values: 一维数组
+    :param k: 数量
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    keys = -np.asarray(values)
+    if k >= len(keys):
+        return np.argsort(keys, kind="stable")
+
+    threshold = keys[np.argpartition(keys, k - 1)[k - 1]]
+    above = np.flatnonzero(keys < threshold)
+    tied = np.flatnonzero(keys == threshold)[: k - len(above)]
+    candidates = np.concatenate((above, tied))
+    return candidates[np.argsort(keys[candidates], kind="stable")]
+
+
+class ScoreSet(Generic[S]):
+    """
+    成绩集合基类
+
+    集合持有原始成绩对象列表以及与之对齐的列数据，筛选、排序得到的新集合共享原始成绩对象，不会复制成绩
+    """
+
+    COLUMNS: ClassVar[dict[str, tuple[Any, Callable[[Any], Any]]]] = {}
+    """列名 -> (NumPy dtype, 取值函数)"""
+
+    __slots__ = ("_records", "_index", "_columns")
+
+    def __init__(self, records: Sequence[S], index: np.ndarray, columns: dict[str, np.ndarray]) -> None:
+        self._records = records
+        self._index = index
+        self._columns = columns
+
+    @classmethod
+    def from_scores(cls: type[SetT], scores: Iterable[Any]) -> SetT:
+        """
+        从成绩列表构建集合
+
+        :param scores: 成绩 dataclass 列表
+        """
+        records = list(scores)
+        count = len(records)
+        columns = {
+            name: np.fromiter((getter(record) for record in records), dtype=dtype, count=count)
+            for name, (dtype, getter) in cls.COLUMNS.items()
+        }
+        return cls(records, np.arange(count), columns)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[S]:
+        records = self._records
+        return (records[i] for i in self._index.tolist())
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """获取列数据，顺序与集合当前顺序一致"""
+        return self._columns[column]
+
+    def _take(self: SetT, positions: np.ndarray) -> SetT:
+        return type(self)(
+            self._records,
+            self._index[positions],
+            {name: values[positions] for name, values in self._columns.items()},
+        )
+
+    def filter(self: SetT, mask: np.ndarray) -> SetT:
+        """
+        按布尔掩码筛选成绩
+
+        :param mask: 与集合等长的布尔数组，如 `scores["dx_rating"] > 300`
+        """
+        return self._take(np.flatnonzero(mask))
+
+    def sort(self: SetT, by: str, descending: bool = True) -> SetT:
+        """
+        按指定列稳定排序
+
+        :param by: 列名
+        :param descending: 是否降序
+        """
+        values = self._columns[by]
+        order = np.argsort(-values if descending else values, kind="stable")
+        return self._take(order)
+
+    def top_k(self: SetT, by: str, k: int) -> SetT:
+        """
+        获取指定列最大的 k 条成绩，结果按该列降序排列
+
+        与 `sorted(..., reverse=True)[:k]` 结果一致，边界处的并列成绩按原有顺序取舍
+
+        :param by: 列名
+        :param k: 数量
+        """
+        return self._take(top_k_indices(self._columns[by], k))
+
+    def to_scores(self) -> list[S]:
+        """还原为成绩 dataclass 列表"""
+        records = self._records
+        return [records[i] for i in self._index.tolist()]
+
+
+_SONG_TYPE_CODES = enum_codes(SongType)
+_FC_CODES = enum_codes(ScoreFCType)
+_FS_CODES = enum_codes(ScoreFSType)
+
+
+class MaiScoreSet(ScoreSet[PlayerMaiScore]):
+    """舞萌DX 成绩集合"""
+
+    __slots__ = ()
+
+    SONG_TYPE_CODES = _SONG_TYPE_CODES
+    FC_CODES = _FC_CODES
+    FS_CODES = _FS_CODES
+
+    COLUMNS = {
+        "song_id": (np.int32, lambda s: s.song_id),
+        "song_type": (np.int8, lambda s: _SONG_TYPE_CODES[s.song_type]),
+        "song_difficulty": (np.int8, lambda s: s.song_difficulty),
+        "achievements": (np.float64, lambda s: s.achievements),
+        "dx_score": (np.int32, lambda s: s.dx_score),
+        "dx_rating": (np.float64, lambda s: s.dx_rating),
+        "fc": (np.int8, lambda s: _FC_CODES[s.fc]),
+        "fs": (np.int8, lambda s: _FS_CODES[s.fs]),
+    }
+
+
+_CLEAR_CODES = enum_codes(ChuClearType)
+_FULL_COMBO_CODES = enum_codes(ChuFullComboType)
+_FULL_CHAIN_CODES = enum_codes(ChuFullChainType)
+_RANK_CODES = enum_codes(ChuRankType)
+
+
+class ChuScoreSet(ScoreSet[PlayerChuScore]):
+    """中二节奏成绩集合"""
+
+    __slots__ = ()
+
+    CLEAR_CODES = _CLEAR_CODES
+    FULL_COMBO_CODES = _FULL_COMBO_CODES
+    FULL_CHAIN_CODES = _FULL_CHAIN_CODES
+    RANK_CODES = _RANK_CODES
+
+    COLUMNS = {
+        "song_id": (np.int32, lambda s: s.song_id or 0),
+        "song_difficulty": (np.int8, lambda s: s.song_difficulty),
+        "score": (np.int32, lambda s: s.score),
+        "rating": (np.float64, lambda s: s.rating),
+        "over_power": (np.float64, lambda s: s.over_power),
+        "clear": (np.int8, lambda s: _CLEAR_CODES[s.clear]),
+        "full_combo": (np.int8, lambda s: _FULL_COMBO_CODES[s.full_combo]),
+        "full_chain": (np.int8, lambda s: _FULL_CHAIN_CODES[s.full_chain]),
+        "rank": (np.int8, lambda s: _RANK_CODES[s.rank]),
+    }
@@ -0,0 +1,256 @@
+"""
+插件启动流程
+
+启动步骤按阶段执行，同一阶段内相互独立的步骤并发执行，并记录每个步骤的耗时。
+耗时较长且不影响插件可用性的数据迁移（如补全中二好友码）在启动完成后于后台执行。
+插件加载时还会统计各子模块的导入耗时，便于发现拖慢加载的依赖
+"""
+
+import asyncio
+import json
+import sys
+import time
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from importlib.machinery import ModuleSpec
+from typing import Any, Awaitable, Callable, Iterator, Optional, Sequence
+
+from nonebot import logger
+from nonebot_plugin_localstore import get_plugin_data_file
+from nonebot_plugin_orm import get_session
+
+StartupStep = tuple[str, Callable[[], Awaitable[Any]]]
+"""(步骤名称, 步骤函数)"""
+
+_FRIEND_CODE_MARKER_FILE = "chu_friend_code_backfill.json"
+"""中二好友码补全进度文件"""
+_FRIEND_CODE_CONCURRENCY = 4
+"""补全中二好友码时同时进行的请求数量"""
+_FRIEND_CODE_MAX_ATTEMPTS = 3
+"""单个用户补全中二好友码的最大尝试次数，超出后不再尝试"""
+
+_background_tasks: set[asyncio.Task] = set()
+"""后台任务的引用，避免任务在执行完成前被回收"""
+
+HEAVY_DEPENDENCIES = ("matplotlib", "playwright", "maimai_py", "numpy", "PIL")
+"""导入耗时较长的第三方依赖，导入报告中会列出其是否已被加载"""
+_IMPORT_REPORT_LIMIT = 15
+"""导入报告中列出的子模块数量"""
+
+
+class _ImportTimer(MetaPathFinder):
+    """统计指定包下各子模块的导入耗时"""
+
+    def __init__(self, package: str) -> None:
+        self.prefix = package + "."
+        self.cumulative: dict[str, float] = {}
+        """模块名 -> 导入耗时（包含其导入的其他模块）"""
+        self.exclusive: dict[str, float] = {}
+        """模块名 -> 导入耗时（不包含同样被统计的子模块）"""
+        self._stack: list[float] = []
+
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]], target: Any = None) -> Optional[ModuleSpec]:
+        if not fullname.startswith(self.prefix):
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        exec_module = getattr(loader, "exec_module", None)
+        if exec_module is None or not hasattr(loader, "__dict__"):
+            return spec
+        # loader 实例上原有的 exec_module，通常为 None，即使用类上定义的方法
+        own_exec_module = vars(loader).get("exec_module")
+
+        def timed_exec_module(module: Any) -> None:
+            # 只统计首次导入，随后恢复原有的 exec_module，之后的 importlib.reload 等不再经过计时
+            if own_exec_module is None:
+                del loader.exec_module  # type: ignore[union-attr]
+            else:
+                loader.exec_module = own_exec_module  # type: ignore[union-attr, method-assign]
+
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += elapsed
+                self.cumulative[fullname] = elapsed
+                self.exclusive[fullname] = elapsed - children
+
+        loader.exec_module = timed_exec_module  # type: ignore[union-attr, method-assign]
+        return spec
+
+    def report(self, total: float) -> str:
+        lines = [f"[启动] 插件加载耗时 {total:.2f}s，导入 {len(self.exclusive)} 个子模块，耗时最长的子模块:"]
+        ranked = sorted(self.exclusive.items(), key=lambda item: item[1], reverse=True)
+        for name, elapsed in ranked[:_IMPORT_REPORT_LIMIT]:
+            lines.append(
+                f"  {name.removeprefix(self.prefix):<40} {elapsed * 1000:8.1f}ms"
+                f" (累计 {self.cumulative[name] * 1000:.1f}ms)"
+            )
+        loaded = [name for name in HEAVY_DEPENDENCIES if name in sys.modules]
+        deferred = [name for name in HEAVY_DEPENDENCIES if name not in sys.modules]
+        lines.append(f"  已加载的重型依赖: {', '.join(loaded) or '无'}")
+        lines.append(f"  延迟加载的重型依赖: {', '.join(deferred) or '无'}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def record_import_times(package: str) -> Iterator[None]:
+    """
+    统计代码块内导入的 `package` 子模块的耗时，结束后输出导入报告
+
+    子模块的耗时包含其导入的第三方依赖，已导入的子模块不会重复统计
+
+    :param package: 包名，通常为插件的 `__name__`
+    """
+    timer = _ImportTimer(package)
+    sys.meta_path.insert(0, timer)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sys.meta_path.remove(timer)
+        logger.info(timer.report(time.perf_counter() - start))
+
+
+async def _run_step(step: Callable[[], Awaitable[Any]]) -> float:
+    start = time.perf_counter()
+    await step()
+    return time.perf_counter() - start
+
+
+async def run_startup_steps(*phases: list[StartupStep]) -> None:
+    """
+    按阶段执行启动步骤，同一阶段内的步骤并发执行，任一步骤失败时抛出其异常。
+    全部完成后输出总耗时与各步骤耗时
+
+    :param phases: 启动阶段，后一阶段在前一阶段全部完成后开始
+    """
+    start = time.perf_counter()
+    timings: list[tuple[str, float]] = []
+    for steps in phases:
+        elapsed = await asyncio.gather(*(_run_step(step) for _, step in steps))
+        timings.extend(zip((name for name, _ in steps), elapsed))
+    details = "，".join(f"{name} {elapsed:.2f}s" for name, elapsed in timings)
+    logger.info(f"[启动] 插件初始化完成，耗时 {time.perf_counter() - start:.2f}s ({details})")
+
+
+def run_in_background(name: str, step: Callable[[], Awaitable[Any]]) -> None:
+    """
+    在后台执行启动步骤，失败时仅记录日志
+
+    :param name: 步骤名称
+    :param step: 步骤函数
+    """
+
+    async def runner() -> None:
+        try:
+            elapsed = await _run_step(step)
+        except Exception as e:
+            logger.warning(f"[启动] {name} 失败: {e}")
+        else:
+            logger.info(f"[启动] 后台步骤 {name} 完成，耗时 {elapsed:.2f}s")
+
+    task = asyncio.create_task(runner())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _load_friend_code_marker() -> dict[str, Any]:
+    path = get_plugin_data_file(_FRIEND_CODE_MARKER_FILE)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"[数据迁移] 读取中二好友码补全进度失败: {e}")
+        return {}
+
+
+def _save_friend_code_marker(marker: dict[str, Any]) -> None:
+    path = get_plugin_data_file(_FRIEND_CODE_MARKER_FILE)
+    try:
+        path.write_text(json.dumps(marker, ensure_ascii=False), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"[数据迁移] 保存中二好友码补全进度失败: {e}")
+
+
+async def backfill_chu_friend_codes() -> None:
+    """
+    数据迁移：为已有落雪绑定但缺少中二好友码的用户自动补全 chu_friend_code
+
+    请求并发数量受限，每个用户最多尝试 `_FRIEND_CODE_MAX_ATTEMPTS` 次，
+    所有用户均已补全或达到尝试次数上限后记录完成标记，之后启动时不再执行
+    """
+    from sqlalchemy import select
+
+    from .database import UserBindInfoORM
+    from .database.orm_models import UserBindInfo
+    from .score.chunithm import get_lxns_chu_provider
+
+    marker = _load_friend_code_marker()
+    if marker.get("completed"):
+        return
+    attempts: dict[str, int] = marker.get("attempts", {})
+
+    # 在后台任务中执行，没有事件上下文，使用独立的会话以免与其他后台任务共用 scoped session
+    async with get_session() as session:
+        result = await session.execute(
+            select(UserBindInfo.user_id, UserBindInfo.lxns_api_key).where(
+                UserBindInfo.lxns_api_key.isnot(None),
+                UserBindInfo.lxns_api_key != "",
+                (UserBindInfo.chu_friend_code.is_(None) | (UserBindInfo.chu_friend_code == "")),
+            )
+        )
+        users = [
+            (user_id, api_key)
+            for user_id, api_key in result.all()
+            if api_key and attempts.get(user_id, 0) < _FRIEND_CODE_MAX_ATTEMPTS
+        ]
+
+    if users:
+        logger.info(f"[数据迁移] 发现 {len(users)} 个用户需要补全中二好友码")
+        provider = get_lxns_chu_provider()
+        semaphore = asyncio.Semaphore(_FRIEND_CODE_CONCURRENCY)
+
+        async def fetch_friend_code(user_id: str, api_key: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    info = await provider.fetch_player_info_by_user_token(api_key)
+                except Exception as e:
+                    logger.debug(f"[数据迁移] 用户 {user_id} 中二好友码补全失败: {e}")
+                    return None
+            return str(info.friend_code)
+
+        friend_codes = await asyncio.gather(*(fetch_friend_code(user_id, api_key) for user_id, api_key in users))
+
+        migrated = 0
+        async with get_session() as session:
+            for (user_id, _), friend_code in zip(users, friend_codes):
+                if friend_code is None:
+                    attempts[user_id] = attempts.get(user_id, 0) + 1
+                    continue
+                await UserBindInfoORM.set_user_chu_friend_code(session, user_id, friend_code)
+                attempts.pop(user_id, None)
+                migrated += 1
+                logger.debug(f"[数据迁移] 用户 {user_id} 中二好友码已补全: {friend_code}")
+
+        if migrated:
+            logger.info(f"[数据迁移] 成功补全 {migrated} 个用户的中二好友码")
+
+    pending = [user_id for user_id, count in attempts.items() if count < _FRIEND_CODE_MAX_ATTEMPTS]
+    _save_friend_code_marker({"completed": not pending, "attempts": attempts})
+    if not pending:
+        logger.info("[数据迁移] 中二好友码补全已完成，之后启动时不再执行")
@@ -0,0 +1,282 @@
+"""
+指令耗时追踪
+
+为查分等指令记录各阶段（鉴权、上游请求、资源预取、渲染、编码）的耗时：
+- `traced` 装饰消息处理器，为一次指令调用创建追踪记录
+- `span` 在处理器内部标记阶段，可附带用户、查分器、缓存命中等属性
+- 每个指令及阶段保留最近若干次耗时，用于计算 p50/p95/p99
+- 端到端耗时超过阈值时输出慢请求日志，包含完整的阶段耗时
+
+未处于追踪中的代码调用 `span` 时不做任何记录，开销可以忽略
+"""
+
+import time
+from collections import deque
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from nonebot import logger
+from nonebot.exception import FinishedException
+
+from .config import config
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+TOTAL_STAGE = "total"
+"""表示整个指令的阶段名称"""
+
+
+@dataclass
+class Span:
+    """一个阶段的耗时记录"""
+
+    name: str
+    """阶段名称"""
+    offset: float
+    """相对指令开始时间的偏移（秒）"""
+    duration: float = 0.0
+    """耗时（秒）"""
+    attributes: dict[str, Any] = field(default_factory=dict)
+    """附加属性，如查分器类型、是否命中缓存"""
+
+
+@dataclass
+class Trace:
+    """一次指令调用的追踪记录"""
+
+    command: str
+    """指令名称"""
+    start: float = field(default_factory=time.perf_counter)
+    """开始时间（perf_counter）"""
+    duration: float = 0.0
+    """端到端耗时（秒）"""
+    status: str = "ok"
+    """ok 或 error"""
+    attributes: dict[str, Any] = field(default_factory=dict)
+    """附加属性，如用户 ID"""
+    spans: list[Span] = field(default_factory=list)
+    """已结束的阶段，按结束顺序排列"""
+    finished: bool = False
+    """指令是否已结束，结束后仍在后台运行的阶段不再记录"""
+
+    def format_breakdown(self) -> str:
+        """格式化为包含各阶段耗时的多行文本"""
+        attributes = " ".join(f"{key}={value}" for key, value in self.attributes.items())
+        lines = [f"{self.command} [{self.status}] {self.duration * 1000:.1f}ms {attributes}".rstrip()]
+        for span in sorted(self.spans, key=lambda s: s.offset):
+            span_attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            timing = f"+{span.offset * 1000:8.1f}ms {span.name:<10} {span.duration * 1000:8.1f}ms"
+            lines.append(f"  {timing} {span_attributes}".rstrip())
+        return "\n".join(lines)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("rikka_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("rikka_span", default=None)
+
+
+class SpanContext:
+    """阶段上下文管理器，由 `span` 创建"""
+
+    __slots__ = ("_name", "_attributes", "_trace", "_span", "_token", "_start")
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        self._name = name
+        self._attributes = attributes
+        self._trace: Optional[Trace] = None
+        self._span: Optional[Span] = None
+        self._token: Optional[Token[Optional[Span]]] = None
+        self._start = 0.0
+
+    def __enter__(self) -> "SpanContext":
+        trace = _current_trace.get()
+        if trace is None or not config.enable_tracing:
+            return self
+        self._trace = trace
+        self._start = time.perf_counter()
+        self._span = Span(self._name, self._start - trace.start, attributes=self._attributes)
+        self._token = _current_span.set(self._span)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self._span is None or self._trace is None:
+            return
+        assert self._token is not None
+        _current_span.reset(self._token)
+        self._span.duration = time.perf_counter() - self._start
+        if exc_type is not None and not issubclass(exc_type, FinishedException):
+            self._span.attributes["error"] = exc_type.__name__
+        if not self._trace.finished:
+            self._trace.spans.append(self._span)
+
+    def set(self, **attributes: Any) -> None:
+        """为当前阶段添加属性，未处于追踪中时忽略"""
+        if self._span is not None:
+            self._span.attributes.update(attributes)
+
+
+def span(name: str, **attributes: Any) -> SpanContext:
+    """
+    标记指令中的一个阶段，可用于 `with` 语句，也可在异步函数中包裹 `await`
+
+        with span("fetch", provider="lxns"):
+            scores = await provider.fetch_player_scoreslist(params)
+
+    :param name: 阶段名称，如 auth、fetch、prefetch、render、encode
+    :param attributes: 附加属性
+    """
+    return SpanContext(name, attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """为最内层的阶段添加属性，不在任何阶段中时添加到整个指令，未处于追踪中时忽略"""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def _covered_duration(ranges: list[tuple[float, float]]) -> float:
+    # 同一阶段在一次指令中出现多次时按实际覆盖的时长计算，并发的阶段不会重复计入
+    total = 0.0
+    current_start, current_end = -1.0, -1.0
+    for start, end in sorted(ranges):
+        if start > current_end:
+            total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    return total + current_end - current_start
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    # nearest-rank
+    index = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LatencyRecorder:
+    """按指令与阶段保存最近的耗时样本，并输出慢请求日志"""
+
+    def __init__(self, window_size: int, slow_threshold: float) -> None:
+        """
+        :param window_size: 每个指令及阶段保留的样本数量
+        :param slow_threshold: 慢请求阈值（秒）
+        """
+        self._window_size = window_size
+        self._slow_threshold = slow_threshold
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+
+    def _add(self, command: str, stage: str, duration: float) -> None:
+        samples = self._samples.get((command, stage))
+        if samples is None:
+            samples = self._samples[(command, stage)] = deque(maxlen=self._window_size)
+        samples.append(duration)
+
+    def record(self, trace: Trace) -> None:
+        """记录一次已结束的指令调用"""
+        self._add(trace.command, TOTAL_STAGE, trace.duration)
+        intervals: dict[str, list[tuple[float, float]]] = {}
+        for s in trace.spans:
+            intervals.setdefault(s.name, []).append((s.offset, s.offset + s.duration))
+        for stage, ranges in intervals.items():
+            self._add(trace.command, stage, _covered_duration(ranges))
+
+        if trace.duration >= self._slow_threshold:
+            logger.warning(f"[Trace] 慢请求:\n{trace.format_breakdown()}")
+        else:
+            logger.debug(f"[Trace] {trace.format_breakdown()}")
+
+    def percentiles(self, command: str, stage: str = TOTAL_STAGE) -> Optional[tuple[int, float, float, float]]:
+        """
+        获取指令某一阶段的耗时分位数
+
+        :return: (样本数, p50, p95, p99)，单位为秒，无样本时返回 None
+        """
+        samples = self._samples.get((command, stage))
+        if not samples:
+            return None
+        values = sorted(samples)
+        return len(values), _percentile(values, 0.50), _percentile(values, 0.95), _percentile(values, 0.99)
+
+    def commands(self) -> list[str]:
+        """获取已有耗时记录的指令名称"""
+        return sorted({command for command, _ in self._samples})
+
+    def stages(self, command: str) -> list[str]:
+        """获取指令已有耗时记录的阶段名称，`TOTAL_STAGE` 排在最前"""
+        stages = sorted(stage for cmd, stage in self._samples if cmd == command and stage != TOTAL_STAGE)
+        return [TOTAL_STAGE, *stages] if (command, TOTAL_STAGE) in self._samples else stages
+
+
+latency_recorder = LatencyRecorder(config.trace_window_size, config.trace_slow_threshold)
+
+
+def traced(command: str) -> Callable[[F], F]:
+    """
+    追踪消息处理器的耗时，需放在 `catch_exception` 之下以便记录异常状态
+
+    处理器参数中包含 `event` 时自动记录用户 ID
+
+    :param command: 指令名称，用于聚合耗时
+    """
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not config.enable_tracing:
+                return await func(*args, **kwargs)
+
+            trace = Trace(command)
+            event = kwargs.get("event")
+            if event is not None:
+                try:
+                    trace.attributes["user"] = event.get_user_id()
+                except Exception:
+                    pass
+
+            token = _current_trace.set(trace)
+            try:
+                return await func(*args, **kwargs)
+            except FinishedException:
+                raise
+            except BaseException:
+                trace.status = "error"
+                raise
+            finally:
+                _current_trace.reset(token)
+                trace.duration = time.perf_counter() - trace.start
+                trace.finished = True
+                latency_recorder.record(trace)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def format_latency_report(command: Optional[str] = None) -> str:
+    """
+    格式化耗时统计，供 `.latency` 命令展示
+
+    :param command: 指令名称，为空时列出所有指令的端到端耗时，否则列出该指令各阶段的耗时
+    """
+    if command is None:
+        rows = [(name, latency_recorder.percentiles(name)) for name in latency_recorder.commands()]
+        title = "指令耗时统计 (p50 / p95 / p99)"
+    else:
+        rows = [(stage, latency_recorder.percentiles(command, stage)) for stage in latency_recorder.stages(command)]
+        title = f"{command} 各阶段耗时统计 (p50 / p95 / p99)"
+
+    lines = [title]
+    for name, result in rows:
+        if result is None:
+            continue
+        count, p50, p95, p99 = result
+        lines.append(f"{name}: {p50 * 1000:.0f} / {p95 * 1000:.0f} / {p99 * 1000:.0f} ms (n={count})")
+    if len(lines) == 1:
+        lines.append("暂无记录")
+    return "\n".join(lines)
@@ -7,12 +7,11 @@ from pathlib import Path
 
 from aiohttp import ClientResponseError, ClientSession
 from nonebot import logger
-from nonebot_plugin_orm import async_scoped_session
 from typing_extensions import TypedDict
 
 from ..config import config
 from ..constants import USER_AGENT
-from ..database import ChuSongAliasORM, ChuSongORM, MaiSongORM
+from ..database import ChuSongAliasORM, ChuSongORM, DBSession, MaiSongORM
 from ..models.chu_song import ChuSong, ChuSongDifficulties
 from ..models.song import MaiSong, SongDifficulties
 
@@ -166,7 +165,7 @@ async def fetch_song_info(song_id: int, interval: float = 0.3) -> MaiSong:
     return song_info
 
 
-async def update_song_alias_list(db_session: async_scoped_session):
+async def update_song_alias_list(db_session: DBSession):
     """
     通过落雪查分器更新别名表
     """
@@ -181,12 +180,12 @@ async def update_song_alias_list(db_session: async_scoped_session):
     await MaiSongAliasORM.add_alias_batch(db_session, content["aliases"])
 
 
-async def update_maimai_song_database(db_session: async_scoped_session) -> int:
+async def update_maimai_song_database(db_session: DBSession) -> int:
     """
     通过落雪查分器更新舞萌曲目数据库
 
     :param db_session: 数据库会话对象
-    :type db_session: async_scoped_session
+    :type db_session: DBSession
 
     :return: 更新的曲目数量
     :rtype: int
@@ -217,7 +216,7 @@ async def update_maimai_song_database(db_session: async_scoped_session) -> int:
     return len(songs_obj)
 
 
-async def update_chu_song_alias_list(db_session: async_scoped_session):
+async def update_chu_song_alias_list(db_session: DBSession):
     """
     通过落雪查分器更新中二节奏别名表
     """
@@ -233,12 +232,12 @@ async def update_chu_song_alias_list(db_session: async_scoped_session):
     await ChuSongAliasORM.add_alias_batch(db_session, content["aliases"])
 
 
-async def update_chu_song_database(db_session: async_scoped_session) -> int:
+async def update_chu_song_database(db_session: DBSession) -> int:
     """
     通过落雪查分器更新中二节奏曲目数据库
 
     :param db_session: 数据库会话对象
-    :type db_session: async_scoped_session
+    :type db_session: DBSession
 
     :return: 更新的曲目数量
     :rtype: int
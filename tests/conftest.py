@@ -0,0 +1,11 @@
+import json
+import tempfile
+from pathlib import Path
+
+import nonebot
+
+# 插件导入时会在缺少 music_chart.json 时从水鱼下载，测试中使用空的拟合定数数据
+_STATIC_DIR = Path(tempfile.mkdtemp())
+(_STATIC_DIR / "music_chart.json").write_text(json.dumps({"charts": {}, "diff_data": {}}), encoding="utf-8")
+
+nonebot.init(static_resource_path=str(_STATIC_DIR))
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from nonebot_plugin_rikka.database import (
+    ChuChartORM,
+    ChuSongORM,
+    MaiChartORM,
+    MaiSongORM,
+)
+from nonebot_plugin_rikka.database.orm_models import ChuChart
+from nonebot_plugin_rikka.database.orm_models import ChuSong as ChuSongORMModel
+from nonebot_plugin_rikka.database.orm_models import MaiChart
+from nonebot_plugin_rikka.database.orm_models import MaiSong as MaiSongORMModel
+from nonebot_plugin_rikka.models.chu_song import (
+    ChuSong,
+    ChuSongDifficulties,
+    ChuSongDifficulty,
+    ChuSongNotes,
+)
+from nonebot_plugin_rikka.models.song import (
+    MaiSong,
+    SongDifficulties,
+    SongDifficulty,
+    SongNotes,
+)
+
+T = TypeVar("T")
+
+
+def _mai_chart(chart_type: str, difficulty: int, level: str, level_value: float) -> SongDifficulty:
+    return SongDifficulty(
+        type=chart_type,  # type: ignore[arg-type]
+        difficulty=difficulty,
+        level=level,
+        level_value=level_value,
+        note_designer="",
+        version="",
+        notes=SongNotes.from_dict({}),
+    )
+
+
+def _mai_song(song_id: int, standard: list[SongDifficulty], dx: list[SongDifficulty]) -> MaiSong:
+    return MaiSong(
+        id=song_id,
+        title=f"song {song_id}",
+        artist="",
+        genre="",
+        bpm=120,
+        version=24000,
+        difficulties=SongDifficulties(standard=standard, dx=dx, utage=None),
+    )
+
+
+def _chu_song(song_id: int, charts: list[tuple[str, float]]) -> ChuSong:
+    return ChuSong(
+        id=song_id,
+        title=f"song {song_id}",
+        artist="",
+        genre="",
+        bpm=120,
+        version=20000,
+        difficulties=ChuSongDifficulties(
+            [
+                ChuSongDifficulty(
+                    difficulty=difficulty,  # type: ignore[arg-type]
+                    level=level,
+                    level_value=level_value,
+                    note_designer="",
+                    notes=ChuSongNotes(0, 0, 0, 0, 0, 0),
+                )
+                for difficulty, (level, level_value) in enumerate(charts)
+            ]
+        ),
+    )
+
+
+MAI_SONGS = [
+    _mai_song(1, [_mai_chart("standard", 2, "12", 12.4), _mai_chart("standard", 3, "13+", 13.7)], []),
+    _mai_song(2, [_mai_chart("standard", 3, "13+", 13.8)], [_mai_chart("dx", 3, "13+", 13.9)]),
+    _mai_song(3, [], [_mai_chart("dx", 3, "14", 14.0)]),
+]
+CHU_SONGS = [
+    _chu_song(1, [("7", 7.0), ("10", 10.5), ("13", 13.2), ("14+", 14.7)]),
+    _chu_song(2, [("5", 5.0), ("9+", 9.7), ("12+", 12.8), ("14+", 14.6)]),
+]
+
+
+def _run(query: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    async def run() -> T:
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(
+                MaiSongORMModel.metadata.create_all,
+                tables=[MaiSongORMModel.__table__, MaiChart.__table__, ChuSongORMModel.__table__, ChuChart.__table__],
+            )
+        try:
+            async with async_sessionmaker(engine)() as session:
+                await MaiSongORM.save_song_info_batch(session, MAI_SONGS)
+                await ChuSongORM.save_song_info_batch(session, CHU_SONGS)
+                return await query(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def _song_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(MaiSongORM, "_cache", {})
+    monkeypatch.setattr(MaiSongORM, "_generation", 0)
+
+
+def test_mai_charts_by_level_value():
+    charts = _run(lambda session: MaiChartORM.get_charts_by_level_value(session, 13.7, 14.0))
+    assert [(chart.song_id, chart.type, chart.level_value) for chart in charts] == [
+        (3, "dx", 14.0),
+        (2, "dx", 13.9),
+        (2, "standard", 13.8),
+        (1, "standard", 13.7),
+    ]
+
+    charts = _run(lambda session: MaiChartORM.get_charts_by_level_value(session, 12.0, 15.0, chart_type="standard"))
+    assert [chart.song_id for chart in charts] == [2, 1, 1]
+
+    charts = _run(lambda session: MaiChartORM.get_charts_by_level_value(session, 12.0, 15.0, difficulty=2))
+    assert [(chart.song_id, chart.level) for chart in charts] == [(1, "12")]
+
+
+def test_mai_charts_by_level():
+    charts = _run(lambda session: MaiChartORM.get_charts_by_level(session, "13+"))
+    assert [(chart.song_id, chart.type) for chart in charts] == [(2, "dx"), (2, "standard"), (1, "standard")]
+
+    charts = _run(lambda session: MaiChartORM.get_charts_by_level(session, "13+", chart_type="dx"))
+    assert [chart.song_id for chart in charts] == [2]
+
+
+def test_mai_songs_by_level_value():
+    songs = _run(lambda session: MaiChartORM.get_songs_by_level_value(session, 13.7, 14.0))
+    assert [song.id for song in songs] == [3, 2, 1]
+
+
+def test_chu_chart_queries():
+    charts = _run(lambda session: ChuChartORM.get_charts_by_level_value(session, 12.5, 14.65))
+    assert [(chart.song_id, chart.difficulty) for chart in charts] == [(2, 3), (1, 2), (2, 2)]
+
+    charts = _run(lambda session: ChuChartORM.get_charts_by_level(session, "14+"))
+    assert [(chart.song_id, chart.level_value) for chart in charts] == [(1, 14.7), (2, 14.6)]
+
+    songs = _run(lambda session: ChuChartORM.get_songs_by_level_value(session, 14.0, 15.0, difficulty=3))
+    assert [song.id for song in songs] == [1, 2]
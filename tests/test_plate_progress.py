@@ -0,0 +1,126 @@
+import pytest
+
+from nonebot_plugin_rikka.constants import MAI_VERSION_MAP
+from nonebot_plugin_rikka.database import MaiSongORM
+from nonebot_plugin_rikka.functions.process import (
+    _PLATE_VERSIONS,
+    PlateIndex,
+    PlateProcessError,
+    UnknownPlateError,
+    get_plate_process_data,
+    parse_plate,
+)
+from nonebot_plugin_rikka.models.song import (
+    MaiSong,
+    SongDifficulties,
+    SongDifficulty,
+    SongNotes,
+)
+from nonebot_plugin_rikka.score.maimai._schema import (
+    PlayerMaiScore,
+    ScoreFCType,
+    ScoreRateType,
+)
+from nonebot_plugin_rikka.score.maimai._schema import SongDifficulty as ScoreDifficulty
+from nonebot_plugin_rikka.score.maimai._schema import SongType
+
+
+def _charts(chart_type: str, version: str, difficulties: range = range(4)) -> list[SongDifficulty]:
+    return [
+        SongDifficulty(
+            type=chart_type,  # type: ignore[arg-type]
+            difficulty=difficulty,
+            level="10",
+            level_value=10.0 + difficulty,
+            note_designer="",
+            version=version,
+            notes=SongNotes.from_dict({}),
+        )
+        for difficulty in difficulties
+    ]
+
+
+def _song(
+    song_id: int,
+    version: int,
+    standard: list[SongDifficulty] | None = None,
+    dx: list[SongDifficulty] | None = None,
+    disabled: bool = False,
+) -> MaiSong:
+    return MaiSong(
+        id=song_id,
+        title=f"song {song_id}",
+        artist="",
+        genre="",
+        bpm=120,
+        version=version,
+        difficulties=SongDifficulties(standard=standard or [], dx=dx or [], utage=None),
+        disabled=disabled,
+    )
+
+
+SONGS = [
+    # 初代曲目，Re:MASTER 谱面在 GreeN 追加
+    _song(1, 10000, standard=_charts("standard", "10000") + _charts("standard", "12000", range(4, 5))),
+    _song(2, 11000, standard=_charts("standard", "11000")),
+    _song(3, 12000, standard=_charts("standard", "12000")),
+    # 初代曲目，DX 谱面在 舞萌DX 2024 追加
+    _song(4, 10000, standard=_charts("standard", "10000"), dx=_charts("dx", "24000")),
+    _song(5, 24000, dx=_charts("dx", "24000", range(5))),
+    _song(6, 25000, dx=_charts("dx", "25000"), disabled=True),
+    # 谱面未记录版本时使用曲目版本
+    _song(7, 19900, standard=_charts("standard", "")),
+]
+
+
+@pytest.mark.parametrize(
+    ("version", "total"),
+    [("真", 12), ("超", 4), ("辉", 4), ("舞", 21), ("霸", 21), ("双", 8), ("宴", 8), ("镜", 0)],
+)
+def test_plate_totals(version: str, total: int):
+    assert len(PlateIndex.build(SONGS).charts[version]) == total
+
+
+def test_plate_versions_are_known():
+    for versions in _PLATE_VERSIONS.values():
+        assert set(versions) <= set(MAI_VERSION_MAP)
+
+
+def test_parse_plate():
+    assert parse_plate("真极") == ("真", "极")
+    assert parse_plate("霸者") == ("霸", "者")
+    with pytest.raises(PlateProcessError):
+        parse_plate("真将")
+    with pytest.raises(PlateProcessError):
+        parse_plate("双者")
+    with pytest.raises(UnknownPlateError):
+        parse_plate("未极")
+
+
+def test_plate_process_data(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(MaiSongORM, "_cache", {song.id: song for song in SONGS})
+    monkeypatch.setattr(MaiSongORM, "_generation", -100)
+
+    scores = [
+        PlayerMaiScore(
+            song_id=5,
+            song_name="song 5",
+            song_type=SongType.DX,
+            song_level="10",
+            song_difficulty=ScoreDifficulty(difficulty),
+            achievements=100.5,
+            dx_score=0,
+            dx_star=0,
+            dx_rating=0,
+            rate=ScoreRateType.SSSP,
+            fc=ScoreFCType.FC if difficulty < 2 else None,
+        )
+        for difficulty in range(5)
+    ]
+
+    data = get_plate_process_data("双极", scores)
+    assert (data.total, data.cleared, len(data.remained)) == (8, 2, 6)
+
+    data = get_plate_process_data("双将", scores)
+    assert (data.total, data.cleared) == (8, 4)
+    assert all(chart.song.id == 4 for chart, score in data.remained if score is None)
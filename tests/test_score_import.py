@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from nonebot_plugin_rikka.functions import score_import
+from nonebot_plugin_rikka.functions.score_import import import_scores
+
+SCORES = [
+    {"musicId": 11, "level": 3, "playCount": 5},
+    {"musicId": 12, "level": 2, "playCount": 1},
+]
+
+
+class _Session:
+    def __init__(self) -> None:
+        self.rolled_back = False
+
+    async def rollback(self) -> None:
+        self.rolled_back = True
+
+
+async def _upsert_play_counts(session: Any, user_id: str, records: list) -> int:
+    return len(records)
+
+
+async def _import_divingfish(client: Any, token: str, payload: list, delta: bool) -> int:
+    return 7
+
+
+async def _fail(*args: Any) -> int:
+    raise RuntimeError("HTTP 502")
+
+
+async def _convert(scores: list) -> list:
+    return scores
+
+
+@pytest.fixture(autouse=True)
+def _stages(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(score_import, "convert_to_diving_fish_format", _convert)
+    monkeypatch.setattr(score_import, "_import_divingfish", _import_divingfish)
+    monkeypatch.setattr(score_import.MaiPlayCountORM, "upsert_user_play_counts", _upsert_play_counts)
+
+
+def test_failed_stage_does_not_cancel_others(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(score_import, "_import_lxns", _fail)
+
+    report = asyncio.run(
+        import_scores(_Session(), "10001", SCORES, divingfish_token="df", lxns_token="lx")  # type: ignore[arg-type]
+    )
+
+    assert report.divingfish_uploaded == 7
+    assert report.lxns_uploaded is None
+    assert report.play_count_imported == 2
+    assert list(report.errors) == ["lxns"]
+    assert report.format_outcomes() == "水鱼 成功 (7 条) / 落雪 失败 (HTTP 502) / 游玩次数 成功 (2 条)"
+
+
+def test_play_count_failure_rolls_back(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(score_import.MaiPlayCountORM, "upsert_user_play_counts", _fail)
+    session = _Session()
+
+    report = asyncio.run(import_scores(session, "10001", SCORES, divingfish_token="df"))  # type: ignore[arg-type]
+
+    assert session.rolled_back
+    assert report.divingfish_uploaded == 7
+    assert list(report.errors) == ["play_count"]
+
+
+def test_all_stages_failed(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(score_import, "_import_lxns", _fail)
+    monkeypatch.setattr(score_import.MaiPlayCountORM, "upsert_user_play_counts", _fail)
+
+    with pytest.raises(RuntimeError, match="HTTP 502"):
+        asyncio.run(import_scores(_Session(), "10001", SCORES, lxns_token="lx"))  # type: ignore[arg-type]